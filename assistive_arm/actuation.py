@@ -0,0 +1,161 @@
+import threading
+import time
+
+from concurrent.futures import Future, wait
+from typing import Callable, List
+
+
+class JointWorker:
+    """ Persistent thread commanding one joint.
+
+    Only the newest target is kept: a command submitted while another is still pending replaces
+    it (the replaced future is cancelled), and a command arriving while the joint is moving
+    retargets it immediately (the interrupted future resolves to False).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        move: Callable[[float], float],
+        move_time: Callable[[float], float],
+        position: float = 0,
+    ) -> None:
+        """
+        Args:
+            name (str): joint name, used for the thread name
+            move (Callable[[float], float]): sends a target without waiting, returns the commanded target
+            move_time (Callable[[float], float]): time needed to travel a given angle (s)
+            position (float, optional): current joint position. Defaults to 0.
+        """
+        self.name = name
+        self.position = position
+        self._move = move
+        self._move_time = move_time
+
+        self._condition = threading.Condition()
+        self._pending = None
+        self._running = True
+
+        self._thread = threading.Thread(target=self._run, name=f"{name}_worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, target: float) -> Future:
+        """ Queue a new target, replacing any target not yet started
+
+        Args:
+            target (float): joint target
+
+        Returns:
+            Future: resolves to True once the joint has had time to reach the target,
+                False if it was retargeted on the way, cancelled if replaced before starting
+        """
+        future = Future()
+
+        with self._condition:
+            if not self._running:
+                raise RuntimeError(f"{self.name} worker is closed")
+            if self._pending is not None:
+                self._pending[1].cancel()
+            self._pending = (target, future)
+            self._condition.notify()
+
+        return future
+
+    def close(self) -> None:
+        """ Stop the worker thread, cancelling a pending target """
+        with self._condition:
+            self._running = False
+            if self._pending is not None:
+                self._pending[1].cancel()
+                self._pending = None
+            self._condition.notify()
+
+        self._thread.join()
+
+    def _run(self) -> None:
+        with self._condition:
+            while True:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+
+                target, future = self._pending
+                self._pending = None
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    commanded = self._move(target)
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+
+                commanded = target if commanded is None else commanded
+                deadline = time.monotonic() + self._move_time(commanded - self.position)
+                self.position = commanded
+
+                # Wait for the move to finish unless a newer target or close() comes first
+                while self._running and self._pending is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(timeout=remaining)
+
+                future.set_result(time.monotonic() >= deadline)
+
+
+class ActuatorDispatcher:
+    """ One persistent JointWorker per joint, commanded together """
+
+    def __init__(self, workers: List[JointWorker]) -> None:
+        """
+        Args:
+            workers (List[JointWorker]): joint workers, in joint order
+        """
+        self.workers = workers
+
+    def command(self, targets: List[float]) -> List[Future]:
+        """ Send a target to every joint, NaN targets are skipped
+
+        Args:
+            targets (List[float]): joint targets
+
+        Returns:
+            List[Future]: futures of the commanded joints
+        """
+        return [
+            worker.submit(target)
+            for worker, target in zip(self.workers, targets)
+            if target == target  # Skip NaN
+        ]
+
+    def command_and_wait(self, targets: List[float], timeout: float = None) -> bool:
+        """ Send targets and wait until every joint has reached them
+
+        Args:
+            targets (List[float]): joint targets
+            timeout (float, optional): maximum waiting time (s). Defaults to None.
+
+        Returns:
+            bool: True if every joint reached its target in time
+        """
+        futures = self.command(targets)
+        done, not_done = wait(futures, timeout=timeout)
+
+        return not not_done and all(not future.cancelled() and future.result() for future in done)
+
+    @property
+    def positions(self) -> List[float]:
+        """ Last commanded position of every joint """
+        return [worker.position for worker in self.workers]
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -2,10 +2,11 @@ import numpy as np
 
 from abc import ABC, abstractmethod
 from typing import List
-from time import sleep
-from threading import Thread
+from concurrent.futures import Future
 
-from assistive_arm.servo_control import ServoControl
+from assistive_arm.actuation import ActuatorDispatcher, JointWorker
+from assistive_arm.kinematics import T_W_0, get_joint_transforms, inverse_kinematics
+from assistive_arm.servo_control import ServoControl, estimate_move_time
 
 
 class BaseArm(ABC):
@@ -63,36 +64,36 @@ class AssistiveArm(BaseArm):
             Joint(name="joint_1"),
             Joint(name="joint_2"),
         ]
+        self.dispatcher = ActuatorDispatcher([joint.worker for joint in self.joints])
 
         # Measurements in mm
         self.link_length = 250
         self.dist_links = 0
+        self.z_offset = self.dist_links
 
-        # REMINDER: Offset z by dist_links
-        self._T_W_0 = np.array([[0, -1, 0, 516.78],
-                                [1, 0, 0, -1672.9],
-                                [0, 0, 1, 732.7],
-                                [0, 0, 0, 1]])
+        # Constant base transform, shared by all arms
+        self._T_W_0 = T_W_0
 
         self._T_W_1 = None
         self._T_W_2 = None
         self._T_W_3 = None
 
-    def set_joint_angles(self, angles: np.ndarray):
+    def set_joint_angles(self, angles: np.ndarray, wait: bool = True) -> List[Future]:
         """Set the joint to a given angle and move motors
         Args:
-            positions (np.ndarray): array of joint angles [theta_1, theta_2]
+            positions (np.ndarray): array of joint angles [theta_1, theta_2], NaN joints are not moved
+            wait (bool, optional): block until the servos have had time to reach the angles. Defaults to True.
+
+        Returns:
+            List[Future]: one future per moved joint, see JointWorker.submit
         """
-        threads = []
-        for joint, angle in zip(self.joints, angles):
-            if np.isnan(angle):
-                continue
-            # joint.set_qpos(angle)
-            thread = Thread(target=joint.set_qpos, args=(angle,))
-            thread.start()
-            threads.append(thread)
-        for thread in threads:
-            thread.join()
+        futures = self.dispatcher.command(angles)
+        if wait:
+            for future in futures:
+                if not future.cancelled():
+                    future.result()
+
+        return futures
 
     def get_link_position(link: int):
         """Get 3D pose of a given link
@@ -112,11 +113,12 @@ class AssistiveArm(BaseArm):
         # TODO Define which frame we want to use for the velocity
         pass
 
-    def forward(self, theta_1: int, theta_2: int):
+    def forward(self, theta_1: int, theta_2: int, actuate: bool = True):
         """Forward kinematics of the arm
         Args:
             theta_1 (int): angle of joint 1
             theta_2 (int): angle of joint 2
+            actuate (bool, optional): also move the servos to the given angles. Defaults to True.
         Returns:
             np.ndarray: x, y, z position of the end effector
         """
@@ -125,81 +127,41 @@ class AssistiveArm(BaseArm):
         rad_2 = self._get_radians(theta_2)
 
         # For all transformations, _T_W_0 * T_0_N
-        self._T_W_1 = self._T_W_0 @ np.array(
-            [
-                [np.cos(rad_1), -np.sin(rad_1), 0, 0],
-                [np.sin(rad_1), np.cos(rad_1), 0, 0],
-                [0, 0, 1, self.z_offset],
-                [0, 0, 0, 1],
-            ]
-        )
-        self._T_W_2 = self._T_W_0 @ np.array(
-            [
-                [
-                    np.cos(rad_1 + rad_2),
-                    -np.sin(rad_1 + rad_2),
-                    0,
-                    self.link_length * np.cos(rad_1),
-                ],
-                [
-                    np.sin(rad_1 + rad_2),
-                    np.cos(rad_1 + rad_2),
-                    0,
-                    self.link_length * np.sin(rad_1),
-                ],
-                [0, 0, 1, 2 * self.z_offset],
-                [0, 0, 0, 1],
-            ]
-        )
-        self._T_W_3 = self._T_W_0 @ np.array(
-            [
-                [
-                    np.cos(rad_1 + rad_2),
-                    -np.sin(rad_1 + rad_2),
-                    0,
-                    self.link_length * (np.cos(rad_1) + np.cos(rad_1 + rad_2)),
-                ],
-                [
-                    np.sin(rad_1 + rad_2),
-                    np.cos(rad_1 + rad_2),
-                    0,
-                    self.link_length * (np.sin(rad_1) + np.sin(rad_1 + rad_2)),
-                ],
-                [0, 0, 1, 2 * self.z_offset],
-                [0, 0, 0, 1],
-            ]
-        )
-
-        self.transformations = [self._T_W_1, self._T_W_2, self._T_W_3]
-        self.set_joint_angles(np.array([theta_1, theta_2]))
+        self.transformations = list(get_joint_transforms(
+            rad_1, rad_2, l1=self.link_length, l2=self.link_length, z_offset=self.z_offset, base_transform=self._T_W_0
+        ))
+        self._T_W_1, self._T_W_2, self._T_W_3 = self.transformations
+
+        if actuate:
+            self.set_joint_angles(np.array([theta_1, theta_2]))
 
         for joint, transf_matrix in zip(self.joints[:-1], self.transformations[:-1]):
             joint.pose = transf_matrix[:3, 3]
 
         return self._T_W_3[:3, 3]
 
-    def inverse(self, x: float, y: float) -> np.array:
-        """Inverse kinematics of the arm
+    def inverse(self, x: float, y: float, actuate: bool = True) -> np.array:
+        """Inverse kinematics of the arm (elbow up)
 
         Args:
             x (float): x position of the end effector
             y (float): y position of the end effector
+            actuate (bool, optional): also move the servos to the solution. Defaults to True.
 
         Returns:
-            np.array: [theta_1, theta_2]
+            np.array: [theta_1, theta_2] in degrees, NaN if the position is out of reach
         """
-        theta_2 = -np.arccos(
-            (x**2 + y**2 - 2 * self.link_length**2) / (2 * self.link_length**2)
-        )
-        theta_1 = np.arctan(y / x) + np.arctan(
-            self.link_length
-            * np.sin(theta_2)
-            / (self.link_length * (1 + np.cos(theta_2)))
-        )
+        solution = inverse_kinematics(x, y, l1=self.link_length, l2=self.link_length, elbow="up")
+
         # Save angles in degrees
-        target_angles = np.degrees(np.array([theta_1, theta_2]))
+        target_angles = np.degrees(np.array([solution.theta_1, solution.theta_2]))
+
+        if not solution.reachable:
+            print(f"Position ({x}, {y}) is out of reach")
+            target_angles[:] = np.nan
 
-        self.set_joint_angles(target_angles)
+        if actuate:
+            self.set_joint_angles(target_angles)
 
         return target_angles
 
@@ -240,6 +202,7 @@ class AssistiveArm(BaseArm):
 
     def _cleanup_ports(self) -> None:
         """Cleanup all the GPIO ports used by the servos"""
+        self.dispatcher.close()
         self.joints[0]._motor.cleanup()
 
 
@@ -261,6 +224,7 @@ class Joint:
         self.pose = None
         self._motor = ServoControl(pin=self._assign_port())
         self.limits = self._motor.angle_range
+        self.worker = JointWorker(name=name, move=self._command, move_time=estimate_move_time, position=self.qpos)
 
     def get_qpos(self) -> float:
         # TODO This returns last set angle, modify to read from servo using a control loop
@@ -275,16 +239,25 @@ class Joint:
         return self.pose
 
     def set_qpos(self, angle: int) -> None:
-        """Store the angle and move the motor
+        """Store the angle and move the motor, waiting for the estimated travel time
 
         Args:
             angle (int): angle in degrees
         """
-        self._motor.set_angle(angle)
-        self.qpos = angle
-        sleep(0.05)
-        # TODO Figure out what's the ideal sleep time for the motors
-        # sleep(abs(angle)*0.14/(np.pi/3) + self.qpos)
+        self.worker.submit(angle).result()
+
+    def _command(self, angle: float) -> float:
+        """Send the angle to the servo without waiting
+
+        Args:
+            angle (float): angle in degrees
+
+        Returns:
+            float: commanded angle, after clamping to the servo range
+        """
+        self.qpos = self._motor.set_angle(angle, settle_time=0)
+
+        return self.qpos
 
     def get_limits(self) -> np.ndarray:
         """Get joint limits
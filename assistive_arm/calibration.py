@@ -0,0 +1,327 @@
+import numpy as np
+import yaml
+
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Literal
+
+from assistive_arm.display import StatusDisplay
+from assistive_arm.motor_control import CubemarsMotor
+from assistive_arm.scheduler import FixedRateLoop
+
+
+MOTOR_CALIBRATION_PATH = Path("./motor_calibration.yaml")
+
+# Stored with each entry: the motor's own zero is at this limit, older entries without it are ignored
+HARDWARE_ZERO = "right_limit"
+
+# Limits relative to the calibrated zero and the zero's position in the motor's frame (rad)
+JointLimits = namedtuple("JointLimits", ["lower", "upper", "offset"])
+
+
+class StallDetector:
+    """ Threshold and dwell stall detection on the velocity/torque stream.
+
+    A stall is reported once |velocity| stays below `velocity_threshold` (and |torque| above
+    `torque_threshold`, if set) for `dwell` seconds without interruption. Nothing is reported
+    during the first `arm_time` seconds after a reset, while the joint is still accelerating.
+    """
+
+    def __init__(
+        self,
+        velocity_threshold: float = 0.1,
+        dwell: float = 0.15,
+        torque_threshold: float = None,
+        arm_time: float = 0.3,
+    ) -> None:
+        """
+        Args:
+            velocity_threshold (float, optional): speed below which the joint is considered stopped (rad/s). Defaults to 0.1.
+            dwell (float, optional): time the condition must hold (s). Defaults to 0.15.
+            torque_threshold (float, optional): torque the joint must push with (Nm). Defaults to None (not checked).
+            arm_time (float, optional): time after a reset during which stalls are ignored (s). Defaults to 0.3.
+        """
+        self.velocity_threshold = velocity_threshold
+        self.dwell = dwell
+        self.torque_threshold = torque_threshold
+        self.arm_time = arm_time
+        self.reset()
+
+    def reset(self) -> None:
+        self.elapsed = 0.0
+        self.stopped_for = 0.0
+
+    def update(self, velocity: float, torque: float, dt: float) -> bool:
+        """ Add a sample
+
+        Args:
+            velocity (float): joint velocity (rad/s)
+            torque (float): measured torque (Nm)
+            dt (float): time since the previous sample (s)
+
+        Returns:
+            bool: True once the joint has stalled
+        """
+        self.elapsed += dt
+
+        stopped = abs(velocity) < self.velocity_threshold
+        if self.torque_threshold is not None:
+            stopped = stopped and abs(torque) > self.torque_threshold
+
+        self.stopped_for = self.stopped_for + dt if stopped else 0.0
+
+        return self.elapsed >= self.arm_time and self.stopped_for >= self.dwell
+
+
+class JointCalibrator:
+    """ Finds the two mechanical limits of a joint, one step per control tick.
+
+    States: "right" (driving towards the negative limit), "left" (positive limit), then
+    "done" or "failed" (timeout). The motor is zeroed at the right limit (send_zero_position),
+    so its own frame, which survives power cycles, is tied to the joint. A zero halfway
+    between the limits is kept as a software offset from there.
+    """
+
+    def __init__(
+        self,
+        motor: CubemarsMotor,
+        zero: Literal["right", "midpoint"] = "right",
+        speed: float = 3.0,
+        slow_down_after: float = 0.5,
+        timeout: float = 20.0,
+        detector: StallDetector = None,
+    ) -> None:
+        """
+        Args:
+            motor (CubemarsMotor): motor to calibrate
+            zero (Literal["right", "midpoint"], optional): where the zero is put. Defaults to "right".
+            speed (float, optional): initial speed (rad/s), a third of it after `slow_down_after`. Defaults to 3.
+            slow_down_after (float, optional): time at full speed for each limit (s). Defaults to 0.5.
+            timeout (float, optional): maximum time for each limit (s). Defaults to 20.
+            detector (StallDetector, optional): stall detector. Defaults to None (StallDetector()).
+        """
+        if zero not in ("right", "midpoint"):
+            raise ValueError(f"zero must be 'right' or 'midpoint', got {zero}")
+
+        self.motor = motor
+        self.zero = zero
+        self.speed = speed
+        self.slow_down_after = slow_down_after
+        self.timeout = timeout
+        self.detector = detector if detector is not None else StallDetector()
+
+        # Limits are measured in the motor's own frame
+        self.motor.position_offset = 0
+
+        self.state = "right"
+        self.state_time = 0.0
+        self.right_limit = None
+        self.left_limit = None
+        # Set once the motor was zeroed, a previous calibration of the joint is then no longer valid
+        self.zeroed = False
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def step(self, dt: float) -> None:
+        """ Command the joint for one tick and advance the state machine
+
+        Args:
+            dt (float): time since the previous step (s)
+        """
+        if self.finished:
+            self.motor.send_torque(desired_torque=0, safety=True)
+            return
+
+        self.state_time += dt
+        sign = -1 if self.state == "right" else 1
+        speed = self.speed if self.state_time < self.slow_down_after else self.speed / 3
+
+        self.motor.send_velocity(desired_vel=sign * speed)
+
+        if self.detector.update(self.motor.raw_velocity, self.motor.torque, dt):
+            self._limit_reached()
+        elif self.state_time > self.timeout:
+            print(f"\n{self.motor.type}: no {self.state} limit within {self.timeout}s")
+            self.state = "failed"
+
+    def _limit_reached(self) -> None:
+        if self.state == "right":
+            self.motor.send_zero_position()
+            self.zeroed = True
+            self.right_limit = self.motor.raw_position
+            self.state = "left"
+        else:
+            self.left_limit = self.motor.raw_position
+            self.state = "done"
+
+        self.state_time = 0.0
+        self.detector.reset()
+
+    @property
+    def limits(self) -> JointLimits:
+        """ Calibrated limits, None until both limits were found """
+        if self.state != "done":
+            return None
+
+        offset = self.right_limit if self.zero == "right" else (self.right_limit + self.left_limit) / 2
+
+        return JointLimits(
+            lower=float(self.right_limit - offset),
+            upper=float(self.left_limit - offset),
+            offset=float(offset),
+        )
+
+
+def calibrate_joints(calibrators: List[JointCalibrator], freq: int = 200) -> Dict[str, JointLimits]:
+    """ Run the calibration of all joints at once, from a single loop
+
+    Args:
+        calibrators (List[JointCalibrator]): one calibrator per motor
+        freq (int, optional): loop frequency (Hz). Defaults to 200.
+
+    Returns:
+        Dict[str, JointLimits]: limits of every joint that finished, by motor type
+    """
+    fields = [f"{field}_{i}" for i in range(len(calibrators)) for field in ("angle", "velocity", "torque")]
+
+    def render(values: dict) -> list:
+        return [
+            f"{calibrator.motor.type} [{calibrator.state}]: Angle: {np.rad2deg(values[f'angle_{i}']): .3f} "
+            f"Velocity: {values[f'velocity_{i}']: .3f} Torque: {values[f'torque_{i}']: .3f}"
+            for i, calibrator in enumerate(calibrators)
+        ]
+
+    loop = FixedRateLoop(dt=1 / freq)
+
+    with StatusDisplay(render, fields=fields) as display, loop:
+        for _ in loop:
+            for calibrator in calibrators:
+                calibrator.step(loop.dt)
+
+            display.update(**{
+                f"{field}_{i}": value
+                for i, calibrator in enumerate(calibrators)
+                for field, value in zip(
+                    ("angle", "velocity", "torque"),
+                    (calibrator.motor.raw_position, calibrator.motor.raw_velocity, calibrator.motor.torque),
+                )
+            })
+
+            if all(calibrator.finished for calibrator in calibrators):
+                break
+
+    for calibrator in calibrators:
+        calibrator.motor.send_torque(desired_torque=0, safety=True)
+
+    return {
+        calibrator.motor.type: calibrator.limits
+        for calibrator in calibrators
+        if calibrator.limits is not None
+    }
+
+
+def save_calibration(limits: Dict[str, JointLimits], path: Path = MOTOR_CALIBRATION_PATH) -> None:
+    """ Store joint limits, keeping the entries of motors that were not calibrated this time
+
+    Args:
+        limits (Dict[str, JointLimits]): limits by motor type
+        path (Path, optional): calibration file. Defaults to MOTOR_CALIBRATION_PATH.
+    """
+    path = Path(path)
+    calibration = {}
+    if path.exists():
+        with open(path, "r") as f:
+            calibration = yaml.load(f, Loader=yaml.FullLoader) or {}
+
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    for motor_type, joint_limits in limits.items():
+        calibration[motor_type] = {**joint_limits._asdict(), "hardware_zero": HARDWARE_ZERO, "calibrated_at": timestamp}
+
+    with open(path, "w") as f:
+        yaml.dump(calibration, f)
+
+
+def clear_calibration(motor_types: List[str], path: Path = MOTOR_CALIBRATION_PATH) -> None:
+    """ Remove stored entries, e.g. of motors zeroed by a calibration that didn't finish
+
+    Args:
+        motor_types (List[str]): motors to remove
+        path (Path, optional): calibration file. Defaults to MOTOR_CALIBRATION_PATH.
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+
+    with open(path, "r") as f:
+        calibration = yaml.load(f, Loader=yaml.FullLoader) or {}
+
+    for motor_type in motor_types:
+        calibration.pop(motor_type, None)
+
+    with open(path, "w") as f:
+        yaml.dump(calibration, f)
+
+
+def load_calibration(path: Path = MOTOR_CALIBRATION_PATH) -> Dict[str, JointLimits]:
+    """ Read stored joint limits, skipping entries not measured from the motor's zero at HARDWARE_ZERO
+
+    Args:
+        path (Path, optional): calibration file. Defaults to MOTOR_CALIBRATION_PATH.
+
+    Returns:
+        Dict[str, JointLimits]: limits by motor type, empty if there is no file
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+
+    with open(path, "r") as f:
+        calibration = yaml.load(f, Loader=yaml.FullLoader) or {}
+
+    return {
+        motor_type: JointLimits(lower=entry["lower"], upper=entry["upper"], offset=entry["offset"])
+        for motor_type, entry in calibration.items()
+        if entry.get("hardware_zero") == HARDWARE_ZERO
+    }
+
+
+def apply_calibration(motor: CubemarsMotor, path: Path = MOTOR_CALIBRATION_PATH, margin: float = float(np.deg2rad(5))) -> bool:
+    """ Use the stored zero of a connected motor, if the joint is where the calibration says it can be.
+
+    The stored limits are measured from the motor's own zero, set at the right limit during
+    calibration. As a sanity check against a motor zeroed elsewhere since, the calibration is
+    only applied if the current position lies within the stored limits.
+
+    Args:
+        motor (CubemarsMotor): connected motor
+        path (Path, optional): calibration file. Defaults to MOTOR_CALIBRATION_PATH.
+        margin (float, optional): tolerance on the limits (rad). Defaults to 5 deg.
+
+    Returns:
+        bool: True if the calibration was applied
+    """
+    limits = load_calibration(path).get(motor.type)
+    if limits is None:
+        print(f"{motor.type}: no stored calibration, run scripts/calibrate_motors.py")
+        return False
+
+    # Fresh position reading
+    motor.send_torque(desired_torque=0, safety=True)
+
+    position = motor.raw_position + motor.position_offset - limits.offset
+    if not limits.lower - margin <= position <= limits.upper + margin:
+        print(
+            f"{motor.type}: stored calibration doesn't match the joint position ({np.rad2deg(position):.1f}º "
+            f"outside [{np.rad2deg(limits.lower):.1f}º, {np.rad2deg(limits.upper):.1f}º]), recalibrate"
+        )
+        return False
+
+    motor.position_offset = limits.offset
+    # Restart the moving average in the new frame
+    motor._first_run = True
+    motor.predictor.reset()
+
+    return True
@@ -0,0 +1,110 @@
+import sys
+import threading
+
+from typing import Callable, List, TextIO
+
+from assistive_arm.executive import SharedState
+from assistive_arm.realtime import release_thread
+from assistive_arm.scheduler import FixedRateLoop
+
+
+class StatusDisplay:
+    """ Terminal dashboard rendered on its own thread from a SharedState snapshot.
+
+    The control loop only writes numbers with update() (or directly into the shared state);
+    formatting and terminal writes happen here. A frame is written in one call, and if the
+    terminal is slow the frames that could not be written on time are dropped, never queued.
+
+        with StatusDisplay(render, fields=["theta", "torque"]) as display:
+            for t in loop:
+                display.update(theta=motor.position, torque=motor.torque)
+    """
+
+    def __init__(
+        self,
+        render: Callable[[dict], List[str]],
+        state: SharedState = None,
+        fields: List[str] = None,
+        rate: float = 20,
+        stream: TextIO = None,
+    ) -> None:
+        """
+        Args:
+            render (Callable[[dict], List[str]]): builds the dashboard lines from the state values,
+                must always return the same number of lines
+            state (SharedState, optional): state to display. Defaults to None (a new one with `fields`).
+            fields (List[str], optional): fields of the new state. Defaults to None.
+            rate (float, optional): refresh rate (Hz). Defaults to 20.
+            stream (TextIO, optional): output stream. Defaults to None (sys.stdout).
+        """
+        if state is None and fields is None:
+            raise ValueError("StatusDisplay needs a state or its fields")
+
+        self.render = render
+        self.state = state if state is not None else SharedState(fields)
+        self.rate = rate
+        self.stream = stream if stream is not None else sys.stdout
+
+        self.frames = 0
+        self.dropped = 0
+
+        self._lines = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def update(self, **values: float) -> None:
+        """ Write new values (control thread side, no formatting or I/O)
+
+        Args:
+            **values (float): values by field name
+        """
+        self.state.write(**values)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="status_display", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stop the display thread and draw the last frame """
+        if self._thread is None:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.draw()
+
+    def draw(self) -> None:
+        """ Render the current state and overwrite the previous frame """
+        lines = self.render(self.state.as_dict())
+
+        # Move back to the first line of the previous frame and clear each line before rewriting it
+        frame = f"\x1b[{self._lines}A" if self._lines else ""
+        frame += "".join(f"\x1b[2K{line}\n" for line in lines)
+
+        self.stream.write(frame)
+        self.stream.flush()
+        self._lines = len(lines)
+        self.frames += 1
+
+    def _run(self) -> None:
+        # Started inside realtime_mode the thread would inherit SCHED_FIFO and the control CPU
+        release_thread(nice=10)
+
+        # No busy wait, a late frame doesn't matter
+        loop = FixedRateLoop(dt=1 / self.rate, overrun="skip", spin=0, handle_signals=False)
+
+        with loop:
+            for _ in loop:
+                if self._stop.is_set():
+                    break
+                self.draw()
+                self.dropped = loop.skipped
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,219 @@
+import sys
+import threading
+import numpy as np
+
+from collections import namedtuple
+from typing import Callable, List, Optional
+
+from assistive_arm.realtime import release_thread
+from assistive_arm.scheduler import FixedRateLoop
+
+
+Task = namedtuple("Task", ["name", "function", "period", "priority"])
+
+
+class SharedState:
+    """ Preallocated block of named float values shared between tasks.
+
+    One task writes, any number of tasks read consistent snapshots: the version is odd while
+    a write is in progress and readers retry until they copy the block between two equal even versions.
+    """
+
+    def __init__(self, fields: List[str]) -> None:
+        """
+        Args:
+            fields (List[str]): value names
+        """
+        self.fields = list(fields)
+        self.index = {field: i for i, field in enumerate(self.fields)}
+        self.values = np.full(len(self.fields), np.nan)
+        self._snapshot = np.empty_like(self.values)
+        self.version = 0
+
+    def write(self, **values: float) -> None:
+        """ Update values (single writer)
+
+        Args:
+            **values (float): new values by name
+        """
+        self.version += 1
+        for field, value in values.items():
+            self.values[self.index[field]] = value
+        self.version += 1
+
+    def snapshot(self, out: np.ndarray = None) -> np.ndarray:
+        """ Consistent copy of all values
+
+        Args:
+            out (np.ndarray, optional): array to copy into. Defaults to None (internal buffer, overwritten by the next call).
+
+        Returns:
+            np.ndarray: values in field order
+        """
+        out = self._snapshot if out is None else out
+        while True:
+            version = self.version
+            if version % 2:
+                continue
+            np.copyto(out, self.values)
+            if self.version == version:
+                return out
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.fields, self.snapshot().tolist()))
+
+
+class RingBuffer:
+    """ Preallocated single producer, single consumer buffer of fixed size rows.
+
+    The producer never blocks: if the consumer falls more than `capacity` rows behind,
+    the oldest rows are overwritten and counted in `dropped`.
+    """
+
+    def __init__(self, width: int, capacity: int = 4096) -> None:
+        """
+        Args:
+            width (int): values per row
+            capacity (int, optional): number of rows. Defaults to 4096.
+        """
+        self.capacity = capacity
+        self.rows = np.zeros((capacity, width))
+        self.written = 0
+        self.read = 0
+        self.dropped = 0
+
+    def push(self, row) -> None:
+        self.rows[self.written % self.capacity] = row
+        self.written += 1
+
+    def drain(self) -> np.ndarray:
+        """ Rows written since the last drain, oldest first
+
+        Returns:
+            np.ndarray: (n, width) copy of the rows
+        """
+        written = self.written
+
+        if written - self.read > self.capacity:
+            self.dropped += written - self.read - self.capacity
+            self.read = written - self.capacity
+
+        indices = np.arange(self.read, written) % self.capacity
+        self.read = written
+
+        return self.rows[indices]
+
+
+class Executive:
+    """ Runs tasks at their own rates so slow work never delays the critical one.
+
+    The highest priority task runs on the calling thread (it keeps the real-time settings and
+    Ctrl + C handling), every other task gets its own thread with normal scheduling and a
+    lower nice value. Tasks are called as function(t) and stop the executive by returning False.
+    A task with period None is called back to back and is expected to block (e.g. on a socket).
+    """
+
+    def __init__(self, switch_interval: float = 0.0005, overrun: str = "catch_up") -> None:
+        """
+        Args:
+            switch_interval (float, optional): GIL switch interval while running (s), the default 5 ms
+                would let a background task hold up the critical one. Defaults to 0.0005.
+            overrun (str, optional): overrun policy of the critical task loop. Defaults to "catch_up".
+        """
+        self.switch_interval = switch_interval
+        self.overrun = overrun
+        self.tasks = []
+        self.loops = {}
+        self.errors = []
+        # Background tasks still running after run() returned (their join timed out)
+        self.unfinished = []
+
+        self._stop = threading.Event()
+
+    def add_task(self, name: str, function: Callable[[float], Optional[bool]], rate: float = None, priority: int = 0) -> Task:
+        """ Register a task
+
+        Args:
+            name (str): task name
+            function (Callable[[float], Optional[bool]]): called with the loop time, return False to stop
+            rate (float, optional): frequency (Hz). Defaults to None (called back to back).
+            priority (int, optional): higher runs on the calling thread and is niced less. Defaults to 0.
+
+        Returns:
+            Task: registered task
+        """
+        task = Task(name=name, function=function, period=1 / rate if rate else None, priority=priority)
+        self.tasks.append(task)
+
+        return task
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return not self._stop.is_set()
+
+    def run(self) -> None:
+        """ Run all tasks until one returns False, raises, or Ctrl + C is pressed """
+        if not self.tasks:
+            return
+
+        tasks = sorted(self.tasks, key=lambda task: task.priority, reverse=True)
+        critical, background = tasks[0], tasks[1:]
+
+        self._stop.clear()
+        previous_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.switch_interval)
+
+        threads = [
+            threading.Thread(target=self._run_background, args=(task, rank), name=task.name, daemon=True)
+            for rank, task in enumerate(background, start=1)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            self._run_task(critical, handle_signals=True)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=1)
+            self.unfinished = [thread.name for thread in threads if thread.is_alive()]
+            sys.setswitchinterval(previous_interval)
+
+        if self.errors:
+            name, error = self.errors[0]
+            raise RuntimeError(f"Task {name} failed") from error
+
+    def _run_background(self, task: Task, rank: int) -> None:
+        # Threads inherit SCHED_FIFO and the CPU pin from the real-time mode, background work should not
+        release_thread(nice=min(19, 5 * rank))
+
+        try:
+            self._run_task(task, handle_signals=False)
+        except Exception as e:
+            self.errors.append((task.name, e))
+            self._stop.set()
+
+    def _run_task(self, task: Task, handle_signals: bool) -> None:
+        if task.period is None:
+            while not self._stop.is_set():
+                if task.function(0.0) is False:
+                    self._stop.set()
+            return
+
+        loop = FixedRateLoop(
+            dt=task.period,
+            overrun=self.overrun if handle_signals else "skip",
+            handle_signals=handle_signals,
+        )
+        self.loops[task.name] = loop
+
+        with loop:
+            for t in loop:
+                if self._stop.is_set():
+                    break
+                if task.function(t) is False:
+                    self._stop.set()
+                    break
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from collections import namedtuple
+from scipy.signal import savgol_filter
+
+from assistive_arm.robotic_arm import get_jacobian
+
+
+ImpedanceSetpoint = namedtuple("ImpedanceSetpoint", ["position", "velocity", "kp", "kd", "torque_ff"])
+
+
+class ImpedanceSetpointGenerator:
+    """ Impedance setpoints that let the motors' internal loop follow the assistance profile between host updates.
+
+    Around the position predicted for the middle of the next host period p0, each joint's
+    assistance torque tau = -J(theta)^T F(phase) is linearised as tau(p) = tau(p0) + dtau/dp * (p - p0).
+    Sending p0 as the position setpoint, tau(p0) as feedforward and kp = -dtau/dp makes the
+    motor apply that linearisation at its own rate. The slope has two parts:
+        - the Jacobian's change at a fixed force, smooth by construction
+        - for motor_2, which sets the phase, the force's change along the profile, taken from
+          the profile rows smoothed with a Savitzky-Golay filter rather than from the steps
+          between neighbouring rows
+    Where the torque grows with the angle (dtau/dp > 0), a negative stiffness would be needed,
+    so kp is 0 and the torque is held constant instead. kp is then low-pass filtered over
+    time so a change of row never steps the stiffness. The velocity setpoint is the measured
+    velocity, so kd damps deviations from the current motion without resisting the motion itself.
+    """
+
+    def __init__(
+        self,
+        profile: pd.DataFrame,
+        period: float,
+        lookahead: float = None,
+        kd: tuple = (0.2, 0.1),
+        max_kp: tuple = (40.0, 15.0),
+        smoothing_window: int = 21,
+        kp_time_constant: float = 0.05,
+        step: float = 1e-4,
+    ) -> None:
+        """
+        Args:
+            profile (pd.DataFrame): assistance profile
+            period (float): host update period (s)
+            lookahead (float, optional): prediction of the measured angles (s). Defaults to None (half a period).
+            kd (tuple, optional): damping of motor_1 and motor_2 (Nm s/rad). Defaults to (0.2, 0.1).
+            max_kp (tuple, optional): stiffness limits of motor_1 and motor_2 (Nm/rad). Defaults to (40, 15).
+            smoothing_window (int, optional): profile rows of the force derivative filter. Defaults to 21.
+            kp_time_constant (float, optional): time constant of the stiffness low-pass (s). Defaults to 0.05.
+            step (float, optional): finite difference step of the Jacobian slope (rad). Defaults to 1e-4.
+        """
+        self.period = period
+        self.lookahead = period / 2 if lookahead is None else lookahead
+        self.kd = kd
+        self.max_kp = max_kp
+        self.step = step
+        self.kp_smoothing = period / (period + kp_time_constant)
+
+        self.theta_2 = profile.theta_2.to_numpy(dtype=float)
+        self.percentage = profile.index.to_numpy(dtype=float)
+        self.force = profile[["force_X", "force_Y"]].to_numpy(dtype=float)
+        self.force_slope = self._get_force_slope(smoothing_window)
+
+        self.reset()
+
+    def _get_force_slope(self, window: int) -> np.ndarray:
+        """ dF/dtheta_2 along the profile (n, 2), as the ratio of smoothed derivatives along the rows """
+        window = min(window, len(self.theta_2) - len(self.theta_2) % 2 - 1)
+        dforce = savgol_filter(self.force, window, polyorder=3, deriv=1, axis=0)
+        dtheta_2 = savgol_filter(self.theta_2, window, polyorder=3, deriv=1)
+
+        # Where theta_2 barely moves along the profile it can't set the phase, regularise the
+        # ratio instead of letting it blow up
+        epsilon = 0.1 * np.median(np.abs(dtheta_2))
+        return dforce * (dtheta_2 / (dtheta_2 ** 2 + epsilon ** 2))[:, np.newaxis]
+
+    def reset(self) -> None:
+        """ Restart the stiffness filter, e.g. before a new trial """
+        self.kp = None
+
+    def __call__(self, theta_1: float, theta_2: float, velocity_1: float = 0, velocity_2: float = 0, row: int = None) -> tuple:
+        """ Setpoints for the next host period
+
+        Args:
+            theta_1 (float): motor_1 angle
+            theta_2 (float): motor_2 angle
+            velocity_1 (float, optional): motor_1 velocity. Defaults to 0.
+            velocity_2 (float, optional): motor_2 velocity. Defaults to 0.
+            row (int, optional): profile row, e.g. from a PhaseTracker. Defaults to None (closest theta_2).
+
+        Returns:
+            tuple: ImpedanceSetpoint of motor_1, ImpedanceSetpoint of motor_2, index (percentage of profile)
+        """
+        p_1 = theta_1 + velocity_1 * self.lookahead
+        p_2 = theta_2 + velocity_2 * self.lookahead
+
+        if row is None:
+            row = int(np.abs(self.theta_2 - p_2).argmin())
+        force = self.force[row]
+
+        # Torques at p0 and with each joint moved by +-step, from a single Jacobian evaluation
+        step = self.step
+        jacobians = get_jacobian(
+            np.array([p_1, p_1 + step, p_1 - step, p_1, p_1]),
+            np.array([p_2, p_2, p_2, p_2 + step, p_2 - step]),
+        )
+        torques = -np.einsum("jin,j->in", jacobians, force)
+        tau_1, tau_2 = torques[:, 0]
+
+        slope_1 = (torques[0, 1] - torques[0, 2]) / (2 * step)
+        slope_2 = (torques[1, 3] - torques[1, 4]) / (2 * step) - jacobians[:, 1, 0] @ self.force_slope[row]
+
+        kp = (
+            min(max(0.0, -slope_1), self.max_kp[0]),
+            min(max(0.0, -slope_2), self.max_kp[1]),
+        )
+        if self.kp is None:
+            self.kp = kp
+        else:
+            self.kp = tuple(previous + self.kp_smoothing * (new - previous) for previous, new in zip(self.kp, kp))
+
+        return (
+            ImpedanceSetpoint(position=p_1, velocity=velocity_1, kp=self.kp[0], kd=self.kd[0], torque_ff=tau_1),
+            ImpedanceSetpoint(position=p_2, velocity=velocity_2, kp=self.kp[1], kd=self.kd[1], torque_ff=tau_2),
+            self.percentage[row],
+        )
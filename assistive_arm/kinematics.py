@@ -0,0 +1,177 @@
+import numpy as np
+
+from collections import namedtuple
+from typing import Literal
+
+
+# Robot base (frame 0) in the world frame, measurements in mm
+T_W_0 = np.array([[0, -1, 0, 516.78],
+                  [1, 0, 0, -1672.9],
+                  [0, 0, 1, 732.7],
+                  [0, 0, 0, 1]])
+T_W_0.flags.writeable = False
+
+IKSolution = namedtuple("IKSolution", ["theta_1", "theta_2", "reachable"])
+
+
+def planar_forward(theta_1: np.ndarray, theta_2: np.ndarray, l1: float, l2: float) -> np.ndarray:
+    """ End-effector position of the planar two-link arm in the base frame
+
+    Args:
+        theta_1 (np.ndarray): joint 1 angles (rad)
+        theta_2 (np.ndarray): joint 2 angles relative to link 1 (rad)
+        l1 (float): length of link 1
+        l2 (float): length of link 2
+
+    Returns:
+        np.ndarray: [x, y] (..., 2)
+    """
+    theta_1, theta_2 = np.broadcast_arrays(np.asarray(theta_1, dtype=float), np.asarray(theta_2, dtype=float))
+    theta_12 = theta_1 + theta_2
+
+    return np.stack([
+        l1 * np.cos(theta_1) + l2 * np.cos(theta_12),
+        l1 * np.sin(theta_1) + l2 * np.sin(theta_12),
+    ], axis=-1)
+
+
+def get_joint_transforms(
+    theta_1: np.ndarray,
+    theta_2: np.ndarray,
+    l1: float,
+    l2: float,
+    z_offset: float = 0,
+    base_transform: np.ndarray = T_W_0,
+) -> np.ndarray:
+    """ World transforms of joint 1, joint 2 and the end effector
+
+    Args:
+        theta_1 (np.ndarray): joint 1 angles (rad)
+        theta_2 (np.ndarray): joint 2 angles relative to link 1 (rad)
+        l1 (float): length of link 1
+        l2 (float): length of link 2
+        z_offset (float, optional): z distance between consecutive links. Defaults to 0.
+        base_transform (np.ndarray, optional): base frame in the world frame. Defaults to T_W_0.
+
+    Returns:
+        np.ndarray: transforms (..., 3, 4, 4)
+    """
+    theta_1, theta_2 = np.broadcast_arrays(np.asarray(theta_1, dtype=float), np.asarray(theta_2, dtype=float))
+    theta_12 = theta_1 + theta_2
+
+    transforms = np.zeros(theta_1.shape + (3, 4, 4))
+    transforms[..., :, 2, 2] = 1
+    transforms[..., :, 3, 3] = 1
+
+    for i, angle in enumerate([theta_1, theta_12, theta_12]):
+        cos, sin = np.cos(angle), np.sin(angle)
+        transforms[..., i, 0, 0] = cos
+        transforms[..., i, 0, 1] = -sin
+        transforms[..., i, 1, 0] = sin
+        transforms[..., i, 1, 1] = cos
+
+    transforms[..., 0, 2, 3] = z_offset
+
+    transforms[..., 1, 0, 3] = l1 * np.cos(theta_1)
+    transforms[..., 1, 1, 3] = l1 * np.sin(theta_1)
+    transforms[..., 1, 2, 3] = 2 * z_offset
+
+    transforms[..., 2, :2, 3] = planar_forward(theta_1, theta_2, l1, l2)
+    transforms[..., 2, 2, 3] = 2 * z_offset
+
+    return base_transform @ transforms
+
+
+def forward_kinematics(
+    theta_1: np.ndarray,
+    theta_2: np.ndarray,
+    l1: float,
+    l2: float,
+    z_offset: float = 0,
+    base_transform: np.ndarray = T_W_0,
+) -> np.ndarray:
+    """ World positions of joint 1, joint 2 and the end effector
+
+    Args:
+        theta_1 (np.ndarray): joint 1 angles (rad)
+        theta_2 (np.ndarray): joint 2 angles relative to link 1 (rad)
+        l1 (float): length of link 1
+        l2 (float): length of link 2
+        z_offset (float, optional): z distance between consecutive links. Defaults to 0.
+        base_transform (np.ndarray, optional): base frame in the world frame. Defaults to T_W_0.
+
+    Returns:
+        np.ndarray: positions (..., 3, 3), the end effector is [..., 2, :]
+    """
+    return get_joint_transforms(theta_1, theta_2, l1, l2, z_offset, base_transform)[..., :3, 3]
+
+
+def inverse_kinematics(
+    x: np.ndarray,
+    y: np.ndarray,
+    l1: float,
+    l2: float,
+    elbow: Literal["up", "down"] = "up",
+) -> IKSolution:
+    """ Joint angles placing the end effector at (x, y) in the base frame
+
+    Elbow "up" gives theta_2 <= 0, "down" theta_2 >= 0. Unreachable targets are solved for the
+    closest point of the workspace on the same ray and flagged in the reachability mask.
+
+    Args:
+        x (np.ndarray): end-effector x
+        y (np.ndarray): end-effector y
+        l1 (float): length of link 1
+        l2 (float): length of link 2
+        elbow (Literal["up", "down"], optional): elbow configuration. Defaults to "up".
+
+    Returns:
+        IKSolution: theta_1, theta_2 (rad) and reachable mask, with the shape of x and y
+    """
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+
+    cos_theta_2 = (x**2 + y**2 - l1**2 - l2**2) / (2 * l1 * l2)
+    reachable = np.abs(cos_theta_2) <= 1
+
+    theta_2 = np.arccos(np.clip(cos_theta_2, -1, 1))
+    if elbow == "up":
+        theta_2 = -theta_2
+
+    theta_1 = np.arctan2(y, x) - np.arctan2(l2 * np.sin(theta_2), l1 + l2 * np.cos(theta_2))
+
+    return IKSolution(theta_1=theta_1, theta_2=theta_2, reachable=reachable)
+
+
+def inverse_kinematics_both(x: np.ndarray, y: np.ndarray, l1: float, l2: float) -> IKSolution:
+    """ Elbow-up and elbow-down solutions stacked along a last axis of size 2
+
+    Args:
+        x (np.ndarray): end-effector x
+        y (np.ndarray): end-effector y
+        l1 (float): length of link 1
+        l2 (float): length of link 2
+
+    Returns:
+        IKSolution: theta_1, theta_2 (..., 2) as [up, down], reachable mask (...)
+    """
+    up = inverse_kinematics(x, y, l1, l2, elbow="up")
+    down = inverse_kinematics(x, y, l1, l2, elbow="down")
+
+    return IKSolution(
+        theta_1=np.stack([up.theta_1, down.theta_1], axis=-1),
+        theta_2=np.stack([up.theta_2, down.theta_2], axis=-1),
+        reachable=up.reachable,
+    )
+
+
+def within_joint_limits(theta: np.ndarray, limits: np.ndarray) -> np.ndarray:
+    """ Mask of angles within [min, max]
+
+    Args:
+        theta (np.ndarray): joint angles
+        limits (np.ndarray): [min, max]
+
+    Returns:
+        np.ndarray: boolean mask
+    """
+    return (theta >= limits[0]) & (theta <= limits[1])
@@ -0,0 +1,331 @@
+import itertools
+import multiprocessing
+import os
+import resource
+import time
+import traceback
+import yaml
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+
+# Fields of a job, with the values used when neither the job nor the manifest defaults set them
+JOB_DEFAULTS = {
+    "subject": None,
+    "trial": None,
+    "t_0": None,
+    "t_f": None,
+    "assistive_force": None,
+    "mesh_interval": 0.05,
+    "model_type": "simple",
+    "ground_forces": False,
+    "minimal_actuators": False,
+    "reserve_pelvis_weight": 15,
+    "coarse_mesh_interval": None,
+    "mesh_refinement_steps": 2,
+    "warm_start": True,
+}
+
+# Jobs whose solutions can warm start each other only differ outside these fields
+WARM_START_KEYS = ["subject", "trial", "t_0", "t_f", "model_type", "ground_forces", "minimal_actuators"]
+
+
+def load_manifest(manifest_path: Path) -> tuple[dict, list[dict]]:
+    """ Load a batch manifest and expand it into individual jobs.
+
+    The manifest is a YAML file with a `subjects_dir`, an `output_dir`, optional
+    `defaults` and a list of `jobs`. Any job field given as a list is expanded,
+    so one entry can describe e.g. several assistive forces and mesh intervals:
+
+        subjects_dir: /path/to/subject_data
+        output_dir: ./moco/batch_results
+        defaults:
+          reserve_pelvis_weight: 15
+        jobs:
+          - subject: subject_4
+            trial: trial_4
+            t_0: 5.45
+            t_f: 8
+            assistive_force: [null, 700]
+            mesh_interval: [0.08, 0.05]
+            coarse_mesh_interval: 0.15  # optional, solve 0.15 -> ... -> mesh_interval
+
+    Jobs with `warm_start` start from the finest solved job of the same subject,
+    trial and time window found in the results index.
+
+    Args:
+        manifest_path (Path): path to the manifest
+
+    Returns:
+        tuple[dict, list[dict]]: manifest settings, expanded jobs
+    """
+    with open(manifest_path, "r") as f:
+        manifest = yaml.load(f, Loader=yaml.FullLoader)
+
+    defaults = {**JOB_DEFAULTS, **manifest.get("defaults", {})}
+    jobs = []
+
+    for entry in manifest["jobs"]:
+        entry = {**defaults, **entry}
+        keys = list(entry.keys())
+        values = [value if isinstance(value, list) else [value] for value in entry.values()]
+
+        for combination in itertools.product(*values):
+            job = dict(zip(keys, combination))
+            missing = [key for key in ["subject", "trial", "t_0", "t_f"] if job[key] is None]
+            if missing:
+                raise ValueError(f"Job {job} is missing {missing}")
+            jobs.append(job)
+
+    settings = {
+        "subjects_dir": Path(manifest["subjects_dir"]),
+        "output_dir": Path(manifest.get("output_dir", "./moco/batch_results")),
+    }
+
+    return settings, jobs
+
+
+def get_job_name(job: dict) -> str:
+    """ Unique, readable name of a job, used for its working directory
+
+    Args:
+        job (dict): job description
+
+    Returns:
+        str: job name
+    """
+    return (
+        f"{job['subject']}_{job['model_type']}_{job['trial']}"
+        f"_assistance_{str(job['assistive_force']).lower()}"
+        f"_mesh_{job['mesh_interval']}_t_{job['t_0']}-{job['t_f']}"
+    )
+
+
+def get_mesh_intervals(job: dict) -> list:
+    """ Mesh intervals solved in sequence for a job, from coarse to the job's mesh interval
+
+    Args:
+        job (dict): job description
+
+    Returns:
+        list: mesh intervals
+    """
+    if not job["coarse_mesh_interval"] or job["coarse_mesh_interval"] <= job["mesh_interval"]:
+        return [job["mesh_interval"]]
+
+    intervals = np.geomspace(job["coarse_mesh_interval"], job["mesh_interval"], job["mesh_refinement_steps"] + 1)
+
+    return [round(float(interval), 4) for interval in intervals]
+
+
+def find_warm_start(results: pd.DataFrame, job: dict) -> str:
+    """ Find the finest solved solution of a job with the same subject, trial and time window
+
+    Args:
+        results (pd.DataFrame): results index
+        job (dict): job description
+
+    Returns:
+        str: solution path, None if there is none
+    """
+    if results.empty or "solution_path" not in results.columns:
+        return None
+
+    candidates = results[results.status == "solved"]
+    for key in WARM_START_KEYS:
+        candidates = candidates[candidates[key] == job[key]]
+
+    candidates = candidates[candidates.solution_path.map(lambda path: Path(str(path)).exists())]
+
+    if candidates.empty:
+        return None
+
+    return candidates.sort_values("mesh_interval", kind="stable").iloc[0].solution_path
+
+
+def _limit_worker_resources(memory_limit_gb: float = None, threads_per_job: int = 1) -> None:
+    """ Pool initializer: cap memory and threads of a worker process
+
+    Args:
+        memory_limit_gb (float, optional): address space limit per worker (GB). Defaults to None.
+        threads_per_job (int, optional): threads available to each solve. Defaults to 1.
+    """
+    if memory_limit_gb:
+        limit = int(memory_limit_gb * 1024**3)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_job)
+
+
+def solve_job(job: dict, subjects_dir: Path, output_dir: Path, warm_start_path: str = None) -> dict:
+    """ Build and solve the tracking problem of a job in its own working directory
+
+    Args:
+        job (dict): job description (see load_manifest)
+        subjects_dir (Path): directory containing one folder per subject
+        output_dir (Path): directory containing one folder per job
+        warm_start_path (str, optional): solution used as initial guess. Defaults to None.
+
+    Returns:
+        dict: job description with status, paths and solver statistics
+    """
+    job_name = get_job_name(job)
+    job_dir = Path(output_dir) / job_name
+    job_dir.mkdir(parents=True, exist_ok=True)
+
+    subject_data = Path(subjects_dir) / job["subject"]
+    trial = subject_data / job["trial"]
+    model_path = Path(job.get("model_path") or subject_data / "model" / "LaiUhlrich2022_scaled.osim")
+
+    config_file = {
+        **job,
+        "trial": str(trial),
+        "grf_path": str(trial / "grf_filtered.mot"),
+        "solution_name": job_name,
+        "solution_path": str(job_dir / f"{job_name}.sto"),
+        "mesh_intervals": get_mesh_intervals(job),
+        "warm_start_path": warm_start_path,
+    }
+    config_path = job_dir / f"{job_name}.yaml"
+
+    record = {
+        **job,
+        "job_name": job_name,
+        "job_dir": str(job_dir),
+        "config_path": str(config_path),
+        "solution_path": None,
+        "warm_start_path": warm_start_path,
+        "status": "failed",
+        "success": False,
+        "objective": None,
+        "solve_time": None,
+        "error": None,
+    }
+
+    start_time = time.time()
+
+    try:
+        # OpenSim is only imported inside the workers
+        import opensim as osim
+
+        from assistive_arm.moco_helpers import (
+            get_model,
+            solve_with_mesh_refinement,
+        )
+
+        model = get_model(
+            subject_name=f"{job['subject']}_{job['model_type']}",
+            model_path=model_path,
+            target_path=job_dir,
+            assistive_force=job["assistive_force"],
+            ground_forces=job["ground_forces"],
+            minimal_actuators=job["minimal_actuators"],
+            config=config_file,
+            model_dir=job_dir,
+        )
+        model.initSystem()
+
+        with open(config_path, "w") as f:
+            yaml.dump(config_file, f)
+
+        initial_guess = osim.MocoTrajectory(warm_start_path) if warm_start_path else None
+
+        solution = solve_with_mesh_refinement(
+            model=model,
+            markers_path=str(trial / "opencap_tracker.trc"),
+            t_0=job["t_0"],
+            t_f=job["t_f"],
+            config=config_file,
+            mesh_intervals=config_file["mesh_intervals"],
+            initial_guess=initial_guess,
+            parallel=int(os.environ.get("OMP_NUM_THREADS", 1)),
+        )
+        solution.write(config_file["solution_path"])
+
+        record["solution_path"] = config_file["solution_path"]
+        record["success"] = bool(solution.success())
+        record["objective"] = float(solution.getObjective())
+        record["status"] = "solved" if record["success"] else "not_converged"
+
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        with open(job_dir / "error.log", "w") as f:
+            f.write(traceback.format_exc())
+
+    record["solve_time"] = time.time() - start_time
+
+    return record
+
+
+def _solve_job_star(args: tuple) -> dict:
+    return solve_job(*args)
+
+
+def run_batch(
+    manifest_path: Path,
+    n_workers: int = None,
+    threads_per_job: int = 1,
+    memory_limit_gb: float = None,
+    skip_solved: bool = True,
+) -> pd.DataFrame:
+    """ Solve every job of a manifest across a process pool and index the results
+
+    Each worker process handles a single job before being replaced, so memory
+    held by OpenSim/CasADi is returned between solves.
+
+    Args:
+        manifest_path (Path): path to the manifest (see load_manifest)
+        n_workers (int, optional): parallel solves. Defaults to None (cores / threads_per_job).
+        threads_per_job (int, optional): threads given to each solve. Defaults to 1.
+        memory_limit_gb (float, optional): address space limit per solve (GB). Defaults to None.
+        skip_solved (bool, optional): skip jobs already solved in the results index. Defaults to True.
+
+    Returns:
+        pd.DataFrame: results index, also written to output_dir/results_index.csv
+    """
+    settings, jobs = load_manifest(manifest_path)
+    output_dir = settings["output_dir"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index_path = output_dir / "results_index.csv"
+
+    previous = pd.read_csv(index_path) if index_path.exists() else pd.DataFrame(columns=["job_name", "status"])
+
+    if skip_solved:
+        solved = set(previous.loc[previous.status == "solved", "job_name"])
+        pending = [job for job in jobs if get_job_name(job) not in solved]
+    else:
+        pending = jobs
+
+    if n_workers is None:
+        n_workers = max(1, (os.cpu_count() or 1) // threads_per_job)
+
+    print(f"Solving {len(pending)} of {len(jobs)} jobs on {n_workers} workers...")
+
+    records = []
+    args = [
+        (job, settings["subjects_dir"], output_dir, find_warm_start(previous, job) if job["warm_start"] else None)
+        for job in pending
+    ]
+
+    with multiprocessing.Pool(
+        processes=n_workers,
+        initializer=_limit_worker_resources,
+        initargs=(memory_limit_gb, threads_per_job),
+        maxtasksperchild=1,
+    ) as pool:
+        for i, record in enumerate(pool.imap_unordered(_solve_job_star, args)):
+            records.append(record)
+            print(f"[{i + 1}/{len(pending)}] {record['job_name']}: {record['status']} ({record['solve_time']:.0f}s)")
+
+            # Keep the index up to date so finished solves survive an interrupted batch
+            results = pd.concat([previous, pd.DataFrame(records)], ignore_index=True)
+            results = results.drop_duplicates(subset="job_name", keep="last")
+            results.to_csv(index_path, index=False)
+
+    if not records:
+        return previous
+
+    return pd.read_csv(index_path)
@@ -1,9 +1,17 @@
+import hashlib
+import json
 import numpy as np
 import opensim as osim
+import os
+import shutil
 
 from pathlib import Path
 
 
+# Bump when the processing in process_muscle_driven_model changes to invalidate cached models
+MODEL_CACHE_VERSION = 1
+
+
 def simplify_model(model_name: str, model: osim.Model) -> None:
     """ Simplify model by reducing actuators and muscles
 
@@ -111,7 +119,65 @@ def getMuscleDrivenModel(
     ground_forces: bool,
     minimal_actuators: bool,
     config: dict = None,
+    cache_dir: Path = None,
+) -> osim.Model:
+    """ Get the processed muscle-driven model
+
+    Args:
+        subject_name (str): subject name, "simple" selects the reduced model
+        model_path (Path): path to scaled model
+        ground_forces (bool): add the ground reaction forces as external loads
+        minimal_actuators (bool): skip the reserve actuators on every coordinate
+        config (dict, optional): problem configuration with the actuator magnitude. Defaults to None.
+        cache_dir (Path, optional): reuse processed models stored here (see get_cached_processed_model).
+            Defaults to None (always process).
+
+    Returns:
+        osim.Model: processed model
+    """
+    if cache_dir is not None:
+        model = get_cached_processed_model(
+            subject_name=subject_name,
+            model_path=model_path,
+            minimal_actuators=minimal_actuators,
+            config=config,
+            cache_dir=cache_dir,
+        )
+    else:
+        model = process_muscle_driven_model(
+            subject_name=subject_name,
+            model_path=model_path,
+            minimal_actuators=minimal_actuators,
+            config=config,
+        )
+
+    if ground_forces:
+        modelProcessor = osim.ModelProcessor(model)
+        modelProcessor.append(
+            osim.ModOpAddExternalLoads("./moco/forces/grf_sit_stand.xml")
+        )
+        model = modelProcessor.process()
+
+    return model
+
+
+def process_muscle_driven_model(
+    subject_name: str,
+    model_path: Path,
+    minimal_actuators: bool,
+    config: dict = None,
 ) -> osim.Model:
+    """ Simplify the model, convert its muscles to DeGroote-Fregly and add reserves
+
+    Args:
+        subject_name (str): subject name, "simple" selects the reduced model
+        model_path (Path): path to scaled model
+        minimal_actuators (bool): skip the reserve actuators on every coordinate
+        config (dict, optional): problem configuration with the actuator magnitude. Defaults to None.
+
+    Returns:
+        osim.Model: processed model
+    """
     # Load the base model.
     model = osim.Model(str(model_path))
 
@@ -140,16 +206,88 @@ def getMuscleDrivenModel(
     if not minimal_actuators:
         modelProcessor.append(osim.ModOpAddReserves(config["actuator_magnitude"]))
 
-    if ground_forces:
-        modelProcessor.append(
-            osim.ModOpAddExternalLoads("./moco/forces/grf_sit_stand.xml")
-        )
-
     model = modelProcessor.process()
 
     return model
 
 
+def get_processed_model_key(
+    subject_name: str,
+    model_path: Path,
+    minimal_actuators: bool,
+    config: dict = None,
+) -> str:
+    """ Hash identifying a processed model: source model contents plus processing options
+
+    Args:
+        subject_name (str): subject name, only whether it is a "simple" model matters
+        model_path (Path): path to scaled model
+        minimal_actuators (bool): skip the reserve actuators on every coordinate
+        config (dict, optional): problem configuration with the actuator magnitude. Defaults to None.
+
+    Returns:
+        str: cache key
+    """
+    options = {
+        "version": MODEL_CACHE_VERSION,
+        "simple": "simple" in subject_name,
+        "minimal_actuators": bool(minimal_actuators),
+        "actuator_magnitude": None if minimal_actuators else config["actuator_magnitude"],
+    }
+
+    digest = hashlib.sha256(Path(model_path).read_bytes())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+
+    return digest.hexdigest()[:16]
+
+
+def get_cached_processed_model(
+    subject_name: str,
+    model_path: Path,
+    minimal_actuators: bool,
+    config: dict = None,
+    cache_dir: Path = Path("./moco/models/cache"),
+) -> osim.Model:
+    """ Load the processed model from the cache, processing and storing it on a miss
+
+    Args:
+        subject_name (str): subject name, "simple" selects the reduced model
+        model_path (Path): path to scaled model
+        minimal_actuators (bool): skip the reserve actuators on every coordinate
+        config (dict, optional): problem configuration with the actuator magnitude. Defaults to None.
+        cache_dir (Path, optional): cache directory. Defaults to ./moco/models/cache.
+
+    Returns:
+        osim.Model: processed model
+    """
+    key = get_processed_model_key(
+        subject_name=subject_name,
+        model_path=model_path,
+        minimal_actuators=minimal_actuators,
+        config=config,
+    )
+    cached_path = Path(cache_dir) / f"{Path(model_path).stem}_{key}.osim"
+
+    if cached_path.exists():
+        print(f"Loading processed model from {cached_path}")
+        return osim.Model(str(cached_path))
+
+    model = process_muscle_driven_model(
+        subject_name=subject_name,
+        model_path=model_path,
+        minimal_actuators=minimal_actuators,
+        config=config,
+    )
+
+    # Write to a temporary file first, parallel jobs may be building the same model
+    cached_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cached_path.with_suffix(f".{os.getpid()}.tmp")
+    model.printToXML(str(tmp_path))
+    os.replace(tmp_path, cached_path)
+
+    return model
+
+
 def get_model(
     subject_name: str,
     model_path: Path,
@@ -158,6 +296,8 @@ def get_model(
     ground_forces: bool = False,
     minimal_actuators: bool = False,
     config: dict = None,
+    model_dir: Path = Path("./moco/models"),
+    cache_dir: Path = Path("./moco/models/cache"),
 ) -> osim.Model:
     """Get a model with assistive forces.
 
@@ -165,6 +305,8 @@ def get_model(
         scaled_model_path (Path): path to scaled model
         enable_assist (bool): enable assistive forces
         output_model (bool, optional): whether to output the model. Defaults to True.
+        model_dir (Path, optional): where the processed model is written. Defaults to ./moco/models.
+        cache_dir (Path, optional): processed model cache, None to always process. Defaults to ./moco/models/cache.
     Returns:
         osim.Model: model with assistive forces
     """
@@ -183,6 +325,7 @@ def get_model(
         ground_forces=ground_forces,
         minimal_actuators=minimal_actuators,
         config=config,
+        cache_dir=cache_dir,
     )
     model_name = f"{subject_name}_{model_path.stem}"
     model.setName(model_name)
@@ -219,10 +362,12 @@ def get_model(
 
     model.finalizeConnections()
 
-    model.printToXML(f"./moco/models/{model_name}.osim")
-    model.printToXML(str(target_path / f"{model_name}.osim"))
+    xml_path = Path(model_dir) / f"{model_name}.osim"
+    model.printToXML(str(xml_path))
+    if Path(target_path).resolve() != Path(model_dir).resolve():
+        shutil.copyfile(xml_path, Path(target_path) / f"{model_name}.osim")
 
-    config["xml_path"] = f"./moco/models/{model_name}.osim"
+    config["xml_path"] = str(xml_path)
 
     return model
 
@@ -291,6 +436,99 @@ def set_moco_problem_weights(
         effort_goal.setWeightForControl("/forceset/assistive_force_x", 0)
 
 
+def get_warm_start_guess(solver: osim.MocoCasADiSolver, previous: osim.MocoTrajectory) -> osim.MocoTrajectory:
+    """ Build an initial guess for a problem from a previous solution.
+
+    The guess starts from the solver's default guess, so it matches the current
+    mesh and variables, and the states and controls of the previous solution are
+    interpolated onto it. Variables the previous problem didn't have (e.g. the
+    assistive force controls) keep their default guess.
+
+    Args:
+        solver (osim.MocoCasADiSolver): solver of the problem to warm start
+        previous (osim.MocoTrajectory): earlier solution of a related problem
+
+    Returns:
+        osim.MocoTrajectory: initial guess
+    """
+    guess = solver.createGuess()
+
+    guess_states = set(guess.getStateNames())
+    guess_controls = set(guess.getControlNames())
+
+    states = previous.exportToStatesTable()
+    for label in list(states.getColumnLabels()):
+        if label not in guess_states:
+            states.removeColumn(label)
+
+    controls = previous.exportToControlsTable()
+    for label in list(controls.getColumnLabels()):
+        if label not in guess_controls:
+            controls.removeColumn(label)
+
+    guess.insertStatesTrajectory(states, True)
+    guess.insertControlsTrajectory(controls, True)
+
+    return guess
+
+
+def solve_with_mesh_refinement(
+    model: osim.Model,
+    markers_path: str,
+    t_0: float,
+    t_f: float,
+    config: dict,
+    mesh_intervals: list = (0.1, 0.08, 0.05),
+    initial_guess: osim.MocoTrajectory = None,
+    parallel: int = None,
+) -> osim.MocoSolution:
+    """ Solve the tracking problem on progressively finer meshes, using every
+    solution as the initial guess of the next solve.
+
+    Args:
+        model (osim.Model): model to track the markers with
+        markers_path (str): path to the marker .trc file
+        t_0 (float): initial time
+        t_f (float): final time
+        config (dict): problem configuration (see set_moco_problem_weights)
+        mesh_intervals (list, optional): mesh intervals from coarse to fine. Defaults to (0.1, 0.08, 0.05).
+        initial_guess (osim.MocoTrajectory, optional): guess for the coarsest solve, e.g. an earlier
+            solution of the same subject and trial. Defaults to None (cold start).
+        parallel (int, optional): threads used by CasADi. Defaults to None (solver default).
+
+    Returns:
+        osim.MocoSolution: solution on the finest mesh
+    """
+    guess = initial_guess
+    solution = None
+
+    for mesh_interval in mesh_intervals:
+        tracking_problem = get_tracking_problem(
+            model=model,
+            markers_path=markers_path,
+            t_0=t_0,
+            t_f=t_f,
+            mesh_interval=mesh_interval,
+        )
+        study = tracking_problem.initialize()
+        set_moco_problem_weights(model=model, moco_study=study, config=config)
+
+        solver = osim.MocoCasADiSolver.safeDownCast(study.updSolver())
+        if parallel is not None:
+            solver.set_parallel(parallel)
+        if guess is not None:
+            solver.setGuess(get_warm_start_guess(solver=solver, previous=guess))
+
+        print(f"Solving with mesh interval {mesh_interval}s ({'warm' if guess is not None else 'cold'} start)...")
+        solution = study.solve()
+
+        # Keep going from unconverged solutions, they are still a better guess than the default
+        solution.unseal()
+        guess = solution
+
+    return solution
+
+
 def add_assistive_force(
     coordName: str,
     model: osim.Model,
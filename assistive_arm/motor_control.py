@@ -12,6 +12,8 @@ from typing import Literal
 from pathlib import Path
 from functools import wraps
 
+from assistive_arm.state_prediction import StatePredictor
+
 
 with open("./motor_config.yaml", "r") as f:
     MOTOR_PARAMS = yaml.load(f, Loader=yaml.FullLoader)
@@ -47,6 +49,7 @@ class CubemarsMotor:
         self.position = 0
         self.prev_velocity = 0
         self.velocity = 0
+        self.torque = 0
         self.csv_file_name = None
 
         self.buffer_index = 0
@@ -55,6 +58,16 @@ class CubemarsMotor:
         self.position_buffer = [0] * self.buffer_size
         self.velocity_buffer = [0] * self.buffer_size
 
+        # Position of the calibrated zero in the motor's own frame, see assistive_arm.calibration
+        self.position_offset = 0
+
+        # Latest sample, before the moving average
+        self.raw_position = 0
+        self.raw_velocity = 0
+
+        # Predict half a period ahead: the middle of the interval a command is applied for
+        self.predictor = StatePredictor(hold=0.5 / self.frequency)
+
         self._emergency_stop = False
         self._first_run = True
 
@@ -133,6 +146,21 @@ class CubemarsMotor:
             traceback.print_exc()
             print(f"Failed to shutdown motor {self.type} or {can_name}")
 
+    @property
+    def bus_latency(self) -> float:
+        """ Estimated one-way CAN latency (s) """
+        return self.predictor.bus_latency
+
+    @property
+    def predicted_position(self) -> float:
+        """ Position predicted for when a command sent now takes effect (rad) """
+        return self.predictor.predict()[0]
+
+    @property
+    def predicted_velocity(self) -> float:
+        """ Velocity estimated by the tracker, without the moving average lag (rad/s) """
+        return self.predictor.velocity
+
     def check_safety_speed_limit(self):
         if abs(self.velocity) > self.params["Vel_limit"]:
             self._emergency_stop = True
@@ -151,6 +179,12 @@ class CubemarsMotor:
         print("Zeroing position...")
         print("Pos, Vel, Torque: ", self._read_motor_msg(response.data))
 
+        # The motor's frame now starts here, a software offset would no longer match it
+        self.position_offset = 0
+        # Nor would the averages and the prediction of the previous frame
+        self._first_run = True
+        self.predictor.reset()
+
         zero_cmd = [0, 0, 0, 0, 0]
 
         self._update_motor(cmd=zero_cmd, wait_time=0.001)
@@ -163,7 +197,7 @@ class CubemarsMotor:
         Returns:
             None
         """
-        cmd = [np.deg2rad(angle), 0, 5, 0.2, 0]
+        cmd = [np.deg2rad(angle) + self.position_offset, 0, 5, 0.2, 0]
 
         self._update_motor(cmd=cmd)
 
@@ -200,6 +234,45 @@ class CubemarsMotor:
 
         self._update_motor(cmd=cmd)
 
+    def send_impedance(
+        self,
+        position: float,
+        velocity: float = 0,
+        kp: float = 0,
+        kd: float = 0,
+        torque_ff: float = 0,
+        safety: bool = True,
+    ) -> None:
+        """ Send a setpoint for the motor's internal impedance loop, which applies
+        torque = kp * (position - p) + kd * (velocity - v) + torque_ff at its own rate until the next command
+
+        Args:
+            position (float): position setpoint (rad)
+            velocity (float, optional): velocity setpoint (rad/s). Defaults to 0.
+            kp (float, optional): stiffness (Nm/rad). Defaults to 0.
+            kd (float, optional): damping (Nm s/rad). Defaults to 0.
+            torque_ff (float, optional): feedforward torque (Nm). Defaults to 0.
+            safety (bool, optional): Limit the feedforward and spring torque to 3Nm. Defaults to True.
+        """
+        kp = np.clip(kp, self.params["Kp_min"], self.params["Kp_max"])
+        kd = np.clip(kd, self.params["Kd_min"], self.params["Kd_max"])
+        velocity = np.clip(velocity, self.params["V_min"], self.params["V_max"])
+        torque_ff = np.clip(torque_ff, self.params["T_min"], self.params["T_max"])
+
+        # Hard code safety
+        if safety:
+            torque_ff = np.clip(torque_ff, -3, 3)
+            if kp > 0:
+                # Keep the spring torque within what is left of the limit
+                max_offset = (3 - abs(torque_ff)) / kp
+                position = np.clip(position, self.position - max_offset, self.position + max_offset)
+
+        position = np.clip(position + self.position_offset, self.params["P_min"], self.params["P_max"])
+
+        cmd = [position, velocity, kp, kd, torque_ff]
+
+        self._update_motor(cmd=cmd)
+
     def _update_motor(self, cmd: list[hex], wait_time: float = 0.001) -> bool:
         if len(cmd) != 5:
             print("Too many or too few arguments")
@@ -213,8 +286,10 @@ class CubemarsMotor:
 
         packed_cmd = self._pack_cmd(*cmd)
 
+        send_time = time.monotonic()
         self.can_bus.send(self._send_message(packed_cmd))
         new_msg = self.can_bus.recv(wait_time)
+        receive_time = time.monotonic()
 
         # Must be after sending message to ensure motor stops
         if self._emergency_stop:
@@ -229,6 +304,12 @@ class CubemarsMotor:
             v *= -1 if self.type == "AK60-6" else 1
             t *= -1 if self.type == "AK60-6" else 1
 
+            p -= self.position_offset
+
+            self.raw_position = p
+            self.raw_velocity = v
+            self.predictor.update(p, timestamp=receive_time, round_trip=receive_time - send_time)
+
             # Update the circular buffers
             self.position_buffer[self.buffer_index] = p
             self.velocity_buffer[self.buffer_index] = v
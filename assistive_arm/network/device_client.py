@@ -0,0 +1,81 @@
+import json
+import zmq
+
+
+DEVICE_SERVICE_ADDRESS = "ipc:///tmp/assistive_arm_device.sock"
+
+
+def encode_request(command: str, **params) -> str:
+    """ Encode a device service request
+
+    Args:
+        command (str): command name
+        **params: command parameters
+
+    Returns:
+        str: JSON request
+    """
+    return json.dumps({"command": command, "params": params})
+
+
+def decode_reply(message: str) -> dict:
+    """ Decode a device service reply
+
+    Args:
+        message (str): JSON reply
+
+    Returns:
+        dict: {"ok": bool, "result": ...} or {"ok": False, "error": str}
+    """
+    return json.loads(message)
+
+
+class DeviceClient:
+    """ Client of the device service (scripts/device_service.py) """
+
+    def __init__(self, address: str = DEVICE_SERVICE_ADDRESS, timeout: float = None) -> None:
+        """
+        Args:
+            address (str, optional): service address. Defaults to DEVICE_SERVICE_ADDRESS.
+            timeout (float, optional): reply timeout (s), trials block until they finish. Defaults to None (wait).
+        """
+        self.address = address
+        self.timeout = timeout
+        self._context = zmq.Context.instance()
+        self._connect()
+
+    def _connect(self) -> None:
+        self.socket = self._context.socket(zmq.REQ)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        if self.timeout is not None:
+            self.socket.setsockopt(zmq.RCVTIMEO, int(self.timeout * 1000))
+        self.socket.connect(self.address)
+
+    def send(self, command: str, **params) -> dict:
+        """ Send a command and wait for its reply
+
+        Args:
+            command (str): command name (status, calibrate, assist, unpowered, shutdown)
+            **params: command parameters
+
+        Returns:
+            dict: reply
+        """
+        self.socket.send_string(encode_request(command, **params))
+
+        try:
+            return decode_reply(self.socket.recv_string())
+        except zmq.Again:
+            # A REQ socket can't send again before receiving, start over
+            self.socket.close()
+            self._connect()
+            raise TimeoutError(f"No reply from {self.address} within {self.timeout}s")
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,114 @@
+import time
+import numpy as np
+import pandas as pd
+
+
+class PhaseTracker:
+    """ Tracks the position along an assistance profile from theta_2, searching only around the current row.
+
+    Each update compares theta_2 with the profile rows within `window` of the current one
+    (a full search is only done on the first update or after reset), so it costs the same
+    whatever the profile length. To stop noise from making the phase jitter:
+        - the phase only moves against its last direction once theta_2 is `hysteresis` away from the current row
+        - the phase can't move faster than `max_rate` (% of the profile per second)
+    """
+
+    def __init__(
+        self,
+        profile: pd.DataFrame,
+        window: int = 5,
+        hysteresis: float = float(np.deg2rad(0.5)),
+        max_rate: float = 200.0,
+        velocity_smoothing: float = 0.2,
+    ) -> None:
+        """
+        Args:
+            profile (pd.DataFrame): assistance profile with theta_2, indexed by percentage
+            window (int, optional): rows searched on each side of the current row. Defaults to 5.
+            hysteresis (float, optional): deviation needed to reverse direction (rad). Defaults to 0.5 deg.
+            max_rate (float, optional): maximum phase velocity (%/s). Defaults to 200.
+            velocity_smoothing (float, optional): weight of a new sample in the phase velocity average. Defaults to 0.2.
+        """
+        self.theta_2 = profile.theta_2.to_numpy(dtype=float).tolist()
+        self.percentage = profile.index.to_numpy(dtype=float).tolist()
+        self.window = window
+        self.hysteresis = hysteresis
+        self.velocity_smoothing = velocity_smoothing
+
+        n_rows = len(self.theta_2)
+        self._percent_per_row = (self.percentage[-1] - self.percentage[0]) / max(n_rows - 1, 1)
+        self.max_row_rate = max_rate / self._percent_per_row if self._percent_per_row else float("inf")
+
+        self.reset()
+
+    def reset(self) -> None:
+        """ Forget the current phase, the next update searches the whole profile """
+        self.row = None
+        self.position = 0.0
+        self.direction = 0
+        self.velocity = 0.0
+        self._last_time = None
+
+    def _distance(self, row: int, theta_2: float) -> float:
+        return abs(self.theta_2[row] - theta_2)
+
+    def update(self, theta_2: float, dt: float = None) -> int:
+        """ Move the phase towards the profile row closest to theta_2
+
+        Args:
+            theta_2 (float): motor_2 angle
+            dt (float, optional): time since the previous update (s). Defaults to None (measured).
+
+        Returns:
+            int: current profile row
+        """
+        now = time.monotonic()
+        if dt is None:
+            dt = now - self._last_time if self._last_time is not None else 0.0
+        self._last_time = now
+
+        if self.row is None:
+            self.row = min(range(len(self.theta_2)), key=lambda row: self._distance(row, theta_2))
+            self.position = float(self.row)
+            return self.row
+
+        row = self.row
+        last = len(self.theta_2) - 1
+        start, stop = max(row - self.window, 0), min(row + self.window, last)
+
+        best = row
+        best_distance = self._distance(row, theta_2)
+        for candidate in range(start, stop + 1):
+            distance = self._distance(candidate, theta_2)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+
+        direction = (best > row) - (best < row)
+        if direction and direction == -self.direction and self._distance(row, theta_2) < self.hysteresis:
+            best, direction = row, 0
+
+        # Rate limit on a continuous position so slow limits still make progress over several ticks
+        previous_position = self.position
+        max_step = self.max_row_rate * dt
+        self.position = min(max(float(best), self.position - max_step), self.position + max_step)
+        self.row = min(max(int(round(self.position)), 0), last)
+
+        if direction:
+            self.direction = direction
+
+        if dt > 0:
+            phase_velocity = (self.position - previous_position) / dt * self._percent_per_row
+            self.velocity += self.velocity_smoothing * (phase_velocity - self.velocity)
+
+        return self.row
+
+    @property
+    def progress(self) -> float:
+        """ Phase as a percentage of the profile (0-100), interpolated between rows """
+        if self.row is None:
+            return 0.0
+
+        row = min(int(self.position), len(self.percentage) - 2)
+        fraction = self.position - row
+
+        return self.percentage[row] + fraction * (self.percentage[row + 1] - self.percentage[row])
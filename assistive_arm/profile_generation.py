@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+import yaml
+
+from functools import lru_cache
+from pathlib import Path
+
+from assistive_arm.robotic_arm import get_jacobian
+
+
+# Fraction of the motion after which the assistive force is zero
+ZERO_AT = 0.95
+
+PROFILE_COLUMNS = ["theta_1", "theta_2", "EE_X", "EE_Y", "tau_1", "tau_2", "force_X", "force_Y"]
+
+
+@lru_cache(maxsize=None)
+def load_reference_profile(profile_path: str = "./torque_profiles/simulation_profile.csv") -> pd.DataFrame:
+    """ Load the reference sit-to-stand profile whose kinematics all generated profiles share
+
+    Args:
+        profile_path (str, optional): reference profile. Defaults to ./torque_profiles/simulation_profile.csv.
+
+    Returns:
+        pd.DataFrame: reference profile indexed by percentage, shared between calls and not to be modified
+    """
+    return pd.read_csv(profile_path, index_col="Percentage")
+
+
+def load_calibrated_range(yaml_path: Path) -> tuple:
+    """ Read the theta_2 range stored by the height calibration
+
+    Args:
+        yaml_path (Path): device_height_calibration.yaml of the session
+
+    Returns:
+        tuple: (theta_2_min, theta_2_max)
+    """
+    with open(yaml_path, "r") as f:
+        calibration_data = yaml.load(f, Loader=yaml.FullLoader)
+
+    return calibration_data["new_range"]["min"], calibration_data["new_range"]["max"]
+
+
+def scale_theta_2(theta_2: np.ndarray, theta_2_range: tuple = None) -> np.ndarray:
+    """ Linearly map theta_2 onto the calibrated range of the subject
+
+    Args:
+        theta_2 (np.ndarray): reference theta_2
+        theta_2_range (tuple, optional): (min, max) after calibration. Defaults to None (unchanged).
+
+    Returns:
+        np.ndarray: scaled theta_2
+    """
+    if theta_2_range is None:
+        return theta_2
+
+    new_min, new_max = theta_2_range
+    original_min, original_max = theta_2.min(), theta_2.max()
+    scale = (new_max - new_min) / (original_max - original_min)
+
+    return new_min + (theta_2 - original_min) * scale
+
+
+def spline_force(n: int, peak_index: float, peak_force: float, zero_at: float = ZERO_AT) -> np.ndarray:
+    """ Assistive force shape: cubic Hermite spline through (-1, 0), (peak_index, peak_force) and
+    (zero_at * n, 0), with zero slope at every knot, and zero afterwards
+
+    Args:
+        n (int): number of samples
+        peak_index (float): sample of the peak (see get_peak_index)
+        peak_force (float): peak force (N)
+        zero_at (float, optional): fraction of the motion where the force reaches zero. Defaults to ZERO_AT.
+
+    Returns:
+        np.ndarray: force (n,)
+    """
+    x = np.arange(n, dtype=float)
+    end_index = zero_at * n
+
+    # A cubic Hermite segment with zero end slopes is a smoothstep between its knots
+    rising = np.clip((x + 1) / (peak_index + 1), 0, 1)
+    falling = np.clip((x - peak_index) / (end_index - peak_index), 0, 1)
+
+    def smoothstep(s):
+        return s * s * (3 - 2 * s)
+
+    return np.where(x <= peak_index, smoothstep(rising), 1 - smoothstep(falling)) * peak_force
+
+
+def get_peak_index(peak_time: float, n: int) -> int:
+    """ Sample of the force peak, placed like in the stored spline_profiles
+
+    Args:
+        peak_time (float): time of the peak force (% of the motion)
+        n (int): number of samples
+
+    Returns:
+        int: peak sample
+    """
+    return int(peak_time / 100 * n) - 1
+
+
+def compute_assistance_torques(theta_1: np.ndarray, theta_2: np.ndarray, force: np.ndarray) -> np.ndarray:
+    """ Joint torques producing the end-effector force along the trajectory, as applied by get_target_torques
+
+    Args:
+        theta_1 (np.ndarray): motor_1 angle (n,)
+        theta_2 (np.ndarray): motor_2 angle (n,)
+        force (np.ndarray): end-effector force [force_X, force_Y] (n, 2)
+
+    Returns:
+        np.ndarray: torques [tau_1, tau_2] (n, 2)
+    """
+    jacobians = get_jacobian(theta_1, theta_2)  # (2, 2, n)
+
+    return -np.einsum("jin,nj->ni", jacobians, force)
+
+
+@lru_cache(maxsize=256)
+def _generate_profile(
+    peak_time: float,
+    peak_force: float,
+    theta_2_range: tuple,
+    zero_at: float,
+    reference_path: str,
+) -> pd.DataFrame:
+    reference = load_reference_profile(reference_path)
+    n = len(reference)
+
+    theta_1 = reference.theta_1.to_numpy()
+    theta_2 = scale_theta_2(reference.theta_2.to_numpy(), theta_2_range)
+
+    force = np.zeros((n, 2))
+    force[:, 1] = spline_force(n, peak_index=get_peak_index(peak_time, n), peak_force=peak_force, zero_at=zero_at)
+
+    torques = compute_assistance_torques(theta_1, theta_2, force)
+
+    data = np.column_stack([theta_1, theta_2, reference.EE_X, reference.EE_Y, torques, force])
+
+    return pd.DataFrame(data, index=reference.index, columns=PROFILE_COLUMNS)
+
+
+def generate_profile(
+    peak_time: float,
+    peak_force: float,
+    theta_2_range: tuple = None,
+    zero_at: float = ZERO_AT,
+    reference_path: str = "./torque_profiles/simulation_profile.csv",
+) -> pd.DataFrame:
+    """ Compute an assistance profile on demand, for peaks outside the precomputed spline_profiles grid.
+
+    The kinematics (theta_1, EE) come from the reference profile and theta_2 is mapped onto
+    the calibrated range, as calibrate_height does for the stored profiles. force_Y matches
+    the stored profiles when given their actual peak force (the file names round it, e.g.
+    peak_force_37 peaks at 37.16N). tau_1 and tau_2 follow get_target_torques; the stored
+    torque columns were computed with another arm model and are not used by the controller.
+    Results are memoised, so repeating a (peak_time, peak_force, range) combination costs a copy.
+
+    Args:
+        peak_time (float): time of the peak force (% of the motion)
+        peak_force (float): peak force (N)
+        theta_2_range (tuple, optional): calibrated (theta_2_min, theta_2_max). Defaults to None (reference range).
+        zero_at (float, optional): fraction of the motion where the force reaches zero. Defaults to ZERO_AT.
+        reference_path (str, optional): reference profile. Defaults to ./torque_profiles/simulation_profile.csv.
+
+    Returns:
+        pd.DataFrame: profile with the columns of the spline profiles, indexed by percentage
+    """
+    if theta_2_range is not None:
+        theta_2_range = (float(theta_2_range[0]), float(theta_2_range[1]))
+
+    profile = _generate_profile(float(peak_time), float(peak_force), theta_2_range, float(zero_at), str(reference_path))
+
+    return profile.copy()
+
+
+def generate_profile_grid(
+    peak_times: list,
+    peak_forces: list,
+    theta_2_range: tuple = None,
+    reference_path: str = "./torque_profiles/simulation_profile.csv",
+) -> dict:
+    """ Profiles for every peak time and peak force combination
+
+    Args:
+        peak_times (list): peak times (%)
+        peak_forces (list): peak forces (N)
+        theta_2_range (tuple, optional): calibrated (theta_2_min, theta_2_max). Defaults to None.
+        reference_path (str, optional): reference profile. Defaults to ./torque_profiles/simulation_profile.csv.
+
+    Returns:
+        dict: {peak_time: {peak_force: profile}}, the layout used by sit_to_stand
+    """
+    return {
+        peak_time: {
+            peak_force: generate_profile(peak_time, peak_force, theta_2_range=theta_2_range, reference_path=reference_path)
+            for peak_force in peak_forces
+        }
+        for peak_time in peak_times
+    }
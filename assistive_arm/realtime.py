@@ -0,0 +1,209 @@
+import ctypes
+import ctypes.util
+import gc
+import mmap
+import os
+import threading
+import numpy as np
+
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import List
+
+
+RealtimeReport = namedtuple(
+    "RealtimeReport", ["cpu_affinity", "sched_fifo", "memory_locked", "gc_disabled", "prefaulted_bytes", "errors"]
+)
+
+# From <sys/mman.h>
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+_libc = None
+
+# CPUs of the process before realtime_mode pinned it, for threads that shouldn't stay on the pinned CPU
+_unpinned_affinity = None
+
+
+def _get_libc() -> ctypes.CDLL:
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    return _libc
+
+
+def lock_memory() -> None:
+    """ Lock current and future pages of the process in RAM (mlockall) """
+    if _get_libc().mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"mlockall failed: {os.strerror(errno)}")
+
+
+def unlock_memory() -> None:
+    _get_libc().munlockall()
+
+
+def prefault(buffers: List[np.ndarray] = None, stack_bytes: int = 256 * 1024) -> int:
+    """ Touch every page of the given buffers and of a scratch stack area so that the first
+    accesses during the trial don't page fault
+
+    Args:
+        buffers (List[np.ndarray], optional): arrays written during the trial. Defaults to None.
+        stack_bytes (int, optional): size of the scratch area touched. Defaults to 256 kB.
+
+    Returns:
+        int: bytes touched
+    """
+    touched = 0
+
+    for buffer in buffers or []:
+        flat = np.asarray(buffer).reshape(-1)
+        step = max(1, mmap.PAGESIZE // max(flat.itemsize, 1))
+        # Writing the values back makes each page resident without changing the data
+        flat[::step] = flat[::step]
+        touched += flat.nbytes
+
+    scratch = bytearray(stack_bytes)
+    scratch[::mmap.PAGESIZE] = b"\x01" * len(range(0, stack_bytes, mmap.PAGESIZE))
+    touched += stack_bytes
+
+    return touched
+
+
+@contextmanager
+def realtime_mode(
+    cpu: int = None,
+    priority: int = None,
+    lock: bool = True,
+    disable_gc: bool = True,
+    buffers: List[np.ndarray] = None,
+    verbose: bool = True,
+):
+    """ Run a block (e.g. a trial's control loop) with real-time settings, restoring them afterwards.
+
+    Every setting is best effort: what could not be granted (missing privileges, unsupported
+    platform) is recorded in the report instead of raising.
+
+    Args:
+        cpu (int, optional): CPU to pin the process to, ideally isolated (isolcpus). Defaults to None.
+        priority (int, optional): SCHED_FIFO priority (1-99). Defaults to None (scheduler unchanged).
+        lock (bool, optional): lock memory with mlockall. Defaults to True.
+        disable_gc (bool, optional): freeze existing objects and disable the cyclic GC. Defaults to True.
+        buffers (List[np.ndarray], optional): buffers to pre-fault. Defaults to None.
+        verbose (bool, optional): print the report. Defaults to True.
+
+    Yields:
+        RealtimeReport: settings granted
+    """
+    errors = []
+    cpu_affinity = sched_fifo = memory_locked = gc_disabled = False
+
+    previous_affinity = previous_policy = previous_param = None
+    gc_was_enabled = gc.isenabled()
+
+    global _unpinned_affinity
+
+    if cpu is not None:
+        try:
+            previous_affinity = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, {cpu})
+            _unpinned_affinity = previous_affinity
+            cpu_affinity = True
+        except (AttributeError, OSError, ValueError) as e:
+            errors.append(f"affinity: {e}")
+
+    if priority is not None:
+        try:
+            previous_policy = os.sched_getscheduler(0)
+            previous_param = os.sched_getparam(0)
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            sched_fifo = True
+        except (AttributeError, OSError) as e:
+            errors.append(f"SCHED_FIFO: {e}")
+
+    if lock:
+        try:
+            lock_memory()
+            memory_locked = True
+        except (AttributeError, OSError) as e:
+            errors.append(f"mlockall: {e}")
+
+    prefaulted_bytes = prefault(buffers)
+
+    if disable_gc:
+        # Collect now so the frozen generation doesn't keep garbage alive for the whole trial
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        gc_disabled = True
+
+    report = RealtimeReport(
+        cpu_affinity=cpu_affinity,
+        sched_fifo=sched_fifo,
+        memory_locked=memory_locked,
+        gc_disabled=gc_disabled,
+        prefaulted_bytes=prefaulted_bytes,
+        errors=errors,
+    )
+
+    if verbose:
+        print_report(report)
+
+    try:
+        yield report
+    finally:
+        if gc_disabled:
+            gc.unfreeze()
+            if gc_was_enabled:
+                gc.enable()
+        if memory_locked:
+            unlock_memory()
+        if sched_fifo:
+            os.sched_setscheduler(0, previous_policy, previous_param)
+        if cpu_affinity:
+            os.sched_setaffinity(0, previous_affinity)
+            _unpinned_affinity = None
+
+
+def release_thread(nice: int = 0) -> None:
+    """ Drop the real-time settings the calling thread inherited from realtime_mode: back to
+    SCHED_OTHER, on the CPUs the process had before pinning, with the given nice value.
+
+    Best effort like realtime_mode, a setting that can't be changed is kept.
+
+    Args:
+        nice (int, optional): nice value of the thread (0-19). Defaults to 0.
+    """
+    try:
+        os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+    except (AttributeError, OSError):
+        pass
+
+    if _unpinned_affinity is not None:
+        try:
+            os.sched_setaffinity(0, _unpinned_affinity)
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError):
+        pass
+
+
+def print_report(report: RealtimeReport) -> None:
+    """ Print which real-time settings were granted
+
+    Args:
+        report (RealtimeReport): report
+    """
+    def granted(value: bool) -> str:
+        return "yes" if value else "no"
+
+    print(
+        f"Real-time mode: CPU pinned: {granted(report.cpu_affinity)}, SCHED_FIFO: {granted(report.sched_fifo)}, "
+        f"memory locked: {granted(report.memory_locked)}, GC disabled: {granted(report.gc_disabled)}, "
+        f"pre-faulted: {report.prefaulted_bytes / 1024:.0f} kB"
+    )
+    for error in report.errors:
+        print(f"  {error}")
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 
 from assistive_arm.motor_control import CubemarsMotor
+from assistive_arm.phase_tracking import PhaseTracker
 
 
 def calculate_ee_pos(theta_1: CubemarsMotor, theta_2: CubemarsMotor):
@@ -35,13 +36,15 @@ def get_jacobian(theta_1: float, theta_2: float) -> np.array:
     return jacobian
 
 
-def get_target_torques(theta_1: float, theta_2: float, profiles: pd.DataFrame) -> tuple:
+def get_target_torques(theta_1: float, theta_2: float, profiles: pd.DataFrame, phase_tracker: PhaseTracker = None) -> tuple:
     """ Get target torques for a given configuration, based on optimal profile
 
     Args:
         theta_1 (float): motor_1 angle
         theta_2 (float): motor_2 angle
         profiles (pd.DataFrame): optimal profile dataframe
+        phase_tracker (PhaseTracker, optional): tracker of the profile row, built on the same profile.
+            Defaults to None (closest theta_2 over the whole profile).
 
     Returns:
         tuple: torques (tau_1, tau_2), index (percentage of profile)
@@ -50,7 +53,10 @@ def get_target_torques(theta_1: float, theta_2: float, profiles: pd.DataFrame) -
     P_EE = calculate_ee_pos(theta_1=theta_1, theta_2=theta_2)
     jacobian = get_jacobian(theta_1, theta_2)
 
-    closest_point = abs(profiles.theta_2 - theta_2).argmin()
+    if phase_tracker is not None:
+        closest_point = phase_tracker.update(theta_2)
+    else:
+        closest_point = abs(profiles.theta_2 - theta_2).argmin()
     force_vector = profiles.iloc[closest_point][["force_X", "force_Y"]]
 
     tau_1, tau_2 = -jacobian.T @ force_vector
@@ -0,0 +1,201 @@
+import math
+import signal
+import threading
+import time
+
+from typing import Literal
+
+
+OVERRUN_POLICIES = ("catch_up", "skip", "degrade")
+
+
+class FixedRateLoop:
+    """ Fixed rate loop with absolute deadlines on the monotonic clock.
+
+    Iterating yields the nominal time t = dt, 2 dt, 3 dt, ... like SoftRealtimeLoop, and the
+    k-th iteration starts at t0 + k * dt, so late iterations never shift the following ones.
+    Each wait sleeps until `spin` seconds before the deadline and busy-waits the rest.
+
+    When an iteration starts a full period or more after its deadline, the overrun policy decides:
+        catch_up: run the missed iterations back to back (same t sequence as SoftRealtimeLoop)
+        skip: drop the missed iterations, t jumps to the current period
+        degrade: after `degrade_after` consecutive overruns, double dt (up to max_dt) and restart
+            the schedule from now
+
+    Ctrl + C (SIGINT) or SIGTERM stops the loop after the current iteration instead of raising.
+    """
+
+    def __init__(
+        self,
+        dt: float,
+        overrun: Literal["catch_up", "skip", "degrade"] = "catch_up",
+        spin: float = 300e-6,
+        report: bool = False,
+        degrade_after: int = 3,
+        max_dt: float = None,
+        handle_signals: bool = True,
+    ) -> None:
+        """
+        Args:
+            dt (float): loop period (s)
+            overrun (Literal["catch_up", "skip", "degrade"], optional): overrun policy. Defaults to "catch_up".
+            spin (float, optional): time busy-waited before each deadline (s). Defaults to 300e-6.
+            report (bool, optional): print timing statistics when the loop stops. Defaults to False.
+            degrade_after (int, optional): consecutive overruns before degrading the rate. Defaults to 3.
+            max_dt (float, optional): largest period reached by degrading. Defaults to 4 * dt.
+            handle_signals (bool, optional): stop on SIGINT/SIGTERM. Defaults to True.
+        """
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun must be one of {OVERRUN_POLICIES}, got {overrun}")
+
+        self.dt = dt
+        self.overrun = overrun
+        self.spin = spin
+        self.report = report
+        self.degrade_after = degrade_after
+        self.max_dt = max_dt if max_dt is not None else 4 * dt
+        self.handle_signals = handle_signals
+
+        self.iterations = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self._total_lateness = 0.0
+
+        self._started = False
+        self._stopped = False
+        self._stop_requested = False
+        self._consecutive_overruns = 0
+        self._previous_handlers = {}
+
+    def __iter__(self):
+        return self
+
+    def _start(self) -> None:
+        self._started = True
+
+        if self.handle_signals and threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                self._previous_handlers[signum] = signal.signal(signum, self._on_signal)
+
+        self.t0 = time.monotonic()
+        self._anchor = self.t0
+        self._t_anchor = 0.0
+        self._k = 0
+
+    def _on_signal(self, signum, frame) -> None:
+        self._stop_requested = True
+
+    def __next__(self) -> float:
+        if not self._started:
+            self._start()
+
+        if self._stop_requested or self._stopped:
+            self.stop()
+            raise StopIteration
+
+        deadline = self._anchor + self._k * self.dt
+        now = time.monotonic()
+
+        if now - deadline >= self.dt:
+            deadline = self._handle_overrun(deadline, now)
+        else:
+            self._consecutive_overruns = 0
+
+        self._wait_until(deadline)
+
+        if self._stop_requested:
+            self.stop()
+            raise StopIteration
+
+        lateness = time.monotonic() - deadline
+        self.iterations += 1
+        self._total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+
+        self._k += 1
+        return self._t_anchor + self._k * self.dt
+
+    def _handle_overrun(self, deadline: float, now: float) -> float:
+        """ Apply the overrun policy to an iteration starting at least a period late
+
+        Args:
+            deadline (float): missed deadline (monotonic)
+            now (float): current time (monotonic)
+
+        Returns:
+            float: deadline of the iteration to run
+        """
+        self.overruns += 1
+        self._consecutive_overruns += 1
+
+        if self.overrun == "skip":
+            missed = math.floor((now - deadline) / self.dt)
+            self.skipped += missed
+            self._k += missed
+            return self._anchor + self._k * self.dt
+
+        if self.overrun == "degrade" and self._consecutive_overruns >= self.degrade_after and self.dt < self.max_dt:
+            # Restart the schedule from now at the lower rate
+            self._t_anchor += self._k * self.dt
+            self._anchor = now
+            self._k = 0
+            self.dt = min(2 * self.dt, self.max_dt)
+            self._consecutive_overruns = 0
+            print(f"Loop overrunning, frequency lowered to {1 / self.dt:.0f} Hz")
+            return now
+
+        return deadline
+
+    def _wait_until(self, deadline: float) -> None:
+        remaining = deadline - time.monotonic() - self.spin
+        if remaining > 0:
+            time.sleep(remaining)
+
+        while time.monotonic() < deadline:
+            pass
+
+    def stop(self) -> None:
+        """ Stop the loop, restore the signal handlers and print the report """
+        if self._stopped:
+            return
+        self._stopped = True
+
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
+
+        if self.report and self._started:
+            self.print_report()
+
+    def stats(self) -> dict:
+        """ Timing statistics
+
+        Returns:
+            dict: iterations, overruns, skipped iterations, mean and max lateness (s), current period (s)
+        """
+        return {
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "mean_lateness": self._total_lateness / self.iterations if self.iterations else 0.0,
+            "max_lateness": self.max_lateness,
+            "dt": self.dt,
+        }
+
+    def print_report(self) -> None:
+        stats = self.stats()
+        print(
+            f"\nLoop: {stats['iterations']} iterations at {1 / stats['dt']:.0f} Hz, "
+            f"{stats['overruns']} overruns ({stats['skipped']} skipped), "
+            f"lateness mean: {stats['mean_lateness'] * 1e6:.0f} us, max: {stats['max_lateness'] * 1e6:.0f} us"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __del__(self):
+        self.stop()
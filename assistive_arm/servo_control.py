@@ -5,6 +5,26 @@ from abc import ABC, abstractmethod, abstractproperty
 
 import RPi.GPIO as GPIO
 
+
+# MG996R no-load speed at 6V: 0.14s / 60deg
+SERVO_SPEED = 0.14 / 60  # s/deg
+SETTLE_MARGIN = 0.02  # s
+
+
+def estimate_move_time(delta_angle: float, speed: float = SERVO_SPEED, margin: float = SETTLE_MARGIN) -> float:
+    """ Time for a servo to travel a given angle
+
+    Args:
+        delta_angle (float): angle to travel (deg)
+        speed (float, optional): servo speed (s/deg). Defaults to SERVO_SPEED.
+        margin (float, optional): time added for the servo to settle (s). Defaults to SETTLE_MARGIN.
+
+    Returns:
+        float: time (s)
+    """
+    return abs(delta_angle) * speed + margin
+
+
 class ServoBase(ABC):
     """Base class for future servos"""
     
@@ -74,12 +94,24 @@ class ServoControl:
         self.pwm = GPIO.PWM(self._gpio_pin, self._pwm_cycle)
         self.start()  # Start PWM running, set servo to 0 degree.
 
-    def set_angle(self, angle: float) -> None:
+    def set_angle(self, angle: float, settle_time: float = 0.1) -> float:
+        """ Command the servo to an angle
+
+        Args:
+            angle (float): angle in degrees, clamped to angle_range
+            settle_time (float, optional): time to wait after commanding (s), 0 to return immediately. Defaults to 0.1.
+
+        Returns:
+            float: commanded (clamped) angle
+        """
         # Angle is between -90 and 90, convert to 0 and 180
         clamped_angle = np.clip(angle, self.angle_range.min(), self.angle_range.max())
         degree = 90 - clamped_angle
         self.pwm.ChangeDutyCycle(self._servo_min + self._servo_max * degree / 180)
-        sleep(0.1)
+        if settle_time > 0:
+            sleep(settle_time)
+
+        return float(clamped_angle)
 
     def start(self) -> None:
         self.pwm.start(0)
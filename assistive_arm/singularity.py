@@ -0,0 +1,170 @@
+import numpy as np
+
+from assistive_arm.robotic_arm import get_jacobian
+
+
+# Link lengths used by get_jacobian
+L1 = 0.44
+L2 = 0.41
+
+
+def barrier_force(theta_2: np.ndarray, gain: float = 150, d_sing: float = 0.175, fade: float = 0.035) -> np.ndarray:
+    """ End-effector Y force pushing the arm away from the stretched-out singularity (theta_2 = 0).
+
+    Uses the manipulability based field of the singularity test, Ks * m * l1 * l2 * sin(2 theta_2) / (2 |sin theta_2|)
+    with m = l1 * l2 * |sin theta_2|. The |sin theta_2| terms cancel, which also removes the spike the test's
+    sin(theta_2 + 0.001) denominator had at theta_2 = -0.001. The field is faded in with a smoothstep over
+    the last `fade` rad before d_sing so the force is continuous when entering the region.
+
+    Args:
+        theta_2 (np.ndarray): motor_2 angles
+        gain (float, optional): avoidance gain Ks. Defaults to 150.
+        d_sing (float, optional): |theta_2| below which the field is active (rad). Defaults to 0.175.
+        fade (float, optional): width of the fade-in at the edge of the region (rad). Defaults to 0.035.
+
+    Returns:
+        np.ndarray: force (N), with the shape of theta_2
+    """
+    theta_2 = np.asarray(theta_2, dtype=float)
+
+    force = gain * (L1 * L2) ** 2 * np.sin(2 * theta_2) / 2
+
+    if fade > 0:
+        s = np.clip((d_sing - np.abs(theta_2)) / fade, 0, 1)
+        weight = s * s * (3 - 2 * s)
+    else:
+        weight = (np.abs(theta_2) <= d_sing).astype(float)
+
+    return force * weight
+
+
+class SingularityAvoidance:
+    """ Singularity avoidance torques from a barrier force tabulated over theta_2
+
+    The barrier only depends on theta_2, so it is sampled once at construction and linearly
+    interpolated per tick. Torques use the shared Jacobian, tau = J^T [0, F].
+    """
+
+    def __init__(
+        self,
+        gain: float = 150,
+        d_sing: float = 0.175,
+        fade: float = 0.035,
+        n_samples: int = 1025,
+        attenuation: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            gain (float, optional): avoidance gain Ks. Defaults to 150.
+            d_sing (float, optional): |theta_2| below which the field is active (rad). Defaults to 0.175.
+            fade (float, optional): width of the fade-in at the edge of the region (rad). Defaults to 0.035.
+            n_samples (int, optional): lookup table samples over [-d_sing, d_sing]. Defaults to 1025.
+            attenuation (float, optional): fraction of the assistance torque removed at the singularity
+                when blending, scaled by the barrier weight. Defaults to 0.0 (assistance kept).
+        """
+        self.gain = gain
+        self.d_sing = d_sing
+        self.fade = fade
+        self.attenuation = attenuation
+
+        self.theta_2_table = np.linspace(-d_sing, d_sing, n_samples)
+        self.force_table = barrier_force(self.theta_2_table, gain=gain, d_sing=d_sing, fade=fade)
+
+        self._step = float(self.theta_2_table[1] - self.theta_2_table[0])
+        self._forces = self.force_table.tolist()
+
+    def force(self, theta_2: float) -> float:
+        """ Barrier force from the lookup table
+
+        Args:
+            theta_2 (float): motor_2 angle
+
+        Returns:
+            float: force (N), 0 outside the avoidance region
+        """
+        if not -self.d_sing < theta_2 < self.d_sing:
+            return 0.0
+
+        x = (theta_2 + self.d_sing) / self._step
+        i = min(int(x), len(self._forces) - 2)
+        u = x - i
+
+        return (1 - u) * self._forces[i] + u * self._forces[i + 1]
+
+    def torque(self, theta_1: float, theta_2: float) -> tuple:
+        """ Avoidance torques for a single configuration
+
+        Args:
+            theta_1 (float): motor_1 angle
+            theta_2 (float): motor_2 angle
+
+        Returns:
+            tuple: tau_1, tau_2
+        """
+        force = self.force(theta_2)
+        if force == 0.0:
+            return 0.0, 0.0
+
+        jacobian = get_jacobian(theta_1, theta_2)
+
+        return jacobian[1, 0] * force, jacobian[1, 1] * force
+
+    def torque_batch(self, theta_1: np.ndarray, theta_2: np.ndarray) -> np.ndarray:
+        """ Avoidance torques for many configurations
+
+        Args:
+            theta_1 (np.ndarray): motor_1 angles
+            theta_2 (np.ndarray): motor_2 angles, same shape as theta_1
+
+        Returns:
+            np.ndarray: torques [tau_1, tau_2] (..., 2)
+        """
+        theta_1, theta_2 = np.broadcast_arrays(np.asarray(theta_1, dtype=float), np.asarray(theta_2, dtype=float))
+
+        force = np.interp(theta_2, self.theta_2_table, self.force_table, left=0, right=0)
+        jacobian = get_jacobian(theta_1, theta_2)
+
+        return np.stack([jacobian[1, 0] * force, jacobian[1, 1] * force], axis=-1)
+
+    def weight(self, theta_2: np.ndarray) -> np.ndarray:
+        """ How deep into the avoidance region theta_2 is, from 0 at d_sing to 1 at the singularity
+
+        Args:
+            theta_2 (np.ndarray): motor_2 angles
+
+        Returns:
+            np.ndarray: weight in [0, 1]
+        """
+        return np.clip(1 - np.abs(theta_2) / self.d_sing, 0, 1)
+
+    def blend(self, theta_1: float, theta_2: float, tau_1: float, tau_2: float) -> tuple:
+        """ Add the avoidance torques to the assistance torques, attenuating the assistance near the singularity
+
+        Args:
+            theta_1 (float): motor_1 angle
+            theta_2 (float): motor_2 angle
+            tau_1 (float): assistance torque of motor_1
+            tau_2 (float): assistance torque of motor_2
+
+        Returns:
+            tuple: tau_1, tau_2
+        """
+        avoid_1, avoid_2 = self.torque(theta_1, theta_2)
+        scale = 1 - self.attenuation * float(self.weight(theta_2)) if self.attenuation else 1.0
+
+        return scale * tau_1 + avoid_1, scale * tau_2 + avoid_2
+
+    def blend_batch(self, theta_1: np.ndarray, theta_2: np.ndarray, torques: np.ndarray) -> np.ndarray:
+        """ Batched blend
+
+        Args:
+            theta_1 (np.ndarray): motor_1 angles
+            theta_2 (np.ndarray): motor_2 angles, same shape as theta_1
+            torques (np.ndarray): assistance torques [tau_1, tau_2] (..., 2)
+
+        Returns:
+            np.ndarray: torques [tau_1, tau_2] (..., 2)
+        """
+        scale = 1 - self.attenuation * self.weight(np.asarray(theta_2, dtype=float))
+
+        return scale[..., np.newaxis] * torques + self.torque_batch(theta_1, theta_2)
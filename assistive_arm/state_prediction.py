@@ -0,0 +1,94 @@
+import time
+
+
+class StatePredictor:
+    """ Alpha-beta tracker of a joint, predicting its state when the next command takes effect.
+
+    Raw position samples are tracked with alpha = 1 - s^2, beta = (1 - s)^2 (critically damped
+    for smoothing s), which keeps the velocity estimate almost lag free compared to a moving
+    average. The state is then extrapolated by:
+        - the age of the last sample, measured when it was received minus half the bus round trip
+        - the bus latency (half round trip, exponential average seeded with the first round trip)
+          before a command reaches the motor
+        - `hold`, e.g. half a period to target the middle of the interval the command is applied for
+    """
+
+    def __init__(self, smoothing: float = 0.6, latency_smoothing: float = 0.05, hold: float = 0.0) -> None:
+        """
+        Args:
+            smoothing (float, optional): tracker smoothing in [0, 1), higher filters more. Defaults to 0.6.
+            latency_smoothing (float, optional): weight of a new round trip in the latency average. Defaults to 0.05.
+            hold (float, optional): extra prediction time (s). Defaults to 0.
+        """
+        self.alpha = 1 - smoothing ** 2
+        self.beta = (1 - smoothing) ** 2
+        self.latency_smoothing = latency_smoothing
+        self.hold = hold
+
+        self.position = None
+        self.velocity = 0.0
+        self.timestamp = None
+        self.bus_latency = 0.0
+        self.round_trips = 0
+
+    def reset(self) -> None:
+        self.position = None
+        self.velocity = 0.0
+        self.timestamp = None
+
+    def update(self, position: float, timestamp: float, round_trip: float = None) -> None:
+        """ Add a raw sample
+
+        Args:
+            position (float): measured position (rad)
+            timestamp (float): time the reply was received (time.monotonic())
+            round_trip (float, optional): time between sending the command and receiving the reply (s). Defaults to None.
+        """
+        if round_trip is not None:
+            if self.round_trips == 0:
+                self.bus_latency = round_trip / 2
+            else:
+                self.bus_latency += self.latency_smoothing * (round_trip / 2 - self.bus_latency)
+            self.round_trips += 1
+
+        # The motor measured the state about one bus latency before the reply arrived
+        timestamp -= self.bus_latency
+
+        if self.position is None:
+            self.position = position
+            self.timestamp = timestamp
+            return
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return
+
+        predicted = self.position + self.velocity * dt
+        residual = position - predicted
+
+        self.position = predicted + self.alpha * residual
+        self.velocity += self.beta * residual / dt
+        self.timestamp = timestamp
+
+    @property
+    def delay(self) -> float:
+        """ Time from the last sample to the moment a command sent now takes effect (s) """
+        if self.timestamp is None:
+            return 0.0
+        return time.monotonic() - self.timestamp + self.bus_latency + self.hold
+
+    def predict(self, horizon: float = None) -> tuple:
+        """ Predicted position and velocity
+
+        Args:
+            horizon (float, optional): prediction time from the last sample (s). Defaults to None (delay).
+
+        Returns:
+            tuple: position (rad), velocity (rad/s)
+        """
+        if self.position is None:
+            return 0.0, 0.0
+
+        horizon = self.delay if horizon is None else horizon
+
+        return self.position + self.velocity * horizon, self.velocity
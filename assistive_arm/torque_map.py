@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from assistive_arm.robotic_arm import get_jacobian
+
+
+def get_exact_torques(theta_1: np.ndarray, theta_2: np.ndarray, profile: pd.DataFrame) -> tuple:
+    """ Vectorised get_target_torques: nearest theta_2 of the profile and -J^T F
+
+    Args:
+        theta_1 (np.ndarray): motor_1 angles
+        theta_2 (np.ndarray): motor_2 angles, same shape as theta_1
+        profile (pd.DataFrame): assistance profile
+
+    Returns:
+        tuple: tau_1, tau_2, index (percentage of profile), each with the shape of the angles
+    """
+    theta_1, theta_2 = np.broadcast_arrays(np.asarray(theta_1, dtype=float), np.asarray(theta_2, dtype=float))
+
+    # The profile lookup only depends on theta_2, search once per distinct value
+    unique_theta_2, inverse = np.unique(theta_2, return_inverse=True)
+    closest_point = np.abs(unique_theta_2[:, np.newaxis] - profile.theta_2.to_numpy()).argmin(axis=-1)
+    closest_point = closest_point[inverse].reshape(theta_2.shape)
+    force_x = profile.force_X.to_numpy()[closest_point]
+    force_y = profile.force_Y.to_numpy()[closest_point]
+
+    jacobian = get_jacobian(theta_1, theta_2)
+    tau_1 = -(jacobian[0, 0] * force_x + jacobian[1, 0] * force_y)
+    tau_2 = -(jacobian[0, 1] * force_x + jacobian[1, 1] * force_y)
+
+    return tau_1, tau_2, profile.index.to_numpy()[closest_point]
+
+
+class TorqueMap:
+    """ Assistance torques precomputed on a (theta_1, theta_2) grid and bilinearly interpolated,
+    so that a control tick costs four table lookups instead of a profile search and a Jacobian.
+    """
+
+    def __init__(
+        self,
+        profile: pd.DataFrame,
+        resolution: float = float(np.deg2rad(0.25)),
+        margin: float = float(np.deg2rad(10)),
+        theta_1_range: tuple = None,
+        theta_2_range: tuple = None,
+        verbose: bool = True,
+    ) -> None:
+        """
+        Args:
+            profile (pd.DataFrame): assistance profile (theta_1, theta_2, force_X, force_Y, indexed by percentage)
+            resolution (float, optional): grid spacing (rad). Defaults to 0.25 deg.
+            margin (float, optional): extension of the grid beyond the profile's joint range (rad). Defaults to 10 deg.
+            theta_1_range (tuple, optional): (min, max) of theta_1 covered. Defaults to the profile range and margin.
+            theta_2_range (tuple, optional): (min, max) of theta_2 covered. Defaults to the profile range and margin.
+            verbose (bool, optional): print the grid size and accuracy. Defaults to True.
+        """
+        self.profile = profile
+
+        if theta_1_range is None:
+            theta_1_range = (profile.theta_1.min() - margin, profile.theta_1.max() + margin)
+        if theta_2_range is None:
+            theta_2_range = (profile.theta_2.min() - margin, profile.theta_2.max() + margin)
+
+        n_1 = int(np.ceil((theta_1_range[1] - theta_1_range[0]) / resolution)) + 1
+        n_2 = int(np.ceil((theta_2_range[1] - theta_2_range[0]) / resolution)) + 1
+
+        self.theta_1 = theta_1_range[0] + np.arange(n_1) * resolution
+        self.theta_2 = theta_2_range[0] + np.arange(n_2) * resolution
+        self.resolution = resolution
+        self._origin = (float(self.theta_1[0]), float(self.theta_2[0]))
+        self._max_cell = (n_1 - 1.000001, n_2 - 1.000001)
+
+        theta_1_grid, theta_2_grid = np.meshgrid(self.theta_1, self.theta_2, indexing="ij")
+        tau_1, tau_2, index = get_exact_torques(theta_1_grid, theta_2_grid, profile)
+
+        # (n_1, n_2, 3) so one cell lookup reads neighbouring memory
+        self.grid = np.stack([tau_1, tau_2, index], axis=-1)
+        self._rows = self.grid.tolist()
+
+        self.accuracy = self.estimate_accuracy()
+
+        if verbose:
+            print(f"Torque map: {n_1}x{n_2} grid, {self.grid.nbytes / 1024:.0f} kB")
+            print(
+                f"Max error: tau_1 {self.accuracy['tau_1']:.3f}Nm, tau_2 {self.accuracy['tau_2']:.3f}Nm, "
+                f"index {self.accuracy['index']:.2f}%"
+            )
+
+    def __call__(self, theta_1: float, theta_2: float) -> tuple:
+        """ Interpolated torques for the current configuration, clamped to the grid edges
+
+        Args:
+            theta_1 (float): motor_1 angle
+            theta_2 (float): motor_2 angle
+
+        Returns:
+            tuple: tau_1, tau_2, index (percentage of profile)
+        """
+        # Plain Python arithmetic: faster than numpy for a single point
+        x = min(max((theta_1 - self._origin[0]) / self.resolution, 0.0), self._max_cell[0])
+        y = min(max((theta_2 - self._origin[1]) / self.resolution, 0.0), self._max_cell[1])
+        i, j = int(x), int(y)
+        u, v = x - i, y - j
+
+        row_0, row_1 = self._rows[i], self._rows[i + 1]
+        c_00, c_01, c_10, c_11 = row_0[j], row_0[j + 1], row_1[j], row_1[j + 1]
+
+        w_00, w_01, w_10, w_11 = (1 - u) * (1 - v), (1 - u) * v, u * (1 - v), u * v
+
+        return tuple(
+            w_00 * c_00[k] + w_01 * c_01[k] + w_10 * c_10[k] + w_11 * c_11[k]
+            for k in range(3)
+        )
+
+    def evaluate(self, theta_1: np.ndarray, theta_2: np.ndarray) -> np.ndarray:
+        """ Vectorised interpolation for many configurations
+
+        Args:
+            theta_1 (np.ndarray): motor_1 angles
+            theta_2 (np.ndarray): motor_2 angles, same shape as theta_1
+
+        Returns:
+            np.ndarray: [tau_1, tau_2, index] (..., 3)
+        """
+        x = np.clip((np.asarray(theta_1) - self._origin[0]) / self.resolution, 0, self._max_cell[0])
+        y = np.clip((np.asarray(theta_2) - self._origin[1]) / self.resolution, 0, self._max_cell[1])
+        i, j = x.astype(int), y.astype(int)
+        u, v = (x - i)[..., np.newaxis], (y - j)[..., np.newaxis]
+
+        return (
+            (1 - u) * (1 - v) * self.grid[i, j]
+            + (1 - u) * v * self.grid[i, j + 1]
+            + u * (1 - v) * self.grid[i + 1, j]
+            + u * v * self.grid[i + 1, j + 1]
+        )
+
+    def estimate_accuracy(self) -> dict:
+        """ Interpolation error against get_target_torques at the cell centres, where bilinear
+        interpolation is furthest from the grid nodes. Only cells whose theta_2 lies within the
+        profile's range are considered, elsewhere the profile lookup is clamped anyway.
+
+        Returns:
+            dict: maximum absolute error of tau_1, tau_2 (Nm) and index (%)
+        """
+        theta_1 = self.theta_1[:-1] + self.resolution / 2
+        theta_2 = self.theta_2[:-1] + self.resolution / 2
+        theta_2 = theta_2[(theta_2 >= self.profile.theta_2.min()) & (theta_2 <= self.profile.theta_2.max())]
+
+        theta_1_grid, theta_2_grid = np.meshgrid(theta_1, theta_2, indexing="ij")
+        exact = np.stack(get_exact_torques(theta_1_grid, theta_2_grid, self.profile), axis=-1)
+        error = np.abs(self.evaluate(theta_1_grid, theta_2_grid) - exact)
+
+        max_error = error.reshape(-1, 3).max(axis=0, initial=0)
+
+        return {key: float(value) for key, value in zip(["tau_1", "tau_2", "index"], max_error)}
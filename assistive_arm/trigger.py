@@ -0,0 +1,141 @@
+import threading
+import time
+
+from collections import deque, namedtuple
+from typing import Callable
+
+
+TriggerEvent = namedtuple("TriggerEvent", ["rising", "timestamp"])
+
+
+class GPIOBackend:
+    """ RPi.GPIO edge detection on a BCM pin """
+
+    def __init__(self, bouncetime: int = None) -> None:
+        """
+        Args:
+            bouncetime (int, optional): debounce time (ms). Defaults to None.
+        """
+        import RPi.GPIO as GPIO
+
+        self.GPIO = GPIO
+        self.bouncetime = bouncetime
+        GPIO.setmode(GPIO.BCM)
+
+    def setup(self, pin: int, callback: Callable[[bool], None]) -> None:
+        self.GPIO.setup(pin, self.GPIO.IN)
+
+        kwargs = {"bouncetime": self.bouncetime} if self.bouncetime else {}
+        self.GPIO.add_event_detect(
+            pin, self.GPIO.BOTH, callback=lambda channel: callback(bool(self.GPIO.input(channel))), **kwargs
+        )
+
+    def read(self, pin: int) -> bool:
+        return bool(self.GPIO.input(pin))
+
+    def close(self, pin: int) -> None:
+        self.GPIO.remove_event_detect(pin)
+
+
+class FakeBackend:
+    """ In-memory pin for running trigger code without a Pi, edges are injected with set_level """
+
+    def __init__(self, level: bool = False) -> None:
+        self.level = level
+        self._callback = None
+
+    def setup(self, pin: int, callback: Callable[[bool], None]) -> None:
+        self._callback = callback
+
+    def read(self, pin: int) -> bool:
+        return self.level
+
+    def close(self, pin: int) -> None:
+        self._callback = None
+
+    def set_level(self, level: bool) -> None:
+        """ Change the pin level, calling the edge callback like GPIO would
+
+        Args:
+            level (bool): new level
+        """
+        if level == self.level:
+            return
+        self.level = level
+        if self._callback:
+            self._callback(level)
+
+
+class Trigger:
+    """ Trigger input handled with edge callbacks instead of polling.
+
+    `active` mirrors the pin level and is the only thing the control loop needs to read.
+    Every edge is timestamped (time.time(), like the trial logs) and kept in `events`.
+    """
+
+    def __init__(self, pin: int = 17, backend=None, max_events: int = 1000) -> None:
+        """
+        Args:
+            pin (int, optional): BCM pin of the trigger. Defaults to 17.
+            backend (optional): GPIOBackend or FakeBackend. Defaults to None (GPIOBackend).
+            max_events (int, optional): number of edges kept. Defaults to 1000.
+        """
+        self.pin = pin
+        self.backend = backend if backend is not None else GPIOBackend()
+        self.events = deque(maxlen=max_events)
+
+        self.rising_time = None
+        self.falling_time = None
+
+        self._on = threading.Event()
+        self._off = threading.Event()
+
+        self.active = self.backend.read(pin)
+        (self._on if self.active else self._off).set()
+
+        self.backend.setup(pin, self._on_edge)
+
+    def _on_edge(self, level: bool) -> None:
+        timestamp = time.time()
+
+        # Bouncing can report the same level twice, only keep actual changes
+        if level == self.active:
+            return
+
+        self.active = level
+        self.events.append(TriggerEvent(rising=level, timestamp=timestamp))
+
+        if level:
+            self.rising_time = timestamp
+            self._off.clear()
+            self._on.set()
+        else:
+            self.falling_time = timestamp
+            self._on.clear()
+            self._off.set()
+
+    def wait_for_active(self, timeout: float = None) -> bool:
+        """ Block until the trigger is on, returns immediately if it already is
+
+        Args:
+            timeout (float, optional): maximum waiting time (s). Defaults to None.
+
+        Returns:
+            bool: True if the trigger is on
+        """
+        return self._on.wait(timeout)
+
+    def wait_for_inactive(self, timeout: float = None) -> bool:
+        """ Block until the trigger is off, returns immediately if it already is
+
+        Args:
+            timeout (float, optional): maximum waiting time (s). Defaults to None.
+
+        Returns:
+            bool: True if the trigger is off
+        """
+        return self._off.wait(timeout)
+
+    def close(self) -> None:
+        """ Stop edge detection """
+        self.backend.close(self.pin)
@@ -4,6 +4,75 @@ import scipy as sp
 
 import matplotlib.pyplot as plt
 
+from functools import lru_cache
+
+from assistive_arm.utils.time_normalization import normalize_trials
+
+
+@lru_cache(maxsize=None)
+def get_sos_filter(sfreq: float, cutoffs: tuple, order: int = 4, btype: str = "lowpass") -> np.ndarray:
+    """ Design a Butterworth filter as second-order sections, cached by its parameters
+
+    Args:
+        sfreq (float): sampling frequency (Hz)
+        cutoffs (tuple): cut-off frequencies (Hz), one value for low/high-pass, two for bandpass
+        order (int, optional): filter order. Defaults to 4.
+        btype (str, optional): filter type, as accepted by scipy.signal.butter. Defaults to "lowpass".
+
+    Returns:
+        np.ndarray: second-order sections (n_sections, 6), shared between calls and not to be modified
+    """
+    normalized = np.array(cutoffs, dtype=float) / (sfreq / 2)
+    if normalized.size == 1:
+        normalized = normalized.item()
+
+    return sp.signal.butter(order, normalized, btype=btype, output="sos")
+
+
+def filter_emg_array(emg: np.ndarray, low_pass=4, sfreq=2000, high_band=20, low_band=450, order=4) -> np.ndarray:
+    """ Compute the EMG envelope of every channel at once
+
+    Channels sharing the same NaN pattern are filtered together along axis 0, skipping
+    the NaN samples exactly like dropping them from each column would.
+
+    Args:
+        emg (np.ndarray): EMG data (n_samples, n_channels)
+        low_pass (int, optional): Low-pass cut off frequency. Defaults to 4.
+        sfreq (int, optional): Sampling frequency. Defaults to 2000.
+        high_band (int, optional): High-band frequency for bandpass filter. Defaults to 20.
+        low_band (int, optional): Low-band frequency for bandpass filter. Defaults to 450.
+        order (int, optional): Butterworth filter order. Defaults to 4.
+
+    Returns:
+        np.ndarray: envelopes (n_samples, n_channels), NaN where the input was NaN
+    """
+    emg = np.asarray(emg, dtype=float)
+    envelopes = np.full(emg.shape, np.nan)
+
+    sos_bandpass = get_sos_filter(sfreq, (high_band, low_band), order, "bandpass")
+    sos_lowpass = get_sos_filter(sfreq, (low_pass,), order, "lowpass")
+
+    valid = ~np.isnan(emg)
+
+    # Group channels by their valid-sample mask, all-NaN channels stay NaN
+    masks, channel_groups = np.unique(valid, axis=1, return_inverse=True)
+    channel_groups = channel_groups.reshape(-1)
+
+    for group, mask in enumerate(masks.T):
+        if not mask.any():
+            continue
+
+        channels = np.flatnonzero(channel_groups == group)
+        segment = emg[np.ix_(mask, channels)]
+
+        # Filter EMG: remove mean, bandpass, rectify, lowpass
+        segment = segment - segment.mean(axis=0)
+        emg_filtered = sp.signal.sosfiltfilt(sos_bandpass, segment, axis=0)
+        emg_rectified = np.abs(emg_filtered)
+        envelopes[np.ix_(mask, channels)] = sp.signal.sosfiltfilt(sos_lowpass, emg_rectified, axis=0)
+
+    return envelopes
+
 
 def filter_emg(unfiltered_df: pd.DataFrame, low_pass=4, sfreq=2000, high_band=20, low_band=450) -> pd.DataFrame:
     """ Filter EMG signals
@@ -18,44 +87,128 @@ def filter_emg(unfiltered_df: pd.DataFrame, low_pass=4, sfreq=2000, high_band=20
     Returns:
         pd.DataFrame: filtered dataframe
     """
-    emg_data = unfiltered_df.copy()
+    envelopes = filter_emg_array(
+        unfiltered_df.to_numpy(dtype=float),
+        low_pass=low_pass,
+        sfreq=sfreq,
+        high_band=high_band,
+        low_band=low_band,
+    )
+    envelopes = pd.DataFrame(envelopes, index=unfiltered_df.index, columns=unfiltered_df.columns)
 
-    # Normalize cut-off frequencies to sampling frequency
-    high_band_normalized = high_band / (sfreq / 2)
-    low_band_normalized = low_band / (sfreq / 2)
     low_pass_normalized = low_pass / (sfreq / 2)
+    env_freq = int(low_pass_normalized * sfreq)
 
-    # Bandpass filter coefficients
-    b1, a1 = sp.signal.butter(4, [high_band_normalized, low_band_normalized], btype='bandpass')
+    return envelopes, env_freq
 
-    # Lowpass filter coefficients
-    b2, a2 = sp.signal.butter(4, low_pass_normalized, btype='lowpass')
 
-    def process_emg(emg):
-        # Handle NaNs: skip filtering for NaN segments
-        if emg.isna().all():
-            return emg  # Returns as is if all are NaNs
+class EMGEnvelopeStream:
+    """ Causal EMG envelope extractor for data arriving in blocks (e.g. mocap analog channels)
 
-        # Correct mean for non-NaN values
-        non_nan_emg = emg.dropna()
-        emg_correctmean = non_nan_emg - non_nan_emg.mean()
+    Applies the same bandpass, rectification and low-pass chain as filter_emg, but with
+    sosfilt and filter states carried over between blocks, so it can run during a trial.
+    """
 
-        # Filter EMG: bandpass, rectify, lowpass for non-NaN values
-        emg_filtered = sp.signal.filtfilt(b1, a1, emg_correctmean)
+    def __init__(
+        self,
+        n_channels: int,
+        sfreq: float = 2000,
+        low_pass: float = 4,
+        high_band: float = 20,
+        low_band: float = 450,
+        order: int = 4,
+        max_block_size: int = None,
+        mvic: np.ndarray = None,
+    ) -> None:
+        """
+        Args:
+            n_channels (int): number of EMG channels
+            sfreq (float, optional): sampling frequency (Hz). Defaults to 2000.
+            low_pass (float, optional): envelope cut-off frequency (Hz). Defaults to 4.
+            high_band (float, optional): high-band frequency for bandpass filter. Defaults to 20.
+            low_band (float, optional): low-band frequency for bandpass filter. Defaults to 450.
+            order (int, optional): Butterworth filter order. Defaults to 4.
+            max_block_size (int, optional): maximum samples filtered per update, older samples of a
+                larger block are dropped to bound the time spent per block. Defaults to None (no limit).
+            mvic (np.ndarray, optional): per-channel envelope at MVIC, used to normalize. Defaults to None.
+        """
+        self.n_channels = n_channels
+        self.sfreq = sfreq
+        self.max_block_size = max_block_size
+        self.mvic = None if mvic is None else np.asarray(mvic, dtype=float)
+
+        self._sos_bandpass = get_sos_filter(sfreq, (high_band, low_band), order, "bandpass")
+        self._sos_lowpass = get_sos_filter(sfreq, (low_pass,), order, "lowpass")
+
+        self.reset()
+
+    def reset(self) -> None:
+        """ Clear filter states and the current envelope """
+        self._zi_bandpass = None
+        self._zi_lowpass = np.zeros((self._sos_lowpass.shape[0], 2, self.n_channels))
+        self._envelope = np.zeros(self.n_channels)
+        self.samples_processed = 0
+        self.samples_dropped = 0
+
+    @property
+    def envelope(self) -> np.ndarray:
+        """ Latest envelope value of every channel (MVIC-normalized if mvic was given) """
+        return self._envelope
+
+    def update(self, block: np.ndarray) -> np.ndarray:
+        """ Filter a new block of samples
+
+        Args:
+            block (np.ndarray): raw EMG (n_samples, n_channels), or a single sample (n_channels,)
+
+        Returns:
+            np.ndarray: envelope for the filtered samples (n_samples, n_channels)
+        """
+        block = np.asarray(block, dtype=float).reshape(-1, self.n_channels)
+
+        if self.max_block_size and block.shape[0] > self.max_block_size:
+            self.samples_dropped += block.shape[0] - self.max_block_size
+            block = block[-self.max_block_size:]
+
+        if block.shape[0] == 0:
+            return np.empty((0, self.n_channels))
+
+        # Missing samples are held at zero so they don't poison the filter states
+        block = np.nan_to_num(block)
+
+        if self._zi_bandpass is None:
+            # Start in steady state for the first sample to avoid a step transient
+            zi = sp.signal.sosfilt_zi(self._sos_bandpass)
+            self._zi_bandpass = zi[:, :, np.newaxis] * block[0]
+
+        emg_filtered, self._zi_bandpass = sp.signal.sosfilt(
+            self._sos_bandpass, block, axis=0, zi=self._zi_bandpass
+        )
         emg_rectified = np.abs(emg_filtered)
-        emg_envelope = sp.signal.filtfilt(b2, a2, emg_rectified)
+        envelope, self._zi_lowpass = sp.signal.sosfilt(
+            self._sos_lowpass, emg_rectified, axis=0, zi=self._zi_lowpass
+        )
 
-        # Construct the resulting series, placing NaNs back in their original positions
-        result = pd.Series(index=emg.index, data=np.nan)
-        result[emg.notna()] = emg_envelope
+        if self.mvic is not None:
+            envelope = envelope / self.mvic
 
-        return result
+        self.samples_processed += block.shape[0]
+        self._envelope = envelope[-1].copy()
 
-    # Apply processing to each column
-    envelopes = emg_data.apply(process_emg, axis=0)
-    env_freq = int(low_pass_normalized * sfreq)
+        return envelope
 
-    return envelopes, env_freq
+
+def stack_analog_channels(analog_data: dict, channels: list) -> np.ndarray:
+    """ Stack the analog channels returned by get_qrt_data into an EMG block
+
+    Args:
+        analog_data (dict): analog data, {rt_id: samples}
+        channels (list): rt_ids to use, in channel order
+
+    Returns:
+        np.ndarray: samples (n_samples, n_channels)
+    """
+    return np.column_stack([np.asarray(analog_data[channel], dtype=float) for channel in channels])
 
 
 def interpolate_dataframe_to_length(df, target_length, reference_column=None):
@@ -87,16 +240,8 @@ def interpolate_dataframe_to_length(df, target_length, reference_column=None):
     # Normalize x to have values from 0 to 1, aiding in consistent interpolation
     x_norm = np.linspace(x.min(), x.max(), num=target_length)
 
-    # Create an empty DataFrame to hold the interpolated values
-    interpolated_df = pd.DataFrame(index=x_norm)
-
-    # Interpolate each column in the DataFrame
-    for column in df.columns:
-        if column != reference_column:  # Skip the reference column if it's part of the DataFrame
-            # Setup the interpolator
-            interpolator = sp.interpolate.interp1d(x, df[column], kind='linear', bounds_error=False, fill_value='extrapolate')
-            # Perform the interpolation and assign to the new DataFrame
-            interpolated_df[column] = interpolator(x_norm)
+    normalized, columns = normalize_trials([df], target_length, reference_column=reference_column)
+    interpolated_df = pd.DataFrame(normalized[0], index=x_norm, columns=columns)
 
     # If using a reference column, set it as index if desired, or drop/adjust it based on your needs
     interpolated_df.index.name = df.index.name
@@ -0,0 +1,326 @@
+import json
+import numpy as np
+import pandas as pd
+
+from scipy.integrate import trapezoid
+
+from pathlib import Path
+from typing import List
+
+
+# Bump when the cached arrays change layout to invalidate existing caches
+RESULTS_CACHE_VERSION = 1
+
+
+def read_sto(file_path: Path) -> tuple[dict, list, np.ndarray]:
+    """ Read a .sto file (e.g. a MocoTrajectory solution) without pandas
+
+    Args:
+        file_path (Path): path to the .sto file
+
+    Returns:
+        tuple[dict, list, np.ndarray]: header metadata (key=value lines), column names, data (n_rows, n_columns)
+    """
+    metadata = {}
+
+    with open(file_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line == "endheader":
+                break
+            if "=" in line:
+                key, value = line.split("=", 1)
+                metadata[key] = value
+
+        columns = f.readline().rstrip("\n").split("\t")
+        data = np.loadtxt(f, delimiter="\t", ndmin=2)
+
+    return metadata, columns, data
+
+
+class MocoResult:
+    """ Moco solution loaded into a single array, with the column groups indexed once
+
+    Column groups follow the MocoTrajectory naming:
+        activations: /forceset/<muscle>/activation
+        excitations: /forceset/<muscle> (muscle controls)
+        reserves: /forceset/reserve_* controls
+        assistive_forces: /forceset/assistive_force_* controls
+        values, speeds: /jointset/<joint>/<coordinate>/value|speed
+    """
+
+    def __init__(self, time: np.ndarray, data: np.ndarray, columns: list, metadata: dict = None, name: str = None) -> None:
+        """
+        Args:
+            time (np.ndarray): time (n_samples,)
+            data (np.ndarray): every column but time (n_samples, n_columns)
+            columns (list): column names
+            metadata (dict, optional): .sto header entries. Defaults to None.
+            name (str, optional): solution name. Defaults to None.
+        """
+        self.time = np.asarray(time, dtype=float)
+        self.data = np.asarray(data, dtype=float)
+        self.columns = list(columns)
+        self.metadata = metadata or {}
+        self.name = name
+
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+        self.indexes = self._build_indexes()
+
+    def _build_indexes(self) -> dict:
+        """ Column indexes of every group """
+        groups = {group: [] for group in ["activations", "excitations", "reserves", "assistive_forces", "values", "speeds"]}
+
+        for i, column in enumerate(self.columns):
+            parts = column.strip("/").split("/")
+
+            if parts[0] == "forceset":
+                actuator = parts[1]
+                if len(parts) == 3 and parts[2] == "activation":
+                    groups["activations"].append(i)
+                elif len(parts) == 2 and actuator.startswith("reserve"):
+                    groups["reserves"].append(i)
+                elif len(parts) == 2 and actuator.startswith("assistive_force"):
+                    groups["assistive_forces"].append(i)
+                elif len(parts) == 2 and f"{column}/activation" in self._column_index:
+                    groups["excitations"].append(i)
+            elif parts[0] == "jointset" and parts[-1] in ["value", "speed"]:
+                groups[f"{parts[-1]}s"].append(i)
+
+        return {group: np.array(index, dtype=int) for group, index in groups.items()}
+
+    @staticmethod
+    def get_label(column: str) -> str:
+        """ Short name of a column: muscle, actuator or coordinate name
+
+        Args:
+            column (str): full column name
+
+        Returns:
+            str: label
+        """
+        parts = column.strip("/").split("/")
+        if parts[0] == "jointset":
+            return parts[2]
+        return parts[1]
+
+    @property
+    def success(self) -> bool:
+        return self.metadata.get("success", "").lower() == "true"
+
+    @property
+    def objective(self) -> float:
+        return float(self.metadata.get("objective", np.nan))
+
+    @property
+    def duration(self) -> float:
+        return self.time[-1] - self.time[0]
+
+    def labels(self, group: str) -> list:
+        """ Short names of the columns of a group
+
+        Args:
+            group (str): group name (see indexes)
+
+        Returns:
+            list: labels
+        """
+        return [self.get_label(self.columns[i]) for i in self.indexes[group]]
+
+    def get(self, group: str) -> np.ndarray:
+        """ Data of a column group
+
+        Args:
+            group (str): group name (see indexes)
+
+        Returns:
+            np.ndarray: data (n_samples, n_group_columns)
+        """
+        return self.data[:, self.indexes[group]]
+
+    def column(self, name: str) -> np.ndarray:
+        """ Data of a single column
+
+        Args:
+            name (str): full column name
+
+        Returns:
+            np.ndarray: data (n_samples,)
+        """
+        return self.data[:, self._column_index[name]]
+
+    def to_dataframe(self, group: str = None) -> pd.DataFrame:
+        """ DataFrame indexed by time, with the group's labels as columns
+
+        Args:
+            group (str, optional): group name, None for every column with full names. Defaults to None.
+
+        Returns:
+            pd.DataFrame: data
+        """
+        if group is None:
+            return pd.DataFrame(self.data, index=pd.Index(self.time, name="time"), columns=self.columns)
+
+        return pd.DataFrame(self.get(group), index=pd.Index(self.time, name="time"), columns=self.labels(group))
+
+    def save(self, cache_path: Path) -> None:
+        """ Store the result as a binary .npz cache
+
+        Args:
+            cache_path (Path): cache file
+        """
+        np.savez(
+            cache_path,
+            time=self.time,
+            data=self.data,
+            columns=np.array(self.columns),
+            header=json.dumps({"version": RESULTS_CACHE_VERSION, "name": self.name, "metadata": self.metadata}),
+        )
+
+    @classmethod
+    def from_sto(cls, file_path: Path) -> "MocoResult":
+        """ Parse a .sto solution
+
+        Args:
+            file_path (Path): path to the .sto file
+
+        Returns:
+            MocoResult: result
+        """
+        metadata, columns, data = read_sto(file_path)
+        time_index = columns.index("time")
+
+        return cls(
+            time=data[:, time_index],
+            data=np.delete(data, time_index, axis=1),
+            columns=columns[:time_index] + columns[time_index + 1:],
+            metadata=metadata,
+            name=Path(file_path).stem,
+        )
+
+    @classmethod
+    def from_cache(cls, cache_path: Path) -> "MocoResult":
+        """ Load a result stored with save
+
+        Args:
+            cache_path (Path): cache file
+
+        Returns:
+            MocoResult: result
+        """
+        with np.load(cache_path) as cache:
+            header = json.loads(str(cache["header"]))
+            if header["version"] != RESULTS_CACHE_VERSION:
+                raise ValueError(f"{cache_path} has cache version {header['version']}, expected {RESULTS_CACHE_VERSION}")
+
+            return cls(
+                time=cache["time"],
+                data=cache["data"],
+                columns=cache["columns"].tolist(),
+                metadata=header["metadata"],
+                name=header["name"],
+            )
+
+
+def load_moco_result(file_path: Path, use_cache: bool = True) -> MocoResult:
+    """ Load a Moco solution, from its binary cache (<solution>.npz) when it is up to date
+
+    Args:
+        file_path (Path): path to the .sto solution
+        use_cache (bool, optional): read and write the cache next to the solution. Defaults to True.
+
+    Returns:
+        MocoResult: result
+    """
+    file_path = Path(file_path)
+    cache_path = file_path.with_suffix(".npz")
+
+    if use_cache and cache_path.exists() and cache_path.stat().st_mtime >= file_path.stat().st_mtime:
+        try:
+            return MocoResult.from_cache(cache_path)
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Ignoring cache {cache_path}: {e}")
+
+    result = MocoResult.from_sto(file_path)
+
+    if use_cache:
+        result.save(cache_path)
+
+    return result
+
+
+def summed_activation(result: MocoResult) -> np.ndarray:
+    """ Time integral of every muscle activation
+
+    Args:
+        result (MocoResult): result
+
+    Returns:
+        np.ndarray: integrated activation per muscle (n_muscles,)
+    """
+    return trapezoid(result.get("activations"), result.time, axis=0)
+
+
+def metabolic_proxy(result: MocoResult, exponent: float = 2, weights: np.ndarray = None) -> float:
+    """ Effort based metabolic proxy: time-averaged sum of activation ** exponent
+
+    Args:
+        result (MocoResult): result
+        exponent (float, optional): activation exponent. Defaults to 2.
+        weights (np.ndarray, optional): per-muscle weights, e.g. muscle volumes. Defaults to None.
+
+    Returns:
+        float: proxy value
+    """
+    effort = np.abs(result.get("activations")) ** exponent
+    if weights is not None:
+        effort = effort * np.asarray(weights, dtype=float)
+
+    return trapezoid(effort.sum(axis=1), result.time) / result.duration
+
+
+def reserve_rms(result: MocoResult, actuator_magnitude: float = 1) -> np.ndarray:
+    """ RMS of every reserve actuator
+
+    Args:
+        result (MocoResult): result
+        actuator_magnitude (float, optional): optimal force of the reserves, to get N or Nm. Defaults to 1.
+
+    Returns:
+        np.ndarray: RMS per reserve (n_reserves,)
+    """
+    return np.sqrt(np.mean(result.get("reserves") ** 2, axis=0)) * actuator_magnitude
+
+
+def summarize_results(
+    results: List[MocoResult],
+    actuator_magnitude: float = 1,
+    exponent: float = 2,
+    assistive_force: float = 1,
+) -> pd.DataFrame:
+    """ Scalar metrics of several solutions, one row per solution
+
+    Args:
+        results (List[MocoResult]): results
+        actuator_magnitude (float, optional): optimal force of the reserves. Defaults to 1.
+        exponent (float, optional): activation exponent of the metabolic proxy. Defaults to 2.
+        assistive_force (float, optional): optimal force of the assistive actuators (config["assistive_force"]). Defaults to 1.
+
+    Returns:
+        pd.DataFrame: success, objective, summed activation, metabolic proxy, peak reserve RMS and
+            peak assistive force of each solution, indexed by name
+    """
+    rows = []
+    for result in results:
+        assistance = result.get("assistive_forces")
+        rows.append({
+            "name": result.name,
+            "success": result.success,
+            "objective": result.objective,
+            "summed_activation": summed_activation(result).sum(),
+            "metabolic_proxy": metabolic_proxy(result, exponent=exponent),
+            "max_reserve_rms": reserve_rms(result, actuator_magnitude).max(initial=0),
+            "peak_assistance": np.abs(assistance).max(initial=0) * assistive_force,
+        })
+
+    return pd.DataFrame(rows).set_index("name")
@@ -1,5 +1,27 @@
 import numpy as np
 import pandas as pd
+import yaml
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+
+SweepResult = namedtuple(
+    "SweepResult",
+    ["l1", "l2", "theta_1", "theta_2", "jacobians", "torques", "reachable", "feasible"],
+)
+
+CandidateSummary = namedtuple(
+    "CandidateSummary",
+    [
+        "feasible",
+        "within_limits",
+        "min_singularity_distance",
+        "peak_torque",
+        "rms_torque",
+        "motor_capable",
+    ],
+)
 
 
 def get_rotation_matrix(degrees: float) -> np.array:
@@ -19,7 +41,7 @@ def get_rotation_matrix(degrees: float) -> np.array:
         ]
     )
 
-def check_theta(series: pd.Series, theta_lims: np.array) -> pd.Series:
+def check_theta(series: pd.Series, theta_lims: np.array) -> bool:
     """ Check if angles are within allowed limits
 
     Args:
@@ -27,9 +49,136 @@ def check_theta(series: pd.Series, theta_lims: np.array) -> pd.Series:
         theta_lims (np.array): angle range
 
     Returns:
-        pd.Series: filtered series
+        bool: True if every angle is within the limits
+    """
+    return bool(theta_limit_mask(series, theta_lims).all())
+
+
+def theta_limit_mask(theta: np.ndarray, theta_lims: np.array) -> np.ndarray:
+    """ Element-wise check of joint limits
+
+    Args:
+        theta (np.ndarray): joint angles of any shape
+        theta_lims (np.array): angle range [min, max]
+
+    Returns:
+        np.ndarray: True where the angle is within the limits (NaN counts as outside)
+    """
+    theta = np.asarray(theta, dtype=float)
+    return (theta >= theta_lims[0]) & (theta <= theta_lims[1])
+
+
+def singularity_distance(l1: float, l2: float, theta_2: np.ndarray) -> np.ndarray:
+    """ Manipulability of the arm (|det J|), 0 at the stretched/folded singularities
+
+    Args:
+        l1 (float): link 1, scalar or broadcastable against theta_2
+        l2 (float): link 2, scalar or broadcastable against theta_2
+        theta_2 (np.ndarray): elbow angles
+
+    Returns:
+        np.ndarray: l1 * l2 * |sin(theta_2)|
+    """
+    return l1 * l2 * np.abs(np.sin(theta_2))
+
+
+def summarize_torques(torques: np.ndarray) -> tuple:
+    """ Peak and RMS torque of each joint over time
+
+    Args:
+        torques (np.ndarray): (..., N, 2) torques over time
+
+    Returns:
+        tuple: peak |tau| (..., 2), RMS tau (..., 2). NaN samples are ignored.
+    """
+    torques = np.asarray(torques, dtype=float)
+    peak = np.nanmax(np.abs(torques), axis=-2)
+    rms = np.sqrt(np.nanmean(torques**2, axis=-2))
+
+    return peak, rms
+
+
+def load_motor_torque_limits(config_path: str = "./motor_config.yaml", motors: tuple = ("AK70-10", "AK60-6")) -> np.ndarray:
+    """ Read the maximum torque of each joint motor
+
+    Args:
+        config_path (str, optional): motor configuration file. Defaults to "./motor_config.yaml".
+        motors (tuple, optional): motor type of each joint. Defaults to ("AK70-10", "AK60-6").
+
+    Returns:
+        np.ndarray: T_max of each joint (Nm)
+    """
+    with open(config_path, "r") as f:
+        motor_config = yaml.load(f, Loader=yaml.FullLoader)
+
+    return np.array([motor_config[motor]["T_max"] for motor in motors], dtype=float)
+
+
+def check_motor_capability(peak_torque: np.ndarray, torque_limits: np.ndarray) -> np.ndarray:
+    """ Check if the motors can deliver the peak torques
+
+    Args:
+        peak_torque (np.ndarray): (..., 2) peak torque of each joint
+        torque_limits (np.ndarray): (2,) maximum torque of each joint
+
+    Returns:
+        np.ndarray: (...,) True where both joints are within their motor limits
+    """
+    return np.all(np.asarray(peak_torque) <= torque_limits, axis=-1)
+
+
+def evaluate_candidates(
+    l1: np.ndarray,
+    l2: np.ndarray,
+    theta_1: np.ndarray,
+    theta_2: np.ndarray,
+    torques: np.ndarray,
+    theta_1_lims: np.array,
+    theta_2_lims: np.array,
+    torque_limits: np.ndarray,
+) -> CandidateSummary:
+    """ Feasibility, limit and torque summary for one or many link length candidates
+
+    Args:
+        l1 (np.ndarray): link 1, scalar or (n_l1,)
+        l2 (np.ndarray): link 2, scalar or (n_l2,)
+        theta_1 (np.ndarray): (N,) or (n_l1, n_l2, N) joint angles
+        theta_2 (np.ndarray): (N,) or (n_l1, n_l2, N) joint angles
+        torques (np.ndarray): (N, 2) or (n_l1, n_l2, N, 2) torques
+        theta_1_lims (np.array): joint 1 range [min, max]
+        theta_2_lims (np.array): joint 2 range [min, max]
+        torque_limits (np.ndarray): (2,) maximum torque of each joint, see load_motor_torque_limits
+
+    Returns:
+        CandidateSummary: one value per candidate, peak_torque and rms_torque have a trailing joint axis
     """
-    return series.apply(lambda x: theta_lims[0] <= x <= theta_lims[1]).all()
+    theta_2 = np.asarray(theta_2, dtype=float)
+
+    if theta_2.ndim == 3:
+        l1 = np.asarray(l1, dtype=float)[:, np.newaxis, np.newaxis]
+        l2 = np.asarray(l2, dtype=float)[np.newaxis, :, np.newaxis]
+
+    feasible = ~np.isnan(theta_2).any(axis=-1)
+    within_limits = (
+        theta_limit_mask(theta_1, theta_1_lims).all(axis=-1)
+        & theta_limit_mask(theta_2, theta_2_lims).all(axis=-1)
+    )
+    # Unreachable samples only occur in infeasible candidates, whose summaries are NaN
+    peak_torque, rms_torque = summarize_torques(np.nan_to_num(torques))
+    peak_torque = np.where(feasible[..., np.newaxis], peak_torque, np.nan)
+    rms_torque = np.where(feasible[..., np.newaxis], rms_torque, np.nan)
+
+    min_singularity_distance = singularity_distance(l1, l2, np.nan_to_num(theta_2)).min(axis=-1)
+    min_singularity_distance = np.where(feasible, min_singularity_distance, np.nan)
+
+    return CandidateSummary(
+        feasible=feasible,
+        within_limits=within_limits,
+        min_singularity_distance=min_singularity_distance,
+        peak_torque=peak_torque,
+        rms_torque=rms_torque,
+        motor_capable=check_motor_capability(peak_torque, torque_limits) & feasible,
+    )
 
 def get_jacobian(l1: float, l2: float, theta_1: pd.Series, theta_2: pd.Series) -> np.array:
     """ Get jacobian matrix
@@ -74,40 +223,150 @@ def compute_torque_profiles(
         pd.DataFrame: joint angles over time
         np.array: jacobian over time (not transposed)
     """
-    N = position.shape[0]
+    pos_rot, F_rot = rotate_to_robot_frame(F, position)
+    X, Y = pos_rot.T
 
-    # Get rotation matrices
-    rotate_ee = get_rotation_matrix(-90) # Rotate EE position to robot frame
-    rotate_forces = get_rotation_matrix(90) # Rotate forces to robot frame by 90 degrees
-
-    pos_rot = (rotate_ee @ position.T).T  # Get correct shape
-    pos_rot.columns = ["X", "Y", "Z"]
-
-    arccos_argument = (pos_rot.X**2 + pos_rot.Y**2 - l1**2 - l2**2) / (
-        2 * l1 * l2
-    )
+    arccos_argument = (X**2 + Y**2 - l1**2 - l2**2) / (2 * l1 * l2)
     if np.any(arccos_argument > 1) or np.any(arccos_argument < -1):
         return np.nan, np.nan, np.nan
 
     theta_2 = np.arccos(arccos_argument)  # *(1 if elbow_up else -1)
-    theta_1 = np.arctan2(pos_rot.Y, pos_rot.X) - np.arctan2(
+    theta_1 = np.arctan2(Y, X) - np.arctan2(
         l2 * np.sin(theta_2), l1 + l2 * np.cos(theta_2)
     )
 
-    thetas = pd.concat([theta_1, theta_2], axis=1, keys=["theta_1", "theta_2"])
+    thetas = pd.DataFrame({"theta_1": theta_1, "theta_2": theta_2}, index=position.index)
 
     jacobian = get_jacobian(l1, l2, theta_1, theta_2)
-    
-    # Rotate force vector to robot frame
-    F_rot = -(F @ rotate_forces).drop(2, axis=1)
-    F_rot = F_rot.to_numpy().reshape(N, 2, 1)
 
-    torques = (jacobian.T @ F_rot).squeeze()
+    # tau = J^T F for every sample
+    torques = np.einsum("jin,nj->ni", jacobian, F_rot)
     torques = pd.DataFrame(torques, columns=["tau_1", "tau_2"])
 
     return torques, thetas, jacobian
 
 
+def rotate_to_robot_frame(F: pd.DataFrame, position: pd.DataFrame) -> tuple:
+    """ Rotate end effector positions and forces to the robot frame
+
+    Args:
+        F (pd.DataFrame): (N, 3) force applied at the end effector
+        position (pd.DataFrame): (N, 3) position of the end effector
+
+    Returns:
+        tuple: positions (N, 2) [X, Y], forces (N, 2) in robot frame
+    """
+    rotate_ee = get_rotation_matrix(-90) # Rotate EE position to robot frame
+    rotate_forces = get_rotation_matrix(90) # Rotate forces to robot frame by 90 degrees
+
+    pos_rot = np.asarray(position, dtype=float) @ rotate_ee.T
+    F_rot = -(np.asarray(F, dtype=float) @ rotate_forces)
+
+    return pos_rot[:, :2], F_rot[:, :2]
+
+
+def _sweep_chunk(l1: np.ndarray, l2: np.ndarray, pos_rot: np.ndarray, F_rot: np.ndarray, keep_jacobians: bool) -> tuple:
+    """ Evaluate every (l1, l2) pair of a chunk against the whole trajectory
+
+    Args:
+        l1 (np.ndarray): (n_l1,) first link lengths
+        l2 (np.ndarray): (n_l2,) second link lengths
+        pos_rot (np.ndarray): (N, 2) end effector positions in robot frame
+        F_rot (np.ndarray): (N, 2) forces in robot frame
+        keep_jacobians (bool): whether to return the jacobians
+
+    Returns:
+        tuple: theta_1, theta_2, jacobians, torques, reachable (see sweep_link_lengths)
+    """
+    l1 = l1[:, np.newaxis, np.newaxis]
+    l2 = l2[np.newaxis, :, np.newaxis]
+    x = pos_rot[np.newaxis, np.newaxis, :, 0]
+    y = pos_rot[np.newaxis, np.newaxis, :, 1]
+
+    arccos_argument = (x**2 + y**2 - l1**2 - l2**2) / (2 * l1 * l2)
+    reachable = np.abs(arccos_argument) <= 1
+
+    with np.errstate(invalid="ignore"):
+        theta_2 = np.where(reachable, np.arccos(arccos_argument), np.nan)
+    theta_1 = np.arctan2(y, x) - np.arctan2(l2 * np.sin(theta_2), l1 + l2 * np.cos(theta_2))
+
+    # (n_l1, n_l2, N, 2, 2), same layout as get_jacobian but with the time axis first
+    jacobians = np.moveaxis(get_jacobian(l1, l2, theta_1, theta_2), (0, 1), (-2, -1))
+
+    # tau = J^T F for every sample
+    torques = np.einsum("...ji,...j->...i", jacobians, F_rot)
+
+    return theta_1, theta_2, jacobians if keep_jacobians else None, torques, reachable
+
+
+def sweep_link_lengths(
+    l1_values: np.ndarray,
+    l2_values: np.ndarray,
+    F: pd.DataFrame,
+    position: pd.DataFrame,
+    n_workers: int = None,
+    chunk_size: int = None,
+    keep_jacobians: bool = True,
+) -> SweepResult:
+    """ Compute joint angles, jacobians and torques for every (l1, l2) candidate at once.
+    Same conventions as compute_torque_profiles, broadcast over the whole grid.
+
+    Args:
+        l1_values (np.ndarray): (n_l1,) first link lengths
+        l2_values (np.ndarray): (n_l2,) second link lengths
+        F (pd.DataFrame): (N, 3) force applied at the end effector
+        position (pd.DataFrame): (N, 3) position of the end effector
+        n_workers (int, optional): processes used to evaluate the grid. Defaults to None (in-process).
+        chunk_size (int, optional): l1 values per chunk sent to a worker. Defaults to None (split evenly).
+        keep_jacobians (bool, optional): return the (n_l1, n_l2, N, 2, 2) jacobians, which dominate
+            memory on fine grids. Defaults to True.
+
+    Returns:
+        SweepResult: l1, l2, theta_1 and theta_2 (n_l1, n_l2, N), jacobians (n_l1, n_l2, N, 2, 2),
+        torques (n_l1, n_l2, N, 2), reachable samples (n_l1, n_l2, N) and feasible cells (n_l1, n_l2).
+        Unreachable samples are NaN.
+    """
+    l1_values = np.atleast_1d(np.asarray(l1_values, dtype=float))
+    l2_values = np.atleast_1d(np.asarray(l2_values, dtype=float))
+    pos_rot, F_rot = rotate_to_robot_frame(F, position)
+
+    if not n_workers or n_workers == 1:
+        chunks = [_sweep_chunk(l1_values, l2_values, pos_rot, F_rot, keep_jacobians)]
+    else:
+        if chunk_size is None:
+            chunk_size = max(1, int(np.ceil(len(l1_values) / n_workers)))
+        l1_chunks = [l1_values[i:i + chunk_size] for i in range(0, len(l1_values), chunk_size)]
+        n_chunks = len(l1_chunks)
+
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            chunks = list(
+                executor.map(
+                    _sweep_chunk,
+                    l1_chunks,
+                    [l2_values] * n_chunks,
+                    [pos_rot] * n_chunks,
+                    [F_rot] * n_chunks,
+                    [keep_jacobians] * n_chunks,
+                )
+            )
+
+    theta_1, theta_2, jacobians, torques, reachable = (
+        np.concatenate(arrays, axis=0) if arrays[0] is not None else None
+        for arrays in zip(*chunks)
+    )
+
+    return SweepResult(
+        l1=l1_values,
+        l2=l2_values,
+        theta_1=theta_1,
+        theta_2=theta_2,
+        jacobians=jacobians,
+        torques=torques,
+        reachable=reachable,
+        feasible=reachable.all(axis=-1),
+    )
+
+
 def interpolate_dataframe(df: pd.DataFrame, desired_frequency: int=200) -> pd.DataFrame:
     """ Interpolate dataframe to target frequency
 
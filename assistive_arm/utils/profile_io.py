@@ -0,0 +1,267 @@
+import json
+import re
+import struct
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+
+# File layout:
+#   magic (8 bytes) | version (uint32) | header length (uint32) | JSON header | padding | column blocks
+# Each column is a contiguous little-endian block of n_rows values, aligned to 8 bytes, at the
+# offset given in the header relative to the start of the data.
+PROFILE_MAGIC = b"AAPROF\x00\x00"
+PROFILE_VERSION = 1
+PROFILE_SUFFIX = ".prof"
+
+REQUIRED_COLUMNS = ["theta_1", "theta_2", "force_X", "force_Y"]
+
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGNMENT = 8
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _get_data_start(header_length: int) -> int:
+    return _align(_PREAMBLE.size + header_length)
+
+
+def get_profile_details(profile_path: Path) -> dict:
+    """ Peak time and force encoded in a spline profile name (peak_time_<t>_peak_force_<f>)
+
+    Args:
+        profile_path (Path): profile path
+
+    Returns:
+        dict: {"peak_time": int, "peak_force": int}, empty if the name has no details
+    """
+    match = re.match(r"peak_time_(\d+)_peak_force_(\d+)", Path(profile_path).stem)
+    if not match:
+        return {}
+
+    return {"peak_time": int(match.group(1)), "peak_force": int(match.group(2))}
+
+
+def write_profile(profile_path: Path, profile: pd.DataFrame, metadata: dict = None, dtype: str = "float64") -> None:
+    """ Write a profile to the binary container
+
+    Args:
+        profile_path (Path): output file
+        profile (pd.DataFrame): profile indexed by percentage
+        metadata (dict, optional): JSON serialisable details (peak time/force, calibration, source). Defaults to None.
+        dtype (str, optional): "float64" or "float32" column blocks. Defaults to "float64".
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    index_name = profile.index.name or "Percentage"
+    arrays = {index_name: profile.index.to_numpy(dtype=dtype)}
+    arrays.update({column: profile[column].to_numpy(dtype=dtype) for column in profile.columns})
+
+    n_rows = len(profile)
+    columns = []
+    header = {
+        "version": PROFILE_VERSION,
+        "n_rows": n_rows,
+        "index": index_name,
+        "columns": columns,
+        "metadata": metadata or {},
+    }
+
+    # Column offsets are relative to the start of the data, which follows the aligned header
+    offset = 0
+    for name, values in arrays.items():
+        columns.append({"name": name, "dtype": dtype.str, "offset": offset})
+        offset = _align(offset + values.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    data_start = _get_data_start(len(header_bytes))
+
+    with open(profile_path, "wb") as f:
+        f.write(_PREAMBLE.pack(PROFILE_MAGIC, PROFILE_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for column, values in zip(columns, arrays.values()):
+            f.write(b"\x00" * (data_start + column["offset"] - f.tell()))
+            f.write(values.tobytes())
+
+
+def read_profile_header(profile_path: Path) -> dict:
+    """ Read and check the header of a binary profile
+
+    Args:
+        profile_path (Path): binary profile
+
+    Returns:
+        dict: header (version, n_rows, index, columns, metadata) and data_start
+    """
+    with open(profile_path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{profile_path} is too short to be a profile")
+
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != PROFILE_MAGIC:
+            raise ValueError(f"{profile_path} is not a binary profile")
+        if version != PROFILE_VERSION:
+            raise ValueError(f"{profile_path} has format version {version}, expected {PROFILE_VERSION}")
+
+        header = json.loads(f.read(header_length))
+        header["data_start"] = _get_data_start(header_length)
+
+    return header
+
+
+def load_profile_arrays(profile_path: Path) -> tuple[dict, dict]:
+    """ Memory-map every column of a binary profile without copying
+
+    Args:
+        profile_path (Path): binary profile
+
+    Returns:
+        tuple[dict, dict]: {column: read-only array} including the index, header
+    """
+    header = read_profile_header(profile_path)
+
+    arrays = {
+        column["name"]: np.memmap(
+            profile_path,
+            dtype=np.dtype(column["dtype"]),
+            mode="r",
+            offset=header["data_start"] + column["offset"],
+            shape=(header["n_rows"],),
+        )
+        for column in header["columns"]
+    }
+
+    return arrays, header
+
+
+def read_binary_profile(profile_path: Path) -> pd.DataFrame:
+    """ Load a binary profile as a DataFrame indexed by its index column
+
+    Args:
+        profile_path (Path): binary profile
+
+    Returns:
+        pd.DataFrame: profile, with the header metadata in profile.attrs
+    """
+    arrays, header = load_profile_arrays(profile_path)
+    index = pd.Index(np.asarray(arrays.pop(header["index"]), dtype=float), name=header["index"])
+
+    profile = pd.DataFrame({name: np.asarray(values, dtype=float) for name, values in arrays.items()}, index=index)
+    profile.attrs.update(header["metadata"])
+
+    return profile
+
+
+def load_profile(profile_path: Path) -> pd.DataFrame:
+    """ Load a profile, preferring its binary version over the CSV when it is up to date
+
+    Args:
+        profile_path (Path): profile, .csv or .prof
+
+    Returns:
+        pd.DataFrame: profile indexed by percentage
+    """
+    profile_path = Path(profile_path)
+    binary_path = profile_path.with_suffix(PROFILE_SUFFIX)
+
+    if profile_path.suffix == PROFILE_SUFFIX:
+        return read_binary_profile(profile_path)
+
+    if binary_path.exists() and binary_path.stat().st_mtime >= profile_path.stat().st_mtime:
+        return read_binary_profile(binary_path)
+
+    return pd.read_csv(profile_path, index_col="Percentage")
+
+
+def save_profile(profile_path: Path, profile: pd.DataFrame, metadata: dict = None) -> None:
+    """ Save a profile as CSV together with its binary version
+
+    Args:
+        profile_path (Path): CSV path, the binary profile is written next to it
+        profile (pd.DataFrame): profile indexed by percentage
+        metadata (dict, optional): details stored in the binary header. Defaults to None.
+    """
+    profile_path = Path(profile_path)
+    profile.to_csv(profile_path)
+    write_profile(
+        profile_path.with_suffix(PROFILE_SUFFIX),
+        profile,
+        metadata={**get_profile_details(profile_path), "source": profile_path.name, **(metadata or {})},
+    )
+
+
+def convert_csv_profile(csv_path: Path, output_path: Path = None, dtype: str = "float64", metadata: dict = None) -> Path:
+    """ Convert a CSV profile to the binary container
+
+    Args:
+        csv_path (Path): CSV profile
+        output_path (Path, optional): binary profile. Defaults to the CSV path with the .prof suffix.
+        dtype (str, optional): "float64" or "float32" column blocks. Defaults to "float64".
+        metadata (dict, optional): extra details stored in the header. Defaults to None.
+
+    Returns:
+        Path: binary profile path
+    """
+    csv_path = Path(csv_path)
+    output_path = Path(output_path) if output_path else csv_path.with_suffix(PROFILE_SUFFIX)
+
+    profile = pd.read_csv(csv_path, index_col="Percentage")
+    write_profile(
+        output_path,
+        profile,
+        metadata={**get_profile_details(csv_path), "source": csv_path.name, **(metadata or {})},
+        dtype=dtype,
+    )
+
+    return output_path
+
+
+def validate_profile(profile_path: Path, csv_path: Path = None) -> list:
+    """ Check a binary profile, and that it matches its CSV when given
+
+    Args:
+        profile_path (Path): binary profile
+        csv_path (Path, optional): CSV it was converted from. Defaults to None.
+
+    Returns:
+        list: problems found, empty if the profile is valid
+    """
+    try:
+        header = read_profile_header(profile_path)
+        arrays, _ = load_profile_arrays(profile_path)
+    except (ValueError, OSError, KeyError) as e:
+        return [str(e)]
+
+    problems = []
+    columns = set(arrays.keys())
+
+    missing = [column for column in REQUIRED_COLUMNS + [header["index"]] if column not in columns]
+    if missing:
+        problems.append(f"missing columns {missing}")
+
+    for name, values in arrays.items():
+        if not np.isfinite(values).all():
+            problems.append(f"{name} has non-finite values")
+
+    if header["index"] in arrays and np.any(np.diff(arrays[header["index"]]) <= 0):
+        problems.append(f"{header['index']} is not strictly increasing")
+
+    if csv_path is not None:
+        reference = pd.read_csv(csv_path, index_col="Percentage")
+        reference = reference.reset_index()
+
+        if len(reference) != header["n_rows"]:
+            problems.append(f"{header['n_rows']} rows, CSV has {len(reference)}")
+        else:
+            for column in reference.columns:
+                if column not in arrays:
+                    problems.append(f"{column} missing from binary profile")
+                    continue
+                tolerance = np.finfo(arrays[column].dtype).eps * 4
+                if not np.allclose(arrays[column], reference[column], rtol=tolerance, atol=tolerance):
+                    problems.append(f"{column} differs from CSV")
+
+    return problems
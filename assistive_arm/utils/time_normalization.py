@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from typing import List, Tuple
+
+
+def _get_reference(df: pd.DataFrame, reference_column: str = None) -> np.ndarray:
+    """ Get the values used as time reference of a trial
+
+    Args:
+        df (pd.DataFrame): trial
+        reference_column (str, optional): column to use as reference. Defaults to None (index).
+
+    Returns:
+        np.ndarray: reference values
+    """
+    if reference_column is not None:
+        return df[reference_column].to_numpy(dtype=float)
+    return df.index.to_numpy(dtype=float)
+
+
+def normalize_trials(
+    trials: List[pd.DataFrame], target_length: int, reference_column: str = None
+) -> Tuple[np.ndarray, list]:
+    """ Linearly resample every trial to target_length samples spanning its own time range.
+    All trials are interpolated in a single vectorised pass.
+
+    Args:
+        trials (List[pd.DataFrame]): trials sharing the same columns
+        target_length (int): number of samples per trial after normalization
+        reference_column (str, optional): column used as time reference. Defaults to None (index).
+
+    Returns:
+        Tuple[np.ndarray, list]: normalized data (n_trials, target_length, n_channels), channel names.
+        Empty trials are filled with NaN.
+    """
+    columns = next((list(trial.columns) for trial in trials if not trial.empty), list(trials[0].columns) if trials else [])
+    channels = [column for column in columns if column != reference_column]
+
+    normalized = np.full((len(trials), target_length, len(channels)), np.nan)
+
+    offsets, values, starts, ends, trial_ids = [], [], [], [], []
+    n_samples = 0
+
+    for i, trial in enumerate(trials):
+        if trial.empty:
+            continue
+
+        x = _get_reference(trial, reference_column)
+        order = np.argsort(x, kind="stable")
+        x = x[order]
+
+        x_range = x[-1] - x[0]
+        # Place each trial on its own [2i, 2i + 1] interval so one sorted search covers all of them
+        offsets.append((x - x[0]) / (x_range if x_range > 0 else 1) + 2 * i)
+        values.append(trial[channels].to_numpy(dtype=float)[order])
+
+        starts.append(n_samples)
+        n_samples += len(x)
+        ends.append(n_samples - 1)
+        trial_ids.append(i)
+
+    if not trial_ids:
+        return normalized, channels
+
+    offsets = np.concatenate(offsets)
+    values = np.concatenate(values)
+    trial_ids = np.array(trial_ids)
+
+    grid = np.linspace(0, 1, target_length)
+    targets = (grid[np.newaxis, :] + 2 * trial_ids[:, np.newaxis]).ravel()
+
+    starts = np.repeat(starts, target_length)
+    ends = np.repeat(ends, target_length)
+
+    left = np.clip(np.searchsorted(offsets, targets, side="right") - 1, starts, np.maximum(ends - 1, starts))
+    right = np.minimum(left + 1, ends)
+
+    span = offsets[right] - offsets[left]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(span > 0, (targets - offsets[left]) / span, 0)
+
+    weights = weights[:, np.newaxis]
+    interpolated = values[left] * (1 - weights) + values[right] * weights
+
+    normalized[trial_ids] = interpolated.reshape(len(trial_ids), target_length, len(channels))
+
+    return normalized, channels
+
+
+def get_trials_mean_std(
+    trials: List[pd.DataFrame], target_length: int, reference_column: str = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """ Normalize trials to the same length and compute their ensemble mean and standard deviation
+
+    Args:
+        trials (List[pd.DataFrame]): trials sharing the same columns
+        target_length (int): number of samples per trial after normalization
+        reference_column (str, optional): column used as time reference. Defaults to None (index).
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: mean, std indexed by percentage of the movement
+    """
+    normalized, channels = normalize_trials(trials, target_length, reference_column=reference_column)
+    percentage = pd.Index(np.linspace(0, 100, target_length), name="Percentage")
+
+    mean = pd.DataFrame(np.nanmean(normalized, axis=0), index=percentage, columns=channels)
+    std = pd.DataFrame(np.nanstd(normalized, axis=0), index=percentage, columns=channels)
+
+    return mean, std
@@ -1,131 +1,78 @@
-import csv
-import numpy as np
-import os
-import time
-import sys
+from contextlib import ExitStack
 
-from pathlib import Path
+import numpy as np
 
-from NeuroLocoMiddleware.SoftRealtimeLoop import SoftRealtimeLoop
+from assistive_arm.calibration import (
+    MOTOR_CALIBRATION_PATH,
+    JointCalibrator,
+    calibrate_joints,
+    clear_calibration,
+    load_calibration,
+    save_calibration,
+)
 from assistive_arm.motor_control import CubemarsMotor
-import os
 
 # CHANGE THESE TO MATCH YOUR DEVICE!
-dt = 0.005
-print_every = 0.05  # seconds
-
-
-def set_dh_origin(motor: CubemarsMotor, origin: float):
-    loop_3 = SoftRealtimeLoop(dt=dt, report=True, fade=0)
-
-    print("Setting new origin...")
-    start_time = 0
+freq = 200
+speed = 3  # rad/s
 
-    for t in loop_3:
-        # Print angle every print_every seconds
-        if t < 2:
-            motor.send_velocity(desired_vel=-1)
-        else:
-            motor.send_velocity(desired_vel=-0.5)
-
-        target_diff = abs(motor.position - origin)
-
-        if t - start_time >= print_every:
-            sys.stdout.write("\x1b[1A\x1b[2K")
-            print(
-                f"Diff: {np.rad2deg(target_diff): .3f} Angle: {np.rad2deg(motor.position): .3f} Velocity: {motor.velocity: .3f} Torque: {motor.torque: .3f}"
-            )
-            start_time = t
-
-        if target_diff < 0.005:
-            motor.send_zero_position()
-            print("Origin reached! Setting zero position...")
-            print(f"Target offset: {np.rad2deg(target_diff): .3f}º")
-            break
+# Where each joint's zero goes: AK70-10 at its right limit, AK60-6 halfway between its limits
+ZERO = {"AK70-10": "right", "AK60-6": "midpoint"}
 
-    del loop_3
 
+def calibrate(motor_types: list) -> None:
+    with ExitStack() as stack:
+        motors = [stack.enter_context(CubemarsMotor(motor_type=motor_type, frequency=freq)) for motor_type in motor_types]
 
-def limit_tracking(motor: CubemarsMotor, direction="right", velocity=1):
-    if direction not in ["right", "left"]:
-        raise ValueError("Direction must be 'right' or 'left'")
+        print(f"Calibrating {', '.join(motor_types)}... Do not touch.\n")
+        calibrators = [JointCalibrator(motor, zero=ZERO[motor.type], speed=speed) for motor in motors]
+        limits = calibrate_joints(calibrators, freq=freq)
 
-    loop = SoftRealtimeLoop(dt=dt, report=True, fade=0)
-    action = (
-        "Checking right limit..." if direction == "right" else "Checking left limit..."
-    )
-    print(action)
+    zeroed = [calibrator.motor.type for calibrator in calibrators if calibrator.zeroed]
 
-    prev_angle = 0
-    start_time = 0
-    velocity_sign = -1 if direction == "right" else 1
+    for motor_type in motor_types:
+        if motor_type not in limits:
+            if motor_type in zeroed:
+                # The motor's zero moved, the previous limits don't apply anymore
+                print(f"{motor_type}: calibration failed after zeroing the motor, recalibrate before using it")
+                clear_calibration([motor_type], path=MOTOR_CALIBRATION_PATH)
+            else:
+                print(f"{motor_type}: calibration failed, keeping the previous one")
+            continue
+        joint_limits = limits[motor_type]
+        print(
+            f"{motor_type}: range [{np.rad2deg(joint_limits.lower): .2f}º, {np.rad2deg(joint_limits.upper): .2f}º], "
+            f"zero at {np.rad2deg(joint_limits.offset): .2f}º"
+        )
 
-    for t in loop:
-        # Adjust velocity based on time and direction
-        cur_vel = velocity_sign * (velocity if t < 0.5 else velocity / 3)
-
-        motor.send_velocity(desired_vel=cur_vel)
-
-        # Print angle every print_every seconds
-        if t - start_time >= print_every:
-            sys.stdout.write("\x1b[1A\x1b[2K")
-            print(
-                f"Angle: {np.rad2deg(motor.position): .3f} Velocity: {motor.velocity: .3f} Torque: {motor.torque: .3f}"
-            )
-            start_time = t
-
-            if abs(motor.position - prev_angle) < 0.001:
-                if direction == "right":
-                    print("Right limit reached! Setting zero position...")
-                    motor.send_zero_position()
-                    break
-                else:
-                    print("Left limit reached! Setting zero position...")
-                    return motor.position
-
-            prev_angle = motor.position
-
-    del loop
+    if limits:
+        save_calibration(limits, path=MOTOR_CALIBRATION_PATH)
+        print(f"Saved to {MOTOR_CALIBRATION_PATH}")
 
 
 if __name__ == "__main__":
-    freq = 200
-
     while True:
+        stored = load_calibration(MOTOR_CALIBRATION_PATH)
+        print(f"\nStored calibration: {', '.join(stored) if stored else 'none'}")
+
         # Display the menu
         print("\nOptions:")
-        print("1 - Calibrate Motor 1 (AK70-10)")
-        print("2 - Calibrate Motor 2 (AK60-6)")
+        print("1 - Calibrate both motors")
+        print("2 - Calibrate Motor 1 (AK70-10)")
+        print("3 - Calibrate Motor 2 (AK60-6)")
         print("0 - Exit")
 
         # Get user's choice
         choice = input("Enter your choice: ")
 
         if choice == '1':
-            with CubemarsMotor(motor_type="AK70-10", frequency=freq) as motor_1:
-                print(f"Calibrating {motor_1.type}... Do not touch.")
-                limit_tracking(motor_1, direction="right", velocity=3)
-                print(f"Setting origin at 0º...")
-                print("Sleeping...")
-                time.sleep(0.1)
-                left_limit = limit_tracking(motor_1, direction="left", velocity=3)
-                print("Angle range: ", [0, left_limit])
-                time.sleep(1.5)
-
+            calibrate(["AK70-10", "AK60-6"])
         elif choice == '2':
-            with CubemarsMotor(motor_type="AK60-6", frequency=freq) as motor_2:
-                print("Calibrating motor... Do not touch.")
-                limit_tracking(motor_2, direction='right', velocity=3)
-                print("Sleeping...")
-                time.sleep(2)
-                left_limit = limit_tracking(motor_2, direction='left', velocity=3)
-                print("Angle range: ", [0, np.rad2deg(left_limit)])
-                print(f"Setting zero position to {np.rad2deg(left_limit/2): .2f}º...")
-                time.sleep(1.5)
-                set_dh_origin(motor_2, left_limit / 2)
-
+            calibrate(["AK70-10"])
+        elif choice == '3':
+            calibrate(["AK60-6"])
         elif choice == '0':
             print("Exiting...")
             break
         else:
-            print("Invalid choice. Please enter 1, 2, or 0.")
\ No newline at end of file
+            print("Invalid choice. Please enter 1, 2, 3 or 0.")
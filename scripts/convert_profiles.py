@@ -0,0 +1,37 @@
+import argparse
+
+from pathlib import Path
+
+from assistive_arm.utils.profile_io import PROFILE_SUFFIX, convert_csv_profile, validate_profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CSV torque profiles to the binary profile format")
+    parser.add_argument("paths", type=Path, nargs="+", help="CSV profiles or directories containing them")
+    parser.add_argument("--float32", action="store_true", help="store columns as float32 instead of float64")
+    parser.add_argument("--check", action="store_true", help="only validate existing binary profiles against their CSV")
+    args = parser.parse_args()
+
+    csv_paths = []
+    for path in args.paths:
+        csv_paths.extend(sorted(path.glob("*.csv")) if path.is_dir() else [path])
+
+    n_invalid = 0
+    for csv_path in csv_paths:
+        binary_path = csv_path.with_suffix(PROFILE_SUFFIX)
+
+        if not args.check:
+            convert_csv_profile(csv_path, binary_path, dtype="float32" if args.float32 else "float64")
+
+        problems = validate_profile(binary_path, csv_path=csv_path)
+        if problems:
+            n_invalid += 1
+            print(f"{binary_path}: {'; '.join(problems)}")
+        else:
+            print(f"{binary_path}: OK ({binary_path.stat().st_size / 1024:.1f} kB, CSV {csv_path.stat().st_size / 1024:.1f} kB)")
+
+    print(f"\n{len(csv_paths) - n_invalid} of {len(csv_paths)} profiles valid")
+
+
+if __name__ == "__main__":
+    main()
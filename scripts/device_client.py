@@ -0,0 +1,34 @@
+import argparse
+import json
+
+from assistive_arm.network.device_client import DEVICE_SERVICE_ADDRESS, DeviceClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a command to the device service")
+    parser.add_argument("command", choices=["status", "calibrate", "assist", "unpowered", "shutdown"])
+    parser.add_argument("--peak-time", type=float, default=None, help="assist: peak time (%%)")
+    parser.add_argument("--peak-force", type=float, default=None, help="assist: peak force (N)")
+    parser.add_argument("--profile", default=None, help="assist: profile file instead of a generated profile")
+    parser.add_argument("--enable", action="append", default=[], metavar="OPTION",
+                        help="assist: control feature to turn on (use_torque_map, avoid_singularity, use_impedance, use_prediction, track_phase), repeatable")
+    parser.add_argument("--address", default=DEVICE_SERVICE_ADDRESS, help="device service address")
+    parser.add_argument("--timeout", type=float, default=None, help="reply timeout (s)")
+    args = parser.parse_args()
+
+    params = {}
+    if args.command == "assist":
+        params = {"peak_time": args.peak_time, "peak_force": args.peak_force, "profile": args.profile}
+        params.update(dict.fromkeys(args.enable, True))
+
+    with DeviceClient(address=args.address, timeout=args.timeout) as client:
+        reply = client.send(args.command, **params)
+
+    if reply["ok"]:
+        print(json.dumps(reply["result"], indent=2))
+    else:
+        print(f"Error: {reply['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import json
+import signal
+import traceback
+import numpy as np
+import yaml
+import zmq
+
+from contextlib import ExitStack, nullcontext
+from pathlib import Path
+
+import RPi.GPIO as GPIO
+
+from assistive_arm.motor_control import CubemarsMotor
+from assistive_arm.network.device_client import DEVICE_SERVICE_ADDRESS
+from assistive_arm.profile_generation import generate_profile, scale_theta_2
+from assistive_arm.realtime import realtime_mode
+from assistive_arm.scheduler import FixedRateLoop
+from assistive_arm.torque_map import TorqueMap
+from assistive_arm.utils.profile_io import load_profile
+
+from sit_to_stand import (
+    CONTROL_OPTIONS,
+    REALTIME_SETTINGS,
+    await_trigger_signal,
+    close_trigger,
+    control_loop_and_log,
+    get_logger,
+    get_trigger,
+    get_yaml_path,
+    load_motor_calibration,
+    save_log_or_delete,
+    set_up_logging_dir,
+)
+
+
+SPLINE_PROFILES_PATH = Path("./torque_profiles/spline_profiles")
+
+
+class DeviceService:
+    """ Keeps both motors connected and serves trial commands until shutdown
+
+    Commands (JSON {"command": ..., "params": {...}}):
+        status: motor state, calibration and loaded profiles
+        calibrate: record theta_2 while the trigger is held and store the new range
+        assist: peak_time, peak_force (stored spline profile, or generated off the grid) or profile: path,
+            apply the profile during one triggered trial, with optional control features (CONTROL_OPTIONS
+            but realtime, which is set for the service) e.g. "use_impedance": true
+        unpowered: record one triggered trial without assistance
+        shutdown: stop the service
+    """
+
+    def __init__(self, motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path, realtime: bool = False) -> None:
+        self.motor_1 = motor_1
+        self.motor_2 = motor_2
+        self.freq = freq
+        self.realtime = realtime
+        self.session_dir = session_dir
+        self.remote_dir = remote_dir
+
+        self.calibration = self._load_calibration()
+        self.profiles = {}
+        self.torque_maps = {}
+        self.running = True
+
+        self.handlers = {
+            "status": self.status,
+            "calibrate": self.calibrate,
+            "assist": self.assist,
+            "unpowered": self.unpowered,
+            "shutdown": self.shutdown,
+        }
+
+    def _load_calibration(self) -> tuple:
+        yaml_path = get_yaml_path(yaml_name="device_height_calibration", session_dir=self.session_dir)
+        if not yaml_path.exists():
+            return None
+
+        with open(yaml_path, "r") as f:
+            calibration_data = yaml.load(f, Loader=yaml.FullLoader)
+
+        return calibration_data["new_range"]["min"], calibration_data["new_range"]["max"]
+
+    def _idle(self) -> None:
+        self.motor_1.send_torque(desired_torque=0, safety=True)
+        self.motor_2.send_torque(desired_torque=0, safety=True)
+
+    def handle(self, message: str) -> dict:
+        """ Run a command and build its reply
+
+        Args:
+            message (str): JSON request
+
+        Returns:
+            dict: reply
+        """
+        try:
+            request = json.loads(message)
+            handler = self.handlers[request["command"]]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            return {"ok": False, "error": f"Invalid request: {e}"}
+
+        try:
+            result = handler(**request.get("params", {}))
+        except Exception as e:
+            traceback.print_exc()
+            self._idle()
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+        return {"ok": True, "result": result}
+
+    def status(self) -> dict:
+        return {
+            "motor_1": {"type": self.motor_1.type, "position": self.motor_1.position, "emergency_stop": self.motor_1._emergency_stop},
+            "motor_2": {"type": self.motor_2.type, "position": self.motor_2.position, "emergency_stop": self.motor_2._emergency_stop},
+            "calibration": self.calibration,
+            "profiles": list(self.profiles.keys()),
+            "session_dir": str(self.session_dir),
+        }
+
+    def calibrate(self) -> dict:
+        await_trigger_signal(mode="TRIGGER")
+
+        theta_2 = []
+        trigger = get_trigger()
+        loop = FixedRateLoop(dt=1 / self.freq, report=False)
+        with realtime_mode(**REALTIME_SETTINGS) if self.realtime else nullcontext():
+            for t in loop:
+                if not trigger.active:
+                    break
+                if t >= 0.5:
+                    theta_2.append(self.motor_2.position)
+                self._idle()
+        del loop
+
+        if not theta_2:
+            raise RuntimeError("No calibration data recorded")
+
+        # Same offsets as calibrate_height
+        theta_2 = np.array(theta_2)
+        self.calibration = (float(theta_2.min() + 0.1), float(theta_2.max() - 0.01))
+
+        calibration_data = {
+            "new_range": {"min": self.calibration[0], "max": self.calibration[1]},
+            "theta_2_values": [float(angle) for angle in theta_2],
+        }
+        yaml_path = get_yaml_path(yaml_name="device_height_calibration", session_dir=self.session_dir)
+        with open(yaml_path, "w") as f:
+            yaml.dump(calibration_data, f)
+
+        # Stored profiles were scaled with the previous calibration
+        self.profiles.clear()
+        self.torque_maps.clear()
+
+        return {"calibration": self.calibration, "duration": len(theta_2) / self.freq}
+
+    def _load_profile(self, profile_path: Path):
+        loaded = load_profile(profile_path)
+        if self.calibration is not None:
+            loaded.theta_2 = scale_theta_2(loaded.theta_2.to_numpy(), self.calibration)
+        return loaded
+
+    def get_profile(self, peak_time: float = None, peak_force: float = None, profile: str = None, use_torque_map: bool = False) -> tuple:
+        """ Profile from a file, the stored spline grid or generated from its peak, and its torque map if
+        use_torque_map, both kept in memory for later trials """
+        key = profile or (peak_time, peak_force)
+
+        if key not in self.profiles:
+            spline_path = None if profile else SPLINE_PROFILES_PATH / f"peak_time_{peak_time:g}_peak_force_{peak_force:g}.csv"
+
+            if profile:
+                self.profiles[key] = self._load_profile(profile)
+            elif spline_path.exists():
+                # Grid peaks keep the stored profiles, whose names round the actual peak force
+                self.profiles[key] = self._load_profile(spline_path)
+            else:
+                self.profiles[key] = generate_profile(peak_time, peak_force, theta_2_range=self.calibration)
+
+        if use_torque_map and key not in self.torque_maps:
+            self.torque_maps[key] = TorqueMap(self.profiles[key])
+
+        return self.profiles[key], self.torque_maps.get(key)
+
+    def _run_trial(self, log_name: str, profile, apply_force: bool, profile_details: list = None, torque_map: TorqueMap = None, **options) -> dict:
+        log_path, logger = get_logger(log_name=log_name, session_dir=self.session_dir, profile_details=profile_details)
+
+        self._idle()
+        await_trigger_signal(mode="TRIGGER")
+        success = control_loop_and_log(
+            motor_1=self.motor_1,
+            motor_2=self.motor_2,
+            logger=logger,
+            profile=profile,
+            freq=self.freq,
+            mode="TRIGGER",
+            apply_force=apply_force,
+            torque_map=torque_map,
+            realtime=self.realtime,
+            **options,
+        )
+        save_log_or_delete(remote_dir=self.remote_dir, log_path=log_path, successful=success)
+
+        return {"success": success, "log_path": str(log_path)}
+
+    def assist(self, peak_time: float = None, peak_force: float = None, profile: str = None, **options) -> dict:
+        if profile is None and (peak_time is None or peak_force is None):
+            raise ValueError("assist needs peak_time and peak_force, or profile")
+
+        # realtime is a setting of the service, not of a trial
+        unknown = set(options) - (set(CONTROL_OPTIONS) - {"realtime"})
+        if unknown:
+            raise ValueError(f"Unknown assist options: {sorted(unknown)}")
+        options = {name: bool(value) for name, value in options.items()}
+        if options.get("track_phase") and options.get("use_torque_map"):
+            raise ValueError("track_phase can't be combined with use_torque_map")
+
+        assistance_profile, torque_map = self.get_profile(
+            peak_time=peak_time,
+            peak_force=peak_force,
+            profile=profile,
+            use_torque_map=options.get("use_torque_map", False),
+        )
+
+        return self._run_trial(
+            log_name="assist",
+            profile=assistance_profile,
+            apply_force=True,
+            profile_details=None if profile else [peak_time, peak_force],
+            torque_map=torque_map,
+            **options,
+        )
+
+    def unpowered(self) -> dict:
+        profile, _ = self.get_profile(profile="./torque_profiles/simulation_profile.csv")
+
+        return self._run_trial(log_name="unpowered_device", profile=profile, apply_force=False)
+
+    def shutdown(self) -> dict:
+        self.running = False
+        return {"stopped": True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the motors connected and run trials on request")
+    parser.add_argument("--subject", default="Xabi", help="subject id, logs go to ./subject_logs/subject_<id>")
+    parser.add_argument("--freq", type=int, default=200, help="control loop frequency (Hz)")
+    parser.add_argument("--address", default=DEVICE_SERVICE_ADDRESS, help="zmq address to listen on")
+    parser.add_argument("--realtime", action="store_true", help="run trials pinned to a core with SCHED_FIFO, locked memory and no GC")
+    args = parser.parse_args()
+
+    session_dir, session_remote_dir = set_up_logging_dir(subject_folder=Path(f"./subject_logs/subject_{args.subject}"))
+
+    # Treat SIGTERM like Ctrl + C so the motors and CAN ports are always shut down
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    context = zmq.Context.instance()
+    socket = context.socket(zmq.REP)
+    socket.bind(args.address)
+
+    try:
+        with ExitStack() as stack:
+            motor_1 = stack.enter_context(CubemarsMotor(motor_type="AK70-10", frequency=args.freq))
+            motor_2 = stack.enter_context(CubemarsMotor(motor_type="AK60-6", frequency=args.freq))
+            if not load_motor_calibration(motor_1, motor_2):
+                return
+
+            service = DeviceService(motor_1, motor_2, freq=args.freq, session_dir=session_dir, remote_dir=session_remote_dir, realtime=args.realtime)
+            print(f"Device service listening on {args.address}")
+
+            while service.running:
+                message = socket.recv_string()
+                reply = service.handle(message)
+                print(f"{message} -> {'ok' if reply['ok'] else reply['error']}")
+                socket.send_string(json.dumps(reply))
+
+    except KeyboardInterrupt:
+        print("Keyboard interrupt detected. Shutting down...")
+    finally:
+        socket.close()
+        close_trigger()
+        GPIO.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+
+from pathlib import Path
+
+from assistive_arm.moco_batch import run_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a batch of Moco tracking problems in parallel")
+    parser.add_argument("manifest", type=Path, help="YAML manifest describing the jobs")
+    parser.add_argument("--workers", type=int, default=None, help="parallel solves (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per solve")
+    parser.add_argument("--memory-limit", type=float, default=None, help="memory limit per solve (GB)")
+    parser.add_argument("--resolve", action="store_true", help="solve again jobs that are already solved")
+    args = parser.parse_args()
+
+    results = run_batch(
+        manifest_path=args.manifest,
+        n_workers=args.workers,
+        threads_per_job=args.threads,
+        memory_limit_gb=args.memory_limit,
+        skip_solved=not args.resolve,
+    )
+
+    print(results[["job_name", "status", "objective", "solve_time"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 import yaml
 import re
+from contextlib import nullcontext
 from typing import Literal
 
 from pathlib import Path
@@ -15,24 +16,50 @@ from enum import Enum
 
 import RPi.GPIO as GPIO
 
-from NeuroLocoMiddleware.SoftRealtimeLoop import SoftRealtimeLoop
+from assistive_arm.calibration import apply_calibration
+from assistive_arm.display import StatusDisplay
+from assistive_arm.executive import Executive, RingBuffer, SharedState
+from assistive_arm.impedance import ImpedanceSetpointGenerator
 from assistive_arm.motor_control import CubemarsMotor
+from assistive_arm.phase_tracking import PhaseTracker
+from assistive_arm.realtime import realtime_mode
 from assistive_arm.robotic_arm import calculate_ee_pos, get_jacobian, get_target_torques
+from assistive_arm.scheduler import FixedRateLoop
+from assistive_arm.singularity import SingularityAvoidance
+from assistive_arm.torque_map import TorqueMap
+from assistive_arm.trigger import Trigger
+from assistive_arm.utils.profile_io import load_profile, save_profile
 
 # Set options
 np.set_printoptions(precision=3, suppress=True)
 
-# Use Broadcom SOC Pin numbers
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(17, GPIO.IN)
+# Trigger on BCM pin 17, edges are detected in the background. Created on first use (get_trigger)
+# so importing this module, e.g. from device_service, doesn't claim the pin
+TRIGGER_PIN = 17
+_trigger = None
+
+# Used by trials run with realtime=True, CPU 3 should be isolated (isolcpus=3) on the Pi
+REALTIME_SETTINGS = {"cpu": 3, "priority": 80}
 
 PROJECT_DIR_REMOTE = Path("/Users/xabieririzar/uni-projects/Harvard/assistive-arm")
 
+# With phase tracking, Percentage is the tracked progress and phase_velocity its rate (%/s), NaN otherwise
+LOGGED_VARS = ["Percentage", "target_tau_1", "measured_tau_1", "theta_1", "velocity_1", "target_tau_2", "measured_tau_2", "theta_2", "velocity_2", "EE_X", "EE_Y", "phase_velocity"]
+
+# Task rates of a trial (Hz), the control loop runs at the freq passed to control_loop_and_log
+LOG_RATE = 200
+DISPLAY_RATE = 20
+
+# Optional features of control_loop_and_log, all off by default. Toggled for the session from
+# the menu (option 5), the device service takes them with each assist request
+CONTROL_OPTIONS = ["use_torque_map", "avoid_singularity", "use_impedance", "use_prediction", "track_phase", "realtime"]
+
 class States(Enum):
     CALIBRATING = 1
     ASSISTING = 2
     ASSIST_PROFILES = 3
     UNPOWERED_COLLECTION = 4
+    CONTROL_OPTIONS = 5
     EXIT = 0
 
     def __eq__(self, other):
@@ -41,6 +68,81 @@ class States(Enum):
             return False
     
 
+def get_trigger() -> Trigger:
+    """ Trigger shared by every trial, set up on the first call """
+    global _trigger
+    if _trigger is None:
+        _trigger = Trigger(pin=TRIGGER_PIN)
+    return _trigger
+
+
+def close_trigger() -> None:
+    """ Release the trigger pin, if it was set up """
+    global _trigger
+    if _trigger is not None:
+        _trigger.close()
+        _trigger = None
+
+
+def set_control_options(options: dict) -> None:
+    """ Toggle the optional controller features until 0 is entered
+
+    Args:
+        options (dict): option name -> enabled, updated in place
+    """
+    while True:
+        print("\nController options:")
+        for i, name in enumerate(CONTROL_OPTIONS, start=1):
+            print(f"{i} - {name}: {'on' if options[name] else 'off'}")
+        print("0 - Back")
+
+        choice = int(input("Toggle option: "))
+        if choice == 0:
+            return
+        if not 1 <= choice <= len(CONTROL_OPTIONS):
+            print("Invalid option. Try again.")
+            continue
+
+        name = CONTROL_OPTIONS[choice - 1]
+        options[name] = not options[name]
+
+        # The torque map can't follow a tracked phase, keep the option that was just enabled
+        if options["use_torque_map"] and options["track_phase"]:
+            other = "track_phase" if name == "use_torque_map" else "use_torque_map"
+            options[other] = False
+            print(f"{other} turned off, it can't be combined with {name}")
+
+
+def load_motor_calibration(motor_1: CubemarsMotor, motor_2: CubemarsMotor) -> bool:
+    """ Apply the stored joint calibration of both motors, nothing may run without it
+
+    Args:
+        motor_1 (CubemarsMotor): motor_1
+        motor_2 (CubemarsMotor): motor_2
+
+    Returns:
+        bool: True if both motors are calibrated
+    """
+    calibrated = [apply_calibration(motor) for motor in (motor_1, motor_2)]
+    if not all(calibrated):
+        print("Run scripts/calibrate_motors.py before using the device")
+
+    return all(calibrated)
+
+
+def get_torque_map(profile: pd.DataFrame, options: dict) -> TorqueMap:
+    """ Torque map of a profile if the options use one, built when the profile is picked rather than at the start of the trial
+
+    Args:
+        profile (pd.DataFrame): assistance profile
+        options (dict): control options
+
+    Returns:
+        TorqueMap: torque map, None if use_torque_map is off
+    """
+    return TorqueMap(profile) if options.get("use_torque_map") else None
+
+
 def await_trigger_signal(mode: Literal["TRIGGER", "ENTER"]):
     """ Wait for trigger signal OR Enter to start recording """
     if mode == "ENTER": 
@@ -49,8 +151,7 @@ def await_trigger_signal(mode: Literal["TRIGGER", "ENTER"]):
     
     if mode == "TRIGGER":
         print("\nPress trigger to start recording P_EE...")
-        while not GPIO.input(17):
-            pass
+        get_trigger().wait_for_active()
         print()
 
 
@@ -76,8 +177,6 @@ def get_logger(log_name: str, session_dir: Path, profile_details: list=None) ->
     Returns:
         tuple[Path, csv.writer]: log_path, task_logger
     """
-    
-    logged_vars = ["Percentage", "target_tau_1", "measured_tau_1", "theta_1", "velocity_1", "target_tau_2", "measured_tau_2", "theta_2", "velocity_2", "EE_X", "EE_Y"]
 
     sample_num = get_next_sample_number(session_dir=session_dir, log_name=log_name)
     log_file = f"{log_name}_{sample_num:02}.csv"
@@ -89,7 +188,7 @@ def get_logger(log_name: str, session_dir: Path, profile_details: list=None) ->
         if profile_details:
             writer.writerow(["peak_time", profile_details[0]])
             writer.writerow(["peak_force", profile_details[1]])
-        writer.writerow(["time"] + logged_vars)
+        writer.writerow(["time"] + LOGGED_VARS)
 
     csv_file = open(log_path, "a").__enter__()
     task_logger = csv.writer(csv_file)
@@ -157,12 +256,12 @@ def countdown(duration: int=3):
     print("\nGO!")
 
 
-def calibrate_height(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path):
+def calibrate_height(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path, realtime: bool=False):
     yaml_path = get_yaml_path(yaml_name="device_height_calibration", session_dir=session_dir)
 
-    unadjusted_profile = pd.read_csv("./torque_profiles/simulation_profile.csv", index_col="Percentage")
+    unadjusted_profile = load_profile("./torque_profiles/simulation_profile.csv")
 
-    loop = SoftRealtimeLoop(dt=1 / freq, report=False, fade=0)
+    loop = FixedRateLoop(dt=1 / freq, report=False)
 
     calibration_data = dict()
 
@@ -170,7 +269,6 @@ def calibrate_height(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int,
 
     P_EE_values = []
     theta_2 = []
-    start_time = 0
 
     try:
         motor_1.send_torque(desired_torque=0, safety=True)
@@ -182,19 +280,20 @@ def calibrate_height(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int,
         print("Calibration started. Please perform the sit-to-stand motion.")
         print("Press Ctrl + C to stop recording.\n")
 
-        for t in loop:
-            P_EE = calculate_ee_pos(theta_1=motor_1.position, theta_2=motor_2.position)
+        display = StatusDisplay(lambda values: [f"P_EE x: {values['x']}, y: {values['y']}"], fields=["x", "y"], rate=DISPLAY_RATE)
+
+        with realtime_mode(**REALTIME_SETTINGS) if realtime else nullcontext(), display:
+            for t in loop:
+                P_EE = calculate_ee_pos(theta_1=motor_1.position, theta_2=motor_2.position)
             
-            if not t < 0.5:
-                P_EE_values.append(P_EE[0])  # Assuming x is the first element
-                theta_2.append(motor_2.position)
+                if not t < 0.5:
+                    P_EE_values.append(P_EE[0])  # Assuming x is the first element
+                    theta_2.append(motor_2.position)
 
-            motor_1.send_torque(desired_torque=0, safety=True)
-            motor_2.send_torque(desired_torque=0, safety=True)
+                motor_1.send_torque(desired_torque=0, safety=True)
+                motor_2.send_torque(desired_torque=0, safety=True)
 
-            if t - start_time >= 0.05:
-                print(f"P_EE x: {P_EE[0]}, y: {P_EE[1]}", end="\r")
-                start_time = t
+                display.update(x=P_EE[0], y=P_EE[1])
         del loop
 
         print("\n\n\n\n")
@@ -230,9 +329,9 @@ def calibrate_height(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int,
         with zipfile.ZipFile(zip_file_path, "w") as zip_file:
             for profile in Path(spline_path).iterdir():
                 if profile.suffix == ".csv":
-                    spline_profile = pd.read_csv(profile, index_col="Percentage")
+                    spline_profile = load_profile(profile)
                     spline_profile.theta_2 = theta_2_scaled
-                    spline_profile.to_csv(profile)
+                    save_profile(profile, spline_profile, metadata={"calibration": calibration_data["new_range"]})
                     zip_file.write(profile, os.path.basename(profile))
 
         os.system(f"scp {zip_file_path} macbook:{PROJECT_DIR_REMOTE / spline_path}")
@@ -244,7 +343,7 @@ def calibrate_height(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int,
         scaled_optimal_profile = unadjusted_profile.copy()
         scaled_optimal_profile.theta_2 = theta_2_scaled
         scaled_profile_path = Path("./torque_profiles/scaled_simulation_profile.csv")
-        scaled_optimal_profile.to_csv(scaled_profile_path)
+        save_profile(scaled_profile_path, scaled_optimal_profile, metadata={"calibration": calibration_data["new_range"]})
 
         os.system(f"scp {scaled_profile_path} macbook:{PROJECT_DIR_REMOTE / scaled_profile_path.parent}")
 
@@ -270,7 +369,7 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
             if peak_time not in spline_dict:
                 spline_dict[peak_time] = dict()
 
-            spline_dict[peak_time][peak_force] = pd.read_csv(path, index_col="Percentage")
+            spline_dict[peak_time][peak_force] = load_profile(path)
 
     try:
         motor_1.send_torque(desired_torque=0, safety=True)
@@ -377,18 +476,22 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
     except KeyboardInterrupt:
         print("Keyboard interrupt detected. Shutting down...")
 
-def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path):
+def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path, options: dict=None):
+    options = options or {}
     spline_profiles_path = Path("./torque_profiles/spline_profiles/")
     spline_dict = dict()
 
     for path in spline_profiles_path.iterdir():
+        if path.suffix != ".csv":
+            continue
+
         peak_time = int(path.stem.split("_")[2])
         peak_force = int(path.stem.split("_")[5])
 
         if peak_time not in spline_dict:
             spline_dict[peak_time] = dict()
 
-        spline_dict[peak_time][peak_force] = pd.read_csv(path, index_col="Percentage")
+        spline_dict[peak_time][peak_force] = load_profile(path)
 
     try:
         motor_1.send_torque(desired_torque=0, safety=True)
@@ -411,6 +514,7 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
             peak_time = int(input("Enter peak time: "))
             peak_force = int(input("Enter peak force: "))
             profile = spline_dict[peak_time][peak_force]
+            torque_map = get_torque_map(profile, options)
 
             log_path, logger = get_logger(log_name=f"single_time_{peak_time}_force_{peak_force}", session_dir=session_dir)
             print(f"Recording to {log_path}")
@@ -419,10 +523,9 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
             print(f"Peak force: {peak_force}N")
 
             print("\nPress trigger to start recording P_EE...")
-            while not GPIO.input(17):
-                pass
+            get_trigger().wait_for_active()
             print()
-            control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq)
+            control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq, mode="TRIGGER", torque_map=torque_map, **options)
             save_log_or_delete(remote_dir=remote_dir, log_path=log_path) 
 
         elif chosen_mode == "2":
@@ -442,6 +545,7 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
             print(list(spline_dict[peak_force].keys()))
             
             for peak_force, profile in profiles.items():
+                torque_map = get_torque_map(profile, options)
                 # peak_time because we select a specific peak time and iterate over the peak forces
                 log_path, logger = get_logger(log_name=f"peak_time_time_{peak_time}_force_{peak_force}", session_dir=session_dir)
 
@@ -450,7 +554,7 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
                 input("Press Enter to start recording...")
                 countdown(duration=3)
                 print()
-                control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq)
+                control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq, mode="ENTER", torque_map=torque_map, **options)
                 save_log_or_delete(remote_dir=remote_dir, log_path=log_path) 
 
         elif chosen_mode == '3':
@@ -472,16 +576,16 @@ def assist_multiple_profiles(motor_1: CubemarsMotor, motor_2: CubemarsMotor, fre
             
             for peak_time in peak_times:
                 profile = spline_dict[peak_time][peak_force]
+                torque_map = get_torque_map(profile, options)
                 # peak_force because we select a specific peak force and iterate over the peak times
                 log_path, logger = get_logger(log_name=f"fixed_force_time_{peak_time}_force_{peak_force}", session_dir=session_dir)
 
                 print(f"Current profile: \nPeak time: {peak_time}% \nPeak force: {peak_force}N")
                 print(f"Recording to {log_path}")
                 print("\nPress trigger to start recording P_EE...")
-                while not GPIO.input(17):
-                    pass
+                get_trigger().wait_for_active()
                 print()
-                control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq)
+                control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq, mode="TRIGGER", torque_map=torque_map, **options)
                 save_log_or_delete(remote_dir=remote_dir, log_path=log_path)
 
     except KeyboardInterrupt:
@@ -495,53 +599,138 @@ def control_loop_and_log(
         profile: pd.DataFrame,
         freq: int,
         mode: Literal["TRIGGER", "ENTER"],
-        apply_force: bool=True):
+        apply_force: bool=True,
+        torque_map: TorqueMap=None,
+        use_torque_map: bool=False,
+        avoid_singularity: bool=False,
+        realtime: bool=False,
+        use_impedance: bool=False,
+        use_prediction: bool=False,
+        track_phase: bool=False):
+
+    if track_phase and use_torque_map:
+        raise ValueError("The torque map looks the profile row up from theta_2, it can't follow a tracked phase")
+
+    # Torques precomputed over joint space so each tick is a table lookup, callers build the map
+    # when the profile is loaded (get_torque_map), only a missing one is built here
+    if not use_torque_map:
+        torque_map = None
+    elif torque_map is None:
+        torque_map = TorqueMap(profile)
+    singularity_avoidance = SingularityAvoidance() if avoid_singularity else None
+
+    # Follow the profile from the current row instead of searching it all every tick
+    phase_tracker = PhaseTracker(profile) if track_phase else None
+
+    # Send impedance setpoints so the motors follow the profile's torque slope between ticks
+    # The predicted state already targets the middle of the period, no further lookahead is needed
+    impedance = ImpedanceSetpointGenerator(profile, period=1 / freq, lookahead=0 if use_prediction else None) if use_impedance else None
 
     print("Recording started. Please perform the sit-to-stand motion.")
     print("Press Ctrl + C or trigger to stop recording.\n")
-    print_time = 0
     start_time = time.time()
 
-    loop = SoftRealtimeLoop(dt=1 / freq, report=False, fade=0)
+    trigger = get_trigger() if mode == "TRIGGER" else None
+    if trigger is not None and trigger.active and trigger.rising_time:
+        # Log relative to the trigger edge so the trial lines up with the mocap recording
+        start_time = trigger.rising_time
 
-    success = True
+    # Control writes every tick into the state and the log buffer, logging and the display read them on their own threads
+    state = SharedState(["time"] + LOGGED_VARS)
+    log_buffer = RingBuffer(width=len(state.fields), capacity=4 * freq)
+    status = {"success": True}
+
+    def control(t: float) -> bool:
+        if trigger is not None and not trigger.active:  # Trigger turned off (falling edge)
+            print("Stopped recording, exiting...")
+            return False
 
-    for t in loop:
-        if mode == "TRIGGER":
-            if not GPIO.input(17):  # Detects if signal turns off (low signal)
-                print("Stopped recording, exiting...")
-                break
-        
         cur_time = time.time()
 
         if motor_1._emergency_stop or motor_2._emergency_stop:
-            success = False
-            break
-                    
-        tau_1, tau_2, P_EE, index = get_target_torques(
-                        theta_1=motor_1.position,
-                        theta_2=motor_2.position,
-                        profiles=profile
-                    )
-        
-        if apply_force:
+            status["success"] = False
+            return False
+
+        if use_prediction:
+            # State when the command takes effect, without the moving average and bus lag
+            theta_1, theta_2 = motor_1.predicted_position, motor_2.predicted_position
+            velocity_1, velocity_2 = motor_1.predicted_velocity, motor_2.predicted_velocity
+        else:
+            theta_1, theta_2 = motor_1.position, motor_2.position
+            velocity_1, velocity_2 = motor_1.velocity, motor_2.velocity
+
+        if impedance:
+            profile_row = phase_tracker.update(theta_2) if phase_tracker else None
+            setpoint_1, setpoint_2, index = impedance(theta_1, theta_2, velocity_1, velocity_2, row=profile_row)
+            tau_1, tau_2 = setpoint_1.torque_ff, setpoint_2.torque_ff
+            P_EE = calculate_ee_pos(theta_1=theta_1, theta_2=theta_2)
+        elif torque_map:
+            tau_1, tau_2, index = torque_map(theta_1, theta_2)
+            P_EE = calculate_ee_pos(theta_1=theta_1, theta_2=theta_2)
+        else:
+            tau_1, tau_2, P_EE, index = get_target_torques(
+                            theta_1=theta_1,
+                            theta_2=theta_2,
+                            profiles=profile,
+                            phase_tracker=phase_tracker
+                        )
+
+        if singularity_avoidance:
+            tau_1, tau_2 = singularity_avoidance.blend(theta_1, theta_2, tau_1, tau_2)
+
+        if apply_force and impedance:
+            # Singularity avoidance only acts on the feedforward torque
+            # Spring torque stays capped (safety) until the stiffness is validated on the device
+            motor_1.send_impedance(*setpoint_1._replace(torque_ff=tau_1), safety=True)
+            motor_2.send_impedance(*setpoint_2._replace(torque_ff=tau_2), safety=True)
+        elif apply_force:
             motor_1.send_torque(desired_torque=tau_1, safety=False)
             motor_2.send_torque(desired_torque=tau_2, safety=False)
         else:
-            motor_1.send_torque(desired_torque=0, safety=False) 
+            motor_1.send_torque(desired_torque=0, safety=False)
             motor_2.send_torque(desired_torque=0, safety=False)
 
-        if t - print_time >= 0.05:
-            print(f"{motor_1.type}: Angle: {np.rad2deg(motor_1.position):.3f} Torque: {motor_1.torque:.3f}")
-            print(f"{motor_2.type}: Angle: {np.rad2deg(motor_2.position):.3f} Torque: {motor_2.torque:.3f}")
-            print(f"Body height: {-P_EE[0]}")
-            print(f"Movement: {index: .0f}%. tau_1: {tau_1}, tau_2: {tau_2}")
-            sys.stdout.write(f"\x1b[4A\x1b[2K")
-                    
-            print_time = t
+        if phase_tracker:
+            index, phase_velocity = phase_tracker.progress, phase_tracker.velocity
+        else:
+            phase_velocity = np.nan
+
+        row = (cur_time - start_time, index, tau_1, motor_1.torque, motor_1.position, motor_1.velocity, tau_2, motor_2.torque, motor_2.position, motor_2.velocity, P_EE[0], P_EE[1], phase_velocity)
+        state.write(**dict(zip(state.fields, row)))
+        log_buffer.push(row)
+
+    def log(t: float) -> None:
+        logger.writerows(log_buffer.drain().tolist())
+
+    def render(values: dict) -> list:
+        lines = [
+            f"{motor_1.type}: Angle: {np.rad2deg(values['theta_1']):.3f} Torque: {values['measured_tau_1']:.3f}",
+            f"{motor_2.type}: Angle: {np.rad2deg(values['theta_2']):.3f} Torque: {values['measured_tau_2']:.3f}",
+            f"Body height: {-values['EE_X']}",
+            f"Movement: {values['Percentage']: .0f}%. tau_1: {values['target_tau_1']}, tau_2: {values['target_tau_2']}",
+        ]
+        if phase_tracker:
+            lines.append(f"Phase velocity: {values['phase_velocity']: .1f}%/s")
+        return lines
+
+    executive = Executive()
+    executive.add_task("control", control, rate=freq, priority=2)
+    executive.add_task("log", log, rate=LOG_RATE, priority=1)
+
+    with realtime_mode(**REALTIME_SETTINGS, buffers=[state.values, log_buffer.rows]) if realtime else nullcontext():
+        with StatusDisplay(render, state=state, rate=DISPLAY_RATE):
+            executive.run()
+
+    if "log" in executive.unfinished:
+        # The log thread may still be writing, draining here would race with it
+        print("\nLogging didn't stop in time, the last samples are not saved")
+    else:
+        # Rows pushed after the last log tick
+        log(t=0)
+    if log_buffer.dropped:
+        print(f"\nLogging fell behind, {log_buffer.dropped} samples were dropped")
 
-        logger.writerow([cur_time - start_time, index, tau_1, motor_1.torque, motor_1.position, motor_1.velocity, tau_2, motor_2.torque, motor_2.position, motor_2.velocity, P_EE[0], P_EE[1]])
-    del loop
+    success = status["success"]
 
     motor_1.send_torque(desired_torque=0, safety=False)
     motor_2.send_torque(desired_torque=0, safety=False)
@@ -555,21 +744,24 @@ def control_loop_and_log(
     return success
 
 
-def apply_simulation_profile(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path):
+def apply_simulation_profile(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path, mode: Literal["TRIGGER", "ENTER"], options: dict=None):
+    options = options or {}
     log_path, logger = get_logger(log_name="simulation_profile", session_dir=session_dir)
 
-    profile = pd.read_csv("./torque_profiles/scaled_simulation_profile.csv", index_col="Percentage")
+    profile = load_profile("./torque_profiles/scaled_simulation_profile.csv")
+    torque_map = get_torque_map(profile, options)
 
-    input("\nPress Enter to start calibrating...")
+    await_trigger_signal(mode=mode)
     countdown(duration=3)
 
     try:
-        control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq)
+        success = control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq, mode=mode, torque_map=torque_map, **options)
+        save_log_or_delete(remote_dir=remote_dir, log_path=log_path, successful=success)
 
     except KeyboardInterrupt:
         print("Keyboard interrupt detected. Shutting down...")
 
-def collect_unpowered_data(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path, mode: Literal["TRIGGER", "ENTER"]):
+def collect_unpowered_data(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq: int, session_dir: Path, remote_dir: Path, mode: Literal["TRIGGER", "ENTER"], options: dict=None):
     """ Collect unpowered data for EMG synchronization.
 
     Args:
@@ -579,10 +771,13 @@ def collect_unpowered_data(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq:
         session_dir (Path): session directory
         remote_dir (Path): remote session directory
         mode (Literal["TRIGGER", "ENTER"]): record on trigger or Enter pressing
+        options (dict, optional): control options (CONTROL_OPTIONS). Defaults to None (all off).
     """
     iterations = 5
+    options = options or {}
 
-    profile = pd.read_csv("./torque_profiles/scaled_simulation_profile.csv", index_col="Percentage")
+    profile = load_profile("./torque_profiles/scaled_simulation_profile.csv")
+    torque_map = get_torque_map(profile, options)
 
     # range from 1-5
     for i in range(1, iterations + 1):
@@ -594,7 +789,7 @@ def collect_unpowered_data(motor_1: CubemarsMotor, motor_2: CubemarsMotor, freq:
                 print(f"Recording to {log_path}")
 
                 await_trigger_signal(mode=mode)
-                success = control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq, apply_force=False, mode=mode)
+                success = control_loop_and_log(motor_1=motor_1, motor_2=motor_2, logger=logger, profile=profile, freq=freq, apply_force=False, mode=mode, torque_map=torque_map, **options)
                 save_log_or_delete(remote_dir=remote_dir, log_path=log_path, successful=not success)
 
             except Exception as e:
@@ -610,6 +805,7 @@ if __name__ == "__main__":
     subject_folder = Path(f"./subject_logs/subject_{subject_id}")
 
     trigger_mode = "ENTER" # TRIGGER or ENTER
+    control_options = dict.fromkeys(CONTROL_OPTIONS, False)
 
     session_dir, session_remote_dir = set_up_logging_dir(subject_folder=subject_folder)
     try:
@@ -620,6 +816,7 @@ if __name__ == "__main__":
             print("2 - Run Assistance")
             print("3 - Apply multiple assistance profiles")
             print("4 - Collect unpowered data")
+            print("5 - Controller options")
             print("0 - Exit")
 
             # Get user's choice
@@ -628,25 +825,37 @@ if __name__ == "__main__":
             if choice == States.CALIBRATING:
                 with CubemarsMotor(motor_type="AK70-10", frequency=freq) as motor_1:
                     with CubemarsMotor(motor_type="AK60-6", frequency=freq) as motor_2:
-                        calibrate_height(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir)
+                        if not load_motor_calibration(motor_1, motor_2):
+                            continue
+                        calibrate_height(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, realtime=control_options["realtime"])
 
             elif choice ==States.UNPOWERED_COLLECTION:
                 with CubemarsMotor(motor_type="AK70-10", frequency=freq) as motor_1:
                     with CubemarsMotor(motor_type="AK60-6", frequency=freq) as motor_2:
-                        collect_unpowered_data(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, mode=trigger_mode)
+                        if not load_motor_calibration(motor_1, motor_2):
+                            continue
+                        collect_unpowered_data(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, mode=trigger_mode, options=control_options)
 
             elif choice == States.ASSISTING:
                 with CubemarsMotor(motor_type="AK70-10", frequency=freq) as motor_1:
                     with CubemarsMotor(motor_type="AK60-6", frequency=freq) as motor_2:
-                        apply_simulation_profile(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, mode=trigger_mode)
+                        if not load_motor_calibration(motor_1, motor_2):
+                            continue
+                        apply_simulation_profile(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, mode=trigger_mode, options=control_options)
 
             elif choice == States.ASSIST_PROFILES:
                 with CubemarsMotor(motor_type="AK70-10", frequency=freq) as motor_1:
                     with CubemarsMotor(motor_type="AK60-6", frequency=freq) as motor_2:
-                        assist_multiple_profiles(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, mode=trigger_mode)
+                        if not load_motor_calibration(motor_1, motor_2):
+                            continue
+                        assist_multiple_profiles(motor_1, motor_2, freq=freq, session_dir=session_dir, remote_dir=session_remote_dir, options=control_options)
+
+            elif choice == States.CONTROL_OPTIONS:
+                set_control_options(control_options)
 
             elif choice == States.EXIT:
                 print("Exiting...")
                 break
     finally:
+        close_trigger()
         GPIO.cleanup()
@@ -5,7 +5,8 @@ import numpy as np
 
 from pathlib import Path
 
-from NeuroLocoMiddleware.SoftRealtimeLoop import SoftRealtimeLoop
+from assistive_arm.display import StatusDisplay
+from assistive_arm.scheduler import FixedRateLoop
 from assistive_arm.motor_control import CubemarsMotor
 
 
@@ -13,23 +14,23 @@ def main(motor_1: CubemarsMotor):
     # Start control loop
     freq = 200  # Hz
 
-    loop = SoftRealtimeLoop(dt=1 / freq, report=True, fade=0)
-    start_time = 0
+    loop = FixedRateLoop(dt=1 / freq, report=True)
+
+    display = StatusDisplay(
+        lambda values: [f"{motor_1.type}: Angle: {np.rad2deg(values['angle']):.3f} Velocity: {values['velocity']:.3f} Torque: {values['torque']:.3f}"],
+        fields=["angle", "velocity", "torque"],
+        rate=10,
+    )
 
     # General control loop
     try:
-        for t in loop:
-            motor_1.send_torque(desired_torque=9, safety=False)
-
-            if t - start_time > 0.1:
-                print(
-                    f"{motor_1.type}: Angle: {np.rad2deg(motor_1.position):.3f} Velocity: {motor_1.velocity:.3f} Torque: {motor_1.measured_torque:.3f}"
-                )
-                sys.stdout.write(f"\x1b[1A\x1b[2K")
-                start_time = t
-
-            if motor_1._emergency_stop:
-                break
+        with display:
+            for t in loop:
+                motor_1.send_torque(desired_torque=9, safety=False)
+                display.update(angle=motor_1.position, velocity=motor_1.velocity, torque=motor_1.measured_torque)
+
+                if motor_1._emergency_stop:
+                    break
         del loop
 
     except KeyboardInterrupt:
@@ -5,73 +5,64 @@ import numpy as np
 
 from pathlib import Path
 
-from NeuroLocoMiddleware.SoftRealtimeLoop import SoftRealtimeLoop
+from assistive_arm.display import StatusDisplay
+from assistive_arm.scheduler import FixedRateLoop
 from assistive_arm.motor_control import CubemarsMotor
+from assistive_arm.singularity import SingularityAvoidance
 
 np.set_printoptions(precision=3, suppress=True)
 
 
-def avoidance_torque(theta_1: float, theta_2: float, d_sing: float=0.175) -> float:
-    
-    l1 = 0.44
-    l2 = 0.41
-    jacobian = np.array([
-                [-l1*np.sin(theta_1)-l2*np.sin(theta_1+theta_2), - l2*np.sin(theta_1+theta_2)],
-                [l1*np.cos(theta_1)+l2*np.cos(theta_1+theta_2), l2*np.cos(theta_1+theta_2)]])
-
-    Ks = 150 # Singularity avoidance gain
-
-    manipulability = l1*l2*abs(np.sin(theta_2))
-
-    force = np.array([0, 0])
-
-    if abs(theta_2) > d_sing:
-        force = np.array([0, 0]).T
-    else:
-        force = np.array(
-            [0,
-             Ks*manipulability* l1 * l2 * np.sin(2*theta_2) / (2*abs(np.sin(theta_2 + 0.001)))]
-        ).T
-    
-    torque = jacobian.T @ force
+def avoidance_torque(theta_1: float, theta_2: float, d_sing: float=0.175) -> np.ndarray:
+    avoidance = SingularityAvoidance(gain=150, d_sing=d_sing)
 
-    return force
+    return np.array(avoidance.torque(theta_1=theta_1, theta_2=theta_2))
 
 
 def main(motor_1: CubemarsMotor, motor_2: CubemarsMotor):
     # Start control loop
     freq = 200  # Hz
 
-    loop = SoftRealtimeLoop(dt=1 / freq, report=True, fade=0)
-    start_time = 0
+    loop = FixedRateLoop(dt=1 / freq, report=True)
 
     # General control loop
     l1 = 0.44
     l2 = 0.41
 
+    avoidance = SingularityAvoidance(gain=150, d_sing=0.175)
 
-    try:
-        for t in loop:
-
-            # motor_1.send_torque(desired_torque=0, safety=False)
-            # motor_2.send_torque(desired_torque=0, safety=False)
-            avoid_torque = avoidance_torque(theta_1=motor_1.position, theta_2=motor_2.position)
-            motor_1.send_torque(desired_torque=avoid_torque[0], safety=False)
-            motor_2.send_torque(desired_torque=avoid_torque[1], safety=False)
-
-            sing_prox = l1*l2*abs(np.sin(motor_2.position))
+    display = StatusDisplay(
+        lambda values: [
+            f"{motor_1.type}: Angle: {np.rad2deg(values['angle']):.3f} Velocity: {values['velocity']:.3f} Torque: {values['torque']:.3f}",
+            f"Dist singularity: {values['sing_prox']:.3f}, Avoidance torque: [{values['tau_1']:.3f} {values['tau_2']:.3f}]",
+        ],
+        fields=["angle", "velocity", "torque", "sing_prox", "tau_1", "tau_2"],
+        rate=10,
+    )
 
-            if t - start_time > 0.1:
-                print(
-                    f"{motor_1.type}: Angle: {np.rad2deg(motor_1.position):.3f} Velocity: {motor_1.velocity:.3f} Torque: {motor_1.measured_torque:.3f}"
+    try:
+        with display:
+            for t in loop:
+
+                # motor_1.send_torque(desired_torque=0, safety=False)
+                # motor_2.send_torque(desired_torque=0, safety=False)
+                avoid_torque = np.array(avoidance.torque(theta_1=motor_1.position, theta_2=motor_2.position))
+                motor_1.send_torque(desired_torque=avoid_torque[0], safety=False)
+                motor_2.send_torque(desired_torque=avoid_torque[1], safety=False)
+
+                sing_prox = l1*l2*abs(np.sin(motor_2.position))
+
+                display.update(
+                    angle=motor_1.position,
+                    velocity=motor_1.velocity,
+                    torque=motor_1.measured_torque,
+                    sing_prox=sing_prox,
+                    tau_1=avoid_torque[0],
+                    tau_2=avoid_torque[1],
                 )
-                print(f"Dist singularity: {sing_prox:.3f}, Avoidance torque: {avoid_torque}")
-
-                sys.stdout.write(f"\x1b[2A\x1b[2K")
-                start_time = t
 
-            if motor_1._emergency_stop or motor_2._emergency_stop:
-                break
+                if motor_1._emergency_stop or motor_2._emergency_stop:
+                    break
         del loop
 
     except KeyboardInterrupt:
@@ -1,4 +1,4 @@
-from NeuroLocoMiddleware.SoftRealtimeLoop import SoftRealtimeLoop
+from assistive_arm.scheduler import FixedRateLoop
 import numpy as np
 import time
 from TMotorCANControl.mit_can import TMotorManager_mit_can
@@ -20,7 +20,7 @@ def two_DOF(dev1,dev2):
     
     print("Starting 2 DOF demo. Press ctrl+C to quit.")
 
-    loop = SoftRealtimeLoop(dt = 0.005, report=True, fade=0)
+    loop = FixedRateLoop(dt = 0.005, report=True)
     for t in loop:
         dev1.update()
         dev2.update()
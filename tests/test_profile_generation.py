@@ -0,0 +1,36 @@
+""" Check that generate_profile reproduces the stored spline profiles (force and kinematics) """
+import numpy as np
+
+from pathlib import Path
+
+from assistive_arm.profile_generation import generate_profile
+from assistive_arm.utils.profile_io import get_profile_details, load_profile
+
+
+SPLINE_PROFILES_PATH = Path("./torque_profiles/spline_profiles")
+TOLERANCE = 1e-9
+
+
+def main():
+    max_errors = {"force_Y": 0.0, "theta_1": 0.0, "theta_2": 0.0, "EE_X": 0.0, "EE_Y": 0.0}
+
+    for path in sorted(SPLINE_PROFILES_PATH.glob("peak_time_*_peak_force_*.csv")):
+        stored = load_profile(path)
+        details = get_profile_details(path)
+
+        # File names round the peak force, the spline peaks exactly at its knot
+        peak_force = stored.force_Y.max()
+        generated = generate_profile(details["peak_time"], peak_force, theta_2_range=(stored.theta_2.min(), stored.theta_2.max()))
+
+        for column in max_errors:
+            error = np.abs(generated[column].to_numpy() - stored[column].to_numpy()).max()
+            max_errors[column] = max(max_errors[column], error)
+
+        print(f"{path.stem}: peak {peak_force:.4f}N, force_Y error {np.abs(generated.force_Y - stored.force_Y).max():.2e}N")
+
+    print(f"Max errors: {max_errors}")
+    assert all(error < TOLERANCE for error in max_errors.values()), "Generated profiles don't match the stored ones"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+""" Compare the state predictor with the motor's moving average on a simulated sit-to-stand joint trajectory """
+import numpy as np
+
+from assistive_arm.state_prediction import StatePredictor
+
+
+FREQUENCY = 200  # Hz
+BUS_LATENCY = 0.0005  # s, each way
+RESOLUTION = 0.00038  # rad, position quantisation of the reply
+NOISE = 0.0002  # rad
+
+
+def simulate_joint(t: np.ndarray) -> np.ndarray:
+    """ 0.8 rad cosine ramp over 1.5 s, starting at 0.5 s """
+    phase = np.clip(t - 0.5, 0, 1.5) / 1.5
+    return 0.8 * (1 - np.cos(np.pi * phase)) / 2
+
+
+def main():
+    dt = 1 / FREQUENCY
+    sample_times = np.arange(0, 3, dt)
+    rng = np.random.default_rng(0)
+    measured = np.round((simulate_joint(sample_times) + rng.normal(0, NOISE, len(sample_times))) / RESOLUTION) * RESOLUTION
+
+    # Same settings as CubemarsMotor
+    predictor = StatePredictor(hold=0.5 / FREQUENCY)
+    buffer_size = int(0.1 * FREQUENCY)
+    buffer = [measured[0]] * buffer_size
+
+    errors = {"predicted": [], "moving average": [], "raw": []}
+
+    for sample_time, position in zip(sample_times, measured):
+        # The reply arrives one bus latency after the motor sampled the state
+        receive_time = sample_time + BUS_LATENCY
+        predictor.update(position, timestamp=receive_time, round_trip=2 * BUS_LATENCY)
+        buffer = buffer[1:] + [position]
+
+        # A command sent on receipt acts one bus latency later, for the next period
+        horizon = receive_time - predictor.timestamp + predictor.bus_latency + predictor.hold
+        truth = simulate_joint(receive_time + BUS_LATENCY + predictor.hold)
+
+        errors["predicted"].append(predictor.predict(horizon)[0] - truth)
+        errors["moving average"].append(np.mean(buffer) - truth)
+        errors["raw"].append(position - truth)
+
+    print(f"Bus latency estimate: {predictor.bus_latency * 1e3:.3f} ms (true {BUS_LATENCY * 1e3:.3f} ms)")
+    for name, error in errors.items():
+        # Skip the first buffer length, the average starts filled with the first sample
+        error = np.array(error[buffer_size:])
+        print(f"{name}: RMS {np.sqrt(np.mean(error ** 2)) * 1e3:.2f} mrad, max {np.abs(error).max() * 1e3:.2f} mrad")
+
+    assert abs(predictor.bus_latency - BUS_LATENCY) < 1e-9
+    assert np.sqrt(np.mean(np.square(errors["predicted"][buffer_size:]))) < np.sqrt(np.mean(np.square(errors["moving average"][buffer_size:])))
+
+
+if __name__ == "__main__":
+    main()
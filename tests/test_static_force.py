@@ -8,43 +8,51 @@ np.set_printoptions(precision=3, suppress=True)
 
 from pathlib import Path
 
-from NeuroLocoMiddleware.SoftRealtimeLoop import SoftRealtimeLoop
+from assistive_arm.display import StatusDisplay
+from assistive_arm.scheduler import FixedRateLoop
 from assistive_arm.motor_control import CubemarsMotor
 
 
 def main(motor_1: CubemarsMotor, motor_2: CubemarsMotor):
     freq = 200  # Hz
-    loop = SoftRealtimeLoop(dt=1 / freq, report=True, fade=0)
+    loop = FixedRateLoop(dt=1 / freq, report=True)
 
     profile_path = Path(
         "~/ability-lab/assistive-arm/torque_profiles/scaled_torque_profile.csv"
     )
 
-    start_time = 0
-
     max_tau_1 = 24
     max_tau_2 = 9
 
-    try:
-        for t in loop:
-            tau_1 = np.sin(t / 5) * max_tau_1
-            tau_2 = np.sin(t / 5) * max_tau_2
-
-            motor_1.send_torque(desired_torque=tau_1, safety=False)
-            motor_2.send_torque(desired_torque=tau_2, safety=False)
+    display = StatusDisplay(
+        lambda values: [
+            f"{motor_1.type}: Angle: {np.rad2deg(values['angle_1']):.3f} Velocity: {values['velocity_1']:.3f} Torque: {values['torque_1']:.3f}",
+            f"{motor_2.type}: Angle: {np.rad2deg(values['angle_2']):.3f} Velocity: {values['velocity_2']:.3f} Torque: {values['torque_2']:.3f}",
+            f"targets: tau_1: {values['tau_1']}, tau_2: {values['tau_2']}",
+        ],
+        fields=["angle_1", "velocity_1", "torque_1", "angle_2", "velocity_2", "torque_2", "tau_1", "tau_2"],
+        rate=20,
+    )
 
-            if t - start_time > 0.05:
-                print(
-                    f"{motor_1.type}: Angle: {np.rad2deg(motor_1.position):.3f} Velocity: {motor_1.velocity:.3f} Torque: {motor_1.measured_torque:.3f}"
-                )
-                print(
-                    f"{motor_2.type}: Angle: {np.rad2deg(motor_2.position):.3f} Velocity: {motor_2.velocity:.3f} Torque: {motor_2.measured_torque:.3f}"
+    try:
+        with display:
+            for t in loop:
+                tau_1 = np.sin(t / 5) * max_tau_1
+                tau_2 = np.sin(t / 5) * max_tau_2
+
+                motor_1.send_torque(desired_torque=tau_1, safety=False)
+                motor_2.send_torque(desired_torque=tau_2, safety=False)
+
+                display.update(
+                    angle_1=motor_1.position,
+                    velocity_1=motor_1.velocity,
+                    torque_1=motor_1.measured_torque,
+                    angle_2=motor_2.position,
+                    velocity_2=motor_2.velocity,
+                    torque_2=motor_2.measured_torque,
+                    tau_1=tau_1,
+                    tau_2=tau_2,
                 )
-
-                print(f"targets: tau_1: {tau_1}, tau_2: {tau_2}")
-                sys.stdout.write(f"\x1b[3A\x1b[2K")
-
-                start_time = t
         del loop
 
     except KeyboardInterrupt:
@@ -1,34 +1,37 @@
 import RPi.GPIO as GPIO
-import time
 
-# Use Broadcom SOC Pin numbers
-GPIO.setmode(GPIO.BCM)
+from assistive_arm.trigger import Trigger
 
-# Set up GPIO pin 17 as an input
-GPIO.setup(17, GPIO.IN)
+# Edge detection on GPIO pin 17 (Broadcom SOC numbering)
+trigger = Trigger(pin=17)
 
 try:
     print("Waiting for the first pulse signal on GPIO pin 17...")
 
-    # First loop: Wait for the first pulse signal to turn on
-    while not GPIO.input(17):
-        pass
-    print("Signal turned on.")
+    # Wait for the rising edge without polling the pin
+    trigger.wait_for_active()
+    if trigger.rising_time is None:
+        # The pin was already high at startup, no edge was recorded
+        print("Signal was already on.")
+    else:
+        print(f"Signal turned on at {trigger.rising_time:.6f}.")
 
-    print("In second loop, waiting for the signal to turn off.")
+    print("Waiting for the signal to turn off.")
 
-    # Second loop: Wait for the signal to turn off
-    while True:
-        if not GPIO.input(17):  # Detects if signal turns off (low signal)
-            print("Signal turned off, exiting.")
-            break
-        time.sleep(0.1)  # Short delay
+    # Wait for the falling edge
+    trigger.wait_for_inactive()
+    if trigger.falling_time is not None:
+        print(f"Signal turned off at {trigger.falling_time:.6f}, exiting.")
+    if trigger.rising_time is not None and trigger.falling_time is not None:
+        print(f"Pulse duration: {trigger.falling_time - trigger.rising_time:.6f}s")
 
 except KeyboardInterrupt:
     print("Script interrupted by the user")
 
 finally:
     # Clean up GPIO settings before exiting
+    trigger.close()
     GPIO.cleanup()
 
+print(f"Recorded edges: {list(trigger.events)}")
 print("Finished monitoring GPIO pin 17.")